@@ -57,10 +57,16 @@ function startWebcamAndShowVideo() {
 async function captureAndEncodeFace() {
   const videoElement = document.getElementById("video-element");
 
-  // Load face-api.js models
-  await faceapi.nets.tinyFaceDetector.loadFromUri("/client/face-api");
-  await faceapi.nets.faceLandmark68Net.loadFromUri("/client/face-api");
-  await faceapi.nets.faceRecognitionNet.loadFromUri("/client/face-api");
+  // Load face-api.js models (the asset build points these at the hashed weight manifests)
+  await faceapi.nets.tinyFaceDetector.loadFromUri(
+    "face-api/tiny_face_detector_model-weights_manifest.json"
+  );
+  await faceapi.nets.faceLandmark68Net.loadFromUri(
+    "face-api/face_landmark_68_model-weights_manifest.json"
+  );
+  await faceapi.nets.faceRecognitionNet.loadFromUri(
+    "face-api/face_recognition_model-weights_manifest.json"
+  );
 
   // Detect faces in the video feed
   const detections = await faceapi
@@ -79,6 +85,123 @@ async function captureAndEncodeFace() {
   }
 }
 
+/**
+ * Function to encode a face descriptor into the binary wire format expected by the server.
+ *
+ * The payload is an 8-byte little-endian header ("FD", version 1, dtype 1 = float32,
+ * descriptor count, descriptor length) followed by the raw float32 values.
+ *
+ * @function
+ * @param {Float32Array} descriptor - The face descriptor to encode.
+ * @returns {Blob} The encoded request body.
+ */
+function encodeDescriptor(descriptor) {
+  const header = new DataView(new ArrayBuffer(8));
+  header.setUint8(0, 0x46); // "F"
+  header.setUint8(1, 0x44); // "D"
+  header.setUint8(2, 1); // Format version
+  header.setUint8(3, 1); // float32
+  header.setUint16(4, 1, true); // Number of descriptors
+  header.setUint16(6, descriptor.length, true); // Values per descriptor
+  return new Blob([header.buffer, new Float32Array(descriptor)]);
+}
+
+/**
+ * Function to check whether the browser can send a ReadableStream as a request body.
+ *
+ * Browsers without request streams neither read the "duplex" option nor reject the
+ * request: they send the stream's string form with a text Content-Type instead.
+ *
+ * @function
+ * @returns {boolean} True if streaming request bodies are supported.
+ */
+function supportsRequestStreams() {
+  let duplexAccessed = false;
+  const hasContentType = new Request("", {
+    body: new ReadableStream(),
+    method: "POST",
+    get duplex() {
+      duplexAccessed = true;
+      return "half";
+    },
+  }).headers.has("Content-Type");
+  return duplexAccessed && !hasContentType;
+}
+
+/**
+ * Function to stream successive face descriptors to the server in a single chunked POST.
+ *
+ * The response only arrives once the request body is closed, so up to maxFrames captures
+ * are made even when the first frame was enough for the server to decide; the server stops
+ * matching at its decision and ignores the remaining frames. If the server closes the
+ * connection before the stream ends, capturing stops and the request rejects with the last
+ * captured descriptor attached as `error.descriptor`, so the caller can retry it without a
+ * new capture.
+ *
+ * @function
+ * @param {string} url - The streaming authentication endpoint.
+ * @param {number} maxFrames - The maximum number of capture attempts.
+ * @returns {Promise<Response>} The server response.
+ */
+function streamFaceDescriptors(url, maxFrames) {
+  const controller = new AbortController();
+  let attempts = 0;
+  let lastDescriptor = null;
+  const body = new ReadableStream({
+    async pull(stream) {
+      if (attempts >= maxFrames || controller.signal.aborted) {
+        stream.close();
+        return;
+      }
+      attempts++;
+      const faceData = await captureAndEncodeFace();
+      if (faceData && !controller.signal.aborted) {
+        lastDescriptor = faceData;
+        const frame = await encodeDescriptor(faceData).arrayBuffer();
+        stream.enqueue(new Uint8Array(frame));
+      }
+    },
+  });
+
+  return fetch(url, {
+    method: "POST",
+    headers: {
+      "Content-Type": "application/octet-stream",
+    },
+    body: body,
+    duplex: "half",
+    signal: controller.signal,
+  }).catch((error) => {
+    // Stop capturing for a request that can no longer be answered
+    controller.abort();
+    error.descriptor = lastDescriptor;
+    throw error;
+  });
+}
+
+/**
+ * Function to send a single face descriptor to the non-streaming authentication endpoint.
+ *
+ * @function
+ * @param {Float32Array} descriptor - The face descriptor, or null if no face was captured.
+ * @returns {Promise<Response>} The server response.
+ */
+function sendFaceDescriptor(descriptor) {
+  if (!descriptor) {
+    return Promise.reject(new Error("No face data captured for authentication."));
+  }
+  return fetch(
+    "https://biometricauthenticationsystem.onrender.com/authenticate_with_biometrics",
+    {
+      method: "POST",
+      headers: {
+        "Content-Type": "application/octet-stream",
+      },
+      body: encodeDescriptor(descriptor),
+    }
+  );
+}
+
 /**
  * Function to set up biometric authentication.
  *
@@ -100,9 +223,9 @@ function setupBiometricAuthentication() {
           {
             method: "POST",
             headers: {
-              "Content-Type": "application/json",
+              "Content-Type": "application/octet-stream",
             },
-            body: JSON.stringify({ faceData: capturedFaceData }),
+            body: encodeDescriptor(capturedFaceData),
           }
         );
       } else {
@@ -137,24 +260,22 @@ function authenticateWithBiometrics() {
   button.disabled = true;
   button.innerText = "Authenticating...";
   button.style.color = "#fff";
-  // Capture the user's face data for authentication
-  captureAndEncodeFace()
-    .then((capturedFaceData) => {
-      if (capturedFaceData) {
-        return fetch(
-          "https://biometricauthenticationsystem.onrender.com/authenticate_with_biometrics",
-          {
-            method: "POST",
-            headers: {
-              "Content-Type": "application/json",
-            },
-            body: JSON.stringify({ faceData: capturedFaceData }),
-          }
-        );
-      } else {
-        throw new Error("No face data captured for authentication.");
-      }
-    })
+  // Stream successive face captures where the browser supports streaming request
+  // bodies, and send a single capture otherwise
+  const authentication = supportsRequestStreams()
+    ? streamFaceDescriptors(
+        "https://biometricauthenticationsystem.onrender.com/authenticate_with_biometrics/stream",
+        10
+      ).catch((error) => {
+        // Retry the last streamed frame instead of capturing again
+        if (error.descriptor) {
+          return sendFaceDescriptor(error.descriptor);
+        }
+        throw error;
+      })
+    : captureAndEncodeFace().then(sendFaceDescriptor);
+
+  authentication
     .then((response) => {
       if (response.status === 200) {
         // Biometric authentication successful
@@ -61,6 +61,55 @@ function handleSignUp(event) {
     });
 }
 
+// Pending availability check timer, so that a check only runs once typing pauses
+let availabilityTimer = null;
+
+/**
+ * Function to check whether the typed username or email is still available.
+ *
+ * Called on input in the sign-up form. The request is debounced and answered by the server's
+ * in-memory filter, so users learn a value is taken before submitting the form.
+ *
+ * @function
+ * @param {Event} event - The input event object.
+ */
+function handleAvailabilityInput(event) {
+  const input = event.target;
+  const field = input.dataset.field;
+  const value = input.value.trim();
+
+  clearTimeout(availabilityTimer);
+  if (!value) {
+    return;
+  }
+
+  availabilityTimer = setTimeout(() => {
+    fetch(
+      `https://biometricauthenticationsystem.onrender.com/user/availability?${field}=${encodeURIComponent(value)}`
+    )
+      .then((response) => response.json())
+      .then((data) => {
+        // Ignore answers for values the user has since changed
+        if (input.value.trim() !== value) {
+          return;
+        }
+        if (data[field] === false) {
+          displayError(
+            field === "email"
+              ? "Email is already registered"
+              : "Username is not available"
+          );
+        } else {
+          hideError();
+        }
+      })
+      .catch((error) => {
+        // The register request still validates the value
+        console.error("Error:", error);
+      });
+  }, 300);
+}
+
 /**
  * Function to handle Log In button click.
  *
@@ -126,3 +175,14 @@ function displayError(message) {
   errorSpan.textContent = message;
   errorSpan.style.display = "block";
 }
+
+/**
+ * Function to hide the error message.
+ *
+ * @function
+ */
+function hideError() {
+  const errorSpan = document.querySelector('[data-component="error"]');
+  errorSpan.textContent = "";
+  errorSpan.style.display = "none";
+}
@@ -0,0 +1,234 @@
+"""
+availability.py - Username and Email Availability Filter
+
+This module answers "is this username/email taken?" for the signup form without a database query
+in the common case. Every normalized username and email is kept in an in-memory cuckoo filter:
+- A filter miss means the value is certainly not registered, so it is reported as available.
+- A filter hit means the value is probably registered; only then is the indexed unique column
+  queried to confirm.
+
+A cuckoo filter is used rather than a Bloom filter because it supports deletes, so closing an
+account frees its username and email. Each value is stored as a 16-bit fingerprint in one of two
+candidate buckets, giving a false-positive rate of about 0.01% at a few bytes per value.
+
+The filter is built from the `user` table on first use and kept up to date by the register and
+delete routes. Other server processes do not see those updates, so the filter is also rebuilt
+periodically; a stale miss only means the signup form is told a value is free and the register
+route then rejects it. Periodic rebuilds run in a background thread, one at a time, while requests
+keep using the previous filter.
+"""
+
+import hashlib
+import random
+import threading
+import time
+
+import numpy as np
+from flask import current_app
+
+BUCKET_SIZE = 4
+MAX_KICKS = 500
+
+
+def normalize(value):
+    """
+    Normalize a username or email for the filter.
+    """
+    return value.strip().lower()
+
+
+class CuckooFilter:
+    """
+    A cuckoo filter of 16-bit fingerprints in buckets of four.
+    """
+
+    def __init__(self, capacity):
+        """
+        :param capacity: Expected number of values; the table is sized for about 90% load.
+        """
+        buckets = 1
+        while buckets * BUCKET_SIZE * 0.9 < max(capacity, 1024):
+            buckets *= 2
+        self._mask = buckets - 1
+        self._table = np.zeros((buckets, BUCKET_SIZE), dtype=np.uint16)
+        self._random = random.Random(0)
+        self.count = 0
+
+    def __len__(self):
+        return self.count
+
+    @property
+    def capacity(self):
+        return self._table.size
+
+    def _locate(self, value):
+        digest = int.from_bytes(
+            hashlib.blake2b(value.encode("utf-8"), digest_size=8).digest(), "little")
+        # Zero marks an empty slot, so fingerprints are never zero
+        fingerprint = (digest >> 32) & 0xFFFF or 1
+        index = digest & self._mask
+        return fingerprint, index, self._alternate(index, fingerprint)
+
+    def _alternate(self, index, fingerprint):
+        return (index ^ (fingerprint * 0x5BD1E995)) & self._mask
+
+    def _place(self, index, fingerprint):
+        bucket = self._table[index]
+        empty = np.flatnonzero(bucket == 0)
+        if len(empty):
+            bucket[empty[0]] = fingerprint
+            return True
+        return False
+
+    def add(self, value):
+        """
+        Insert a value.
+
+        :param value: The normalized value.
+        :return: False if the table is too full to place it.
+        """
+        fingerprint, first, second = self._locate(value)
+        if self._place(first, fingerprint) or self._place(second, fingerprint):
+            self.count += 1
+            return True
+
+        # Evict a random resident to its alternate bucket, repeatedly
+        index = self._random.choice((first, second))
+        for _ in range(MAX_KICKS):
+            slot = self._random.randrange(BUCKET_SIZE)
+            fingerprint, self._table[index, slot] = int(self._table[index, slot]), fingerprint
+            index = self._alternate(index, fingerprint)
+            if self._place(index, fingerprint):
+                self.count += 1
+                return True
+        return False
+
+    def __contains__(self, value):
+        fingerprint, first, second = self._locate(value)
+        return bool((self._table[first] == fingerprint).any()
+                    or (self._table[second] == fingerprint).any())
+
+    def remove(self, value):
+        """
+        Delete one copy of a value that was previously added.
+
+        :param value: The normalized value.
+        :return: True if a matching fingerprint was removed.
+        """
+        fingerprint, first, second = self._locate(value)
+        for index in (first, second):
+            slots = np.flatnonzero(self._table[index] == fingerprint)
+            if len(slots):
+                self._table[index, slots[0]] = 0
+                self.count -= 1
+                return True
+        return False
+
+
+class AvailabilityFilter:
+    """
+    Cuckoo filters of registered usernames and emails, backed by the `user` table.
+    """
+
+    FIELDS = ("username", "email")
+
+    def __init__(self, app=None, rebuild_interval=300.0):
+        """
+        :param app: The Flask application, used for database access from the rebuild thread.
+        :param rebuild_interval: Seconds after which the filters are rebuilt from the database.
+        """
+        self.app = app
+        self.rebuild_interval = rebuild_interval
+        self._lock = threading.Lock()
+        # Held by whoever is rebuilding, so that only one rebuild runs at a time
+        self._rebuild_lock = threading.Lock()
+        self._filters = None
+        self._built_at = 0.0
+
+    def rebuild(self, capacity=None):
+        """
+        Rebuild both filters from the `user` table.
+
+        :param capacity: Minimum capacity; defaults to twice the current user count.
+        """
+        from database.db import db
+        from models.user import User
+
+        capacity = max(capacity or 0, 2 * User.query.count())
+        filters = {field: CuckooFilter(capacity) for field in self.FIELDS}
+        for row in db.session.query(User.username, User.email).yield_per(10000):
+            for field, value in zip(self.FIELDS, row):
+                if not filters[field].add(normalize(value)):
+                    return self.rebuild(2 * capacity)
+        with self._lock:
+            self._filters = filters
+            self._built_at = time.monotonic()
+
+    def _current(self):
+        if self._filters is None:
+            # Nothing to answer with yet: the first requests wait for a single build
+            with self._rebuild_lock:
+                if self._filters is None:
+                    self.rebuild()
+        elif (time.monotonic() - self._built_at > self.rebuild_interval and self.app is not None
+                and self._rebuild_lock.acquire(blocking=False)):
+            threading.Thread(target=self._rebuild_in_background, name="availability-rebuild",
+                             daemon=True).start()
+        return self._filters
+
+    def _rebuild_in_background(self):
+        # Called with the rebuild lock held
+        try:
+            with self.app.app_context():
+                self.rebuild()
+        except Exception as e:
+            # Retry after another interval rather than on every request
+            self._built_at = time.monotonic()
+            print("Error:", f"Could not rebuild the availability filter: {e}")
+        finally:
+            self._rebuild_lock.release()
+
+    def might_exist(self, field, value):
+        """
+        Check a value against the filter.
+
+        :param field: "username" or "email".
+        :param value: The raw value.
+        :return: False if the value is certainly not registered.
+        """
+        return normalize(value) in self._current()[field]
+
+    def add(self, username, email):
+        """
+        Record a newly registered user.
+        """
+        filters = self._current()
+        with self._lock:
+            full = not (filters["username"].add(normalize(username))
+                        and filters["email"].add(normalize(email)))
+        if full:
+            self.rebuild(2 * filters["username"].capacity)
+
+    def remove(self, username, email):
+        """
+        Forget a deleted user.
+        """
+        filters = self._current()
+        with self._lock:
+            filters["username"].remove(normalize(username))
+            filters["email"].remove(normalize(email))
+
+
+def get_availability_filter():
+    """
+    Return the availability filter of the current application.
+
+    :return: The application's AvailabilityFilter instance.
+    """
+    availability = current_app.extensions.get("availability_filter")
+    if availability is None:
+        availability = AvailabilityFilter(
+            current_app._get_current_object(),
+            current_app.config.get("AVAILABILITY_FILTER_REBUILD_SECONDS", 300.0))
+        current_app.extensions["availability_filter"] = availability
+    return availability
@@ -0,0 +1,311 @@
+"""
+control.py - Admission Control for CPU-Heavy Routes
+
+This module keeps bursts of expensive requests (bcrypt hashing, face matching) from queueing
+behind each other until every request is slow. Each budgeted endpoint belongs to a budget with a
+fixed number of concurrent requests; requests beyond it wait in a bounded queue for at most the
+budget's maximum wait, and are shed with "503 Service Unavailable" and a Retry-After header when
+the queue is full or their wait runs out. A request that cannot start in time is refused at once
+instead of being processed after its client has given up.
+
+Budgets and routes are configured with ADMISSION_BUDGETS and ADMISSION_ROUTES:
+- ADMISSION_BUDGETS maps a budget name to its "max_wait" seconds and either its "share" of the
+  worker threads (see `size_budgets`) or an explicit "concurrency" and "queue" slots.
+- ADMISSION_ROUTES maps an endpoint to its (budget, priority class).
+
+A queued request holds a server thread while it waits, so budgets are sized from the threads of
+one worker process (SERVER_THREADS, gunicorn's --threads): ADMISSION_RESERVED_THREADS stay free
+for unbudgeted routes, and each budget gets its share of the rest as running plus queued requests.
+Budgets, like the threads they are sized from, are per worker process: with several gunicorn
+workers, each one admits up to its own budgets.
+
+A request holds its slot until it completes, so a route that mostly waits on its client must not
+share a budget with CPU-bound routes: a streamed biometric login holds its slot for the whole
+multi-second capture, and would keep single-frame logins from running. It is budgeted separately
+(the default "biometric_stream" budget), with a concurrency as large as its share.
+
+Priority classes, highest first:
+- "interactive": a user waiting on the request (login, biometric authentication). Interactive
+  requests are admitted before queued bulk requests, and take the queue slot of the newest bulk
+  request when the queue is full.
+- "bulk": enrollment and registration, shed first under load.
+Endpoints missing from ADMISSION_ROUTES (token refresh, user details, logout, availability) are
+never queued or shed, and always find a free thread as long as the budgets' shares add up to at
+most 1.
+
+Queue depth, admissions and shed counts per budget are returned by `AdmissionController.stats`
+and served at /admin/admission.
+"""
+
+import math
+import os
+import threading
+import time
+from collections import Counter
+
+from flask import current_app, g, jsonify, request
+
+PRIORITY_CLASSES = ("interactive", "bulk")
+
+# Weight of the newest request in the running mean of a budget's service time
+SERVICE_TIME_SMOOTHING = 0.2
+
+# Bounds of the Retry-After estimate, in seconds
+MIN_RETRY_AFTER = 1
+MAX_RETRY_AFTER = 60
+
+
+class Overloaded(Exception):
+    """
+    Raised when a request is shed.
+
+    Attributes:
+        reason (str): "queue_full", "deadline" or "displaced".
+        retry_after (int): Seconds the client should wait before retrying.
+    """
+
+    def __init__(self, reason, retry_after):
+        super().__init__(reason)
+        self.reason = reason
+        self.retry_after = retry_after
+
+
+class _Waiter:
+    __slots__ = ("rank", "event", "granted", "displaced")
+
+    def __init__(self, rank):
+        self.rank = rank
+        self.event = threading.Event()
+        self.granted = False
+        self.displaced = False
+
+
+class Budget:
+    """
+    A concurrency budget with a bounded, priority-ordered wait queue.
+
+    Freed slots are handed directly to the highest-priority, oldest waiter, so a request arriving
+    just as a slot frees cannot overtake the queue.
+
+    Attributes:
+        name (str): The budget name.
+        concurrency (int): Maximum concurrent requests.
+        queue_size (int): Maximum waiting requests.
+        max_wait (float): Maximum seconds a request waits for a slot.
+        admitted (int): Requests admitted.
+        shed (Counter): Requests shed, by reason.
+    """
+
+    def __init__(self, name, concurrency, queue_size, max_wait):
+        """
+        :param name: The budget name.
+        :param concurrency: Maximum concurrent requests.
+        :param queue_size: Maximum waiting requests (0 sheds as soon as the budget is full).
+        :param max_wait: Maximum seconds a request waits for a slot.
+        """
+        self.name = name
+        self.concurrency = max(1, concurrency)
+        self.queue_size = max(0, queue_size)
+        self.max_wait = max_wait
+        self.admitted = 0
+        self.shed = Counter()
+
+        self._lock = threading.Lock()
+        self._active = 0
+        # Ordered by (rank, arrival): the head is admitted next, the tail displaced first
+        self._waiters = []
+        self._service_time = None
+
+    def acquire(self, rank):
+        """
+        Take a slot, waiting in the queue if the budget is full.
+
+        :param rank: The index of the request's priority class in PRIORITY_CLASSES.
+        :raises Overloaded: If the request is shed.
+        """
+        with self._lock:
+            if self._active < self.concurrency and not self._waiters:
+                self._active += 1
+                self.admitted += 1
+                return
+            if len(self._waiters) >= self.queue_size:
+                victim = self._waiters[-1] if self._waiters else None
+                if victim is None or victim.rank <= rank:
+                    raise self._shed("queue_full")
+                self._waiters.pop()
+                victim.displaced = True
+                victim.event.set()
+            waiter = _Waiter(rank)
+            position = len(self._waiters)
+            while position and self._waiters[position - 1].rank > rank:
+                position -= 1
+            self._waiters.insert(position, waiter)
+
+        waiter.event.wait(self.max_wait)
+
+        with self._lock:
+            if waiter.granted:
+                self.admitted += 1
+                return
+            if waiter.displaced:
+                raise self._shed("displaced")
+            self._waiters.remove(waiter)
+            raise self._shed("deadline")
+
+    def release(self, service_time):
+        """
+        Free a slot, handing it to the next waiter if any.
+
+        :param service_time: Seconds the request held the slot.
+        """
+        with self._lock:
+            if self._service_time is None:
+                self._service_time = service_time
+            else:
+                self._service_time += SERVICE_TIME_SMOOTHING * (service_time - self._service_time)
+            if self._waiters:
+                waiter = self._waiters.pop(0)
+                waiter.granted = True
+                waiter.event.set()
+            else:
+                self._active -= 1
+
+    def _shed(self, reason):
+        # Called with the lock held
+        self.shed[reason] += 1
+        service_time = self._service_time or 0.0
+        backlog = (self._active + len(self._waiters)) / self.concurrency
+        retry_after = math.ceil(service_time * backlog)
+        return Overloaded(reason, min(MAX_RETRY_AFTER, max(MIN_RETRY_AFTER, retry_after)))
+
+    def stats(self):
+        """
+        Return the budget's counters.
+
+        :return: A dict of the configuration, current load and totals.
+        """
+        with self._lock:
+            queued = Counter(PRIORITY_CLASSES[waiter.rank] for waiter in self._waiters)
+            return {
+                "concurrency": self.concurrency,
+                "queue_size": self.queue_size,
+                "max_wait": self.max_wait,
+                "active": self._active,
+                "queued": len(self._waiters),
+                "queued_by_priority": {name: queued[name] for name in PRIORITY_CLASSES},
+                "admitted": self.admitted,
+                "shed": dict(self.shed),
+                "service_time": self._service_time,
+            }
+
+
+class AdmissionController:
+    """
+    The budgets of an application and the endpoints they cover.
+    """
+
+    def __init__(self, budgets, routes):
+        """
+        :param budgets: Dict of budget name to {"concurrency", "queue", "max_wait"}.
+        :param routes: Dict of endpoint to (budget name, priority class).
+        """
+        self.budgets = {
+            name: Budget(name, spec["concurrency"], spec["queue"], spec["max_wait"])
+            for name, spec in budgets.items()
+        }
+        self.routes = {}
+        for endpoint, (budget, priority) in routes.items():
+            if budget not in self.budgets:
+                raise ValueError(f"Unknown admission budget for {endpoint}: {budget}")
+            if priority not in PRIORITY_CLASSES:
+                raise ValueError(f"Unknown priority class for {endpoint}: {priority}")
+            self.routes[endpoint] = (self.budgets[budget], PRIORITY_CLASSES.index(priority))
+
+    def stats(self):
+        """
+        Return the counters of every budget.
+
+        :return: A dict of budget name to `Budget.stats`.
+        """
+        return {name: budget.stats() for name, budget in self.budgets.items()}
+
+
+def size_budgets(budgets, threads, reserved=2, cpus=None):
+    """
+    Turn budget shares into concurrency and queue slots that fit the worker threads.
+
+    A budget with a "share" may hold that fraction of the threads left after `reserved`, running
+    or queued; it runs at most "concurrency" (by default one per CPU) of them at once and queues
+    the rest. Budgets given as "concurrency" and "queue" are kept as they are.
+
+    :param budgets: Dict of budget name to {"share", "max_wait"} and an optional "concurrency".
+    :param threads: Threads of one server worker process.
+    :param reserved: Threads kept free for unbudgeted routes.
+    :param cpus: Cap of the default concurrency; None uses the number of CPUs.
+    :return: Dict of budget name to {"concurrency", "queue", "max_wait"}.
+    """
+    available = max(threads - reserved, 1)
+    cpus = cpus or os.cpu_count() or 1
+    sized = {}
+    for name, spec in budgets.items():
+        if "share" not in spec:
+            sized[name] = spec
+            continue
+        slots = max(1, math.floor(available * spec["share"]))
+        concurrency = min(spec.get("concurrency") or cpus, slots)
+        sized[name] = {"concurrency": concurrency, "queue": slots - concurrency,
+                       "max_wait": spec["max_wait"]}
+    return sized
+
+
+def get_admission_controller():
+    """
+    Return the admission controller of the current application.
+
+    :return: The application's AdmissionController instance.
+    """
+    controller = current_app.extensions.get("admission_controller")
+    if controller is None:
+        config = current_app.config
+        budgets = size_budgets(config.get("ADMISSION_BUDGETS", {}),
+                               config.get("SERVER_THREADS", 8),
+                               config.get("ADMISSION_RESERVED_THREADS", 2))
+        controller = AdmissionController(budgets, config.get("ADMISSION_ROUTES", {}))
+        current_app.extensions["admission_controller"] = controller
+    return controller
+
+
+def _admit():
+    if not current_app.config.get("ADMISSION_CONTROL_ENABLED") or request.method == "OPTIONS":
+        return None
+    route = get_admission_controller().routes.get(request.endpoint)
+    if route is None:
+        return None
+
+    budget, rank = route
+    try:
+        budget.acquire(rank)
+    except Overloaded as e:
+        response = jsonify({"message": "Server busy, please retry", "reason": e.reason})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(e.retry_after)
+        return response
+    g.admission = (budget, time.perf_counter())
+    return None
+
+
+def _release(exc):
+    admission = g.pop("admission", None)
+    if admission is not None:
+        budget, started = admission
+        budget.release(time.perf_counter() - started)
+
+
+def init_admission(app):
+    """
+    Apply admission control to an application's budgeted endpoints.
+
+    :param app: The Flask application.
+    """
+    app.before_request(_admit)
+    app.teardown_request(_release)
@@ -14,7 +14,15 @@ Attributes:
 from flask import Flask
 from config import app_config
 from database.db import db
+from json_provider import init_json
+from diagnostics.profiling import init_profiling
+from admission.control import init_admission
 from routes.user import user_bp
+from routes.admin import admin_bp
+from routes.assets import assets_bp
+from biometrics.cli import biometrics_cli
+from diagnostics.cli import profiling_cli
+from assets.cli import assets_cli
 from flask_migrate import Migrate
 from flask_limiter import Limiter
 import os
@@ -49,6 +57,9 @@ def create_app(config_name=None):
     app.config.from_object(app_config.get(
         config_name, app_config["development"]))
 
+    # Use the fast JSON codec for responses and request parsing
+    init_json(app)
+
     # Create an instance of JWTManager and configure it
     jwt = JWTManager(app)
 
@@ -70,8 +81,21 @@ def create_app(config_name=None):
         default_limits=["5 per minute"],  # Set the default rate limit here
     )
 
+    # Queue or shed requests to CPU-heavy routes beyond their ADMISSION_BUDGETS
+    init_admission(app)
+
     # Register blueprints
     app.register_blueprint(user_bp, url_prefix="/user")
+    app.register_blueprint(admin_bp, url_prefix="/admin")
+    app.register_blueprint(assets_bp, url_prefix="/client")
+
+    # Register CLI commands
+    app.cli.add_command(biometrics_cli)
+    app.cli.add_command(profiling_cli)
+    app.cli.add_command(assets_cli)
+
+    # Profile requests selected by the PROFILING_* settings
+    init_profiling(app)
 
     @app.route('/')
     def index():
@@ -80,11 +104,13 @@ def create_app(config_name=None):
     return app
 
 
-# Create the Flask app
-app = create_app("production")
+# Spawned gallery shard workers re-import this module as __mp_main__; they must not build the app
+if __name__ != "__mp_main__":
+    # Create the Flask app
+    app = create_app("production")
 
-# Initialize Flask-Migrate
-migrate = Migrate(app, db)
+    # Initialize Flask-Migrate
+    migrate = Migrate(app, db)
 
 if __name__ == "__main__":
     # Run the app with SSL context
@@ -0,0 +1,31 @@
+"""
+cli.py - Static Asset Command-Line Interface
+
+This module registers the `flask assets` command group.
+
+Commands:
+- build: Build the content-hashed, precompressed face-api.js and MDB assets and the client pages
+  referring to them.
+"""
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from assets.pipeline import brotli, build_assets
+
+assets_cli = AppGroup("assets", help="Static asset commands.")
+
+
+@assets_cli.command("build")
+def build_command():
+    """
+    Build the assets served by the /client routes and the Netlify site into ASSETS_BUILD_DIR.
+    """
+    if brotli is None:
+        click.echo("Brotli is not installed; building gzip variants only.")
+    manifest = build_assets(current_app.config["ASSETS_SOURCE_DIR"],
+                            current_app.config["ASSETS_BUILD_DIR"])
+    original = sum(entry["size"] for entry in manifest.values() if entry["immutable"])
+    click.echo(f"Built {len(manifest)} files ({original / 1e6:.1f} MB of unique assets) "
+               f"into {current_app.config['ASSETS_BUILD_DIR']}")
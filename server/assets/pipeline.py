@@ -0,0 +1,185 @@
+"""
+pipeline.py - Static Asset Build
+
+This module builds the client's large static assets, the face-api.js model files in
+`client/face-api` and the MDB UI kit in `client/mdb`, into a directory that is both served by the
+backend's /client routes and published as the Netlify site:
+- Every file is copied under a content-hashed name ("mdb.min.js" -> "mdb.min.<hash>.js"), which
+  never changes content and can be cached by browsers forever. A copy under the stable name is
+  kept for anything still asking for it.
+- The face-api.js weight manifests' shard paths are rewritten to the hashed shard names.
+- The client's pages, scripts and styles (the top-level .html, .js and .css files) are copied with
+  their references to "face-api/<name>" and "mdb/<name>" rewritten to the hashed names, so the
+  pages load the hashed script and styles and `loadFromUri` is given the hashed weight manifests.
+  Repeat scans then read every model file from the browser cache without a request.
+- `_headers` gives Netlify "Cache-Control: public, max-age=31536000, immutable" for each hashed
+  file; pages and stable names keep Netlify's default, which revalidates every time.
+- Files that compress are stored next to their gzip (.gz) and, when the Brotli package is
+  installed, brotli (.br) variants, compressed once at build time at the highest level, for the
+  backend routes (Netlify compresses on its own).
+
+`asset-manifest.json` in the build directory maps each served name to its source name, content
+digest, available encodings and whether it is immutable.
+
+Build with `flask assets build`, or without Flask (as netlify.toml does) with
+`python -m assets.pipeline <client directory> <build directory>`.
+"""
+
+import gzip
+import hashlib
+import json
+import os
+import re
+import shutil
+import sys
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - depends on the environment
+    brotli = None
+
+ASSET_DIRECTORIES = ("face-api", "mdb")
+MANIFEST_NAME = "asset-manifest.json"
+WEIGHTS_MANIFEST_SUFFIX = "-weights_manifest.json"
+HEADERS_NAME = "_headers"
+PAGE_EXTENSIONS = (".html", ".js", ".css")
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+
+# A reference to an asset in a page, such as "./mdb/mdb.min.css" or "face-api/face-api.min.js"
+_ASSET_REFERENCE = re.compile(
+    r"(?<![\w./-])(?:\./)?((?:%s)/[\w.-]+)" % "|".join(map(re.escape, ASSET_DIRECTORIES)))
+
+# Variants saving less than this fraction of the original are not kept
+MIN_SAVING = 0.05
+
+
+def hashed_name(name, digest):
+    """
+    Insert a content digest before a file name's extension.
+
+    :param name: The file name.
+    :param digest: The content digest.
+    :return: The hashed file name.
+    """
+    stem, extension = os.path.splitext(name)
+    return f"{stem}.{digest}{extension}"
+
+
+def _digest(data):
+    return hashlib.sha256(data).hexdigest()[:16]
+
+
+def _compress(data):
+    variants = {"gzip": gzip.compress(data, compresslevel=9, mtime=0)}
+    if brotli is not None:
+        variants["br"] = brotli.compress(data, quality=11)
+    return {encoding: compressed for encoding, compressed in variants.items()
+            if len(compressed) <= len(data) * (1 - MIN_SAVING)}
+
+
+def _write(build_dir, name, data, source, immutable, manifest):
+    path = os.path.join(build_dir, name)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    with open(path, "wb") as f:
+        f.write(data)
+    variants = _compress(data)
+    for encoding, compressed in variants.items():
+        with open(path + (".br" if encoding == "br" else ".gz"), "wb") as f:
+            f.write(compressed)
+    manifest[name] = {
+        "source": source,
+        "digest": _digest(data),
+        "size": len(data),
+        "encodings": sorted(variants),
+        "immutable": immutable,
+    }
+
+
+def rewrite_references(text, hashed_paths):
+    """
+    Point a page's asset references at the hashed names.
+
+    :param text: The page, script or style sheet.
+    :param hashed_paths: Map of source path ("mdb/mdb.min.css") to hashed path.
+    :return: The rewritten text; unknown references are left alone.
+    """
+    return _ASSET_REFERENCE.sub(
+        lambda match: match.group(0).replace(match.group(1),
+                                             hashed_paths.get(match.group(1), match.group(1))),
+        text)
+
+
+def _build_pages(source_dir, build_dir, hashed_paths):
+    for name in sorted(os.listdir(source_dir)):
+        path = os.path.join(source_dir, name)
+        if os.path.isfile(path) and name.endswith(PAGE_EXTENSIONS):
+            with open(path, encoding="utf-8") as f:
+                text = f.read()
+            with open(os.path.join(build_dir, name), "w", encoding="utf-8") as f:
+                f.write(rewrite_references(text, hashed_paths))
+
+
+def _write_headers(build_dir, hashed_paths):
+    with open(os.path.join(build_dir, HEADERS_NAME), "w", encoding="utf-8") as f:
+        for path in sorted(hashed_paths.values()):
+            f.write(f"/{path}\n  Cache-Control: {IMMUTABLE_CACHE_CONTROL}\n")
+
+
+def build_assets(source_dir, build_dir, directories=ASSET_DIRECTORIES):
+    """
+    Build the hashed and precompressed assets, the pages referring to them and their headers.
+
+    :param source_dir: The `client` directory.
+    :param build_dir: The output directory, replaced by the build.
+    :param directories: The subdirectories of `source_dir` to build.
+    :return: The asset manifest.
+    """
+    if os.path.isdir(build_dir):
+        shutil.rmtree(build_dir)
+    manifest = {}
+    hashed_paths = {}
+
+    for directory in directories:
+        names = sorted(os.listdir(os.path.join(source_dir, directory)))
+        hashed = {}
+        # Shards first, so that the weight manifests can refer to their hashed names
+        for name in sorted(names, key=lambda name: name.endswith(WEIGHTS_MANIFEST_SUFFIX)):
+            source = f"{directory}/{name}"
+            with open(os.path.join(source_dir, directory, name), "rb") as f:
+                data = f.read()
+            if name.endswith(WEIGHTS_MANIFEST_SUFFIX):
+                groups = json.loads(data)
+                for group in groups:
+                    group["paths"] = [hashed.get(path, path) for path in group["paths"]]
+                data = json.dumps(groups, separators=(",", ":")).encode("utf-8")
+
+            hashed[name] = hashed_name(name, _digest(data))
+            _write(build_dir, f"{directory}/{hashed[name]}", data, source, True, manifest)
+            _write(build_dir, source, data, source, False, manifest)
+            hashed_paths[source] = f"{directory}/{hashed[name]}"
+
+    _build_pages(source_dir, build_dir, hashed_paths)
+    _write_headers(build_dir, hashed_paths)
+    with open(os.path.join(build_dir, MANIFEST_NAME), "w", encoding="utf-8") as f:
+        json.dump(manifest, f, indent=2, sort_keys=True)
+    return manifest
+
+
+def load_manifest(build_dir):
+    """
+    Read the asset manifest of a build.
+
+    :param build_dir: The build directory.
+    :return: The manifest, or None if the assets have not been built.
+    """
+    try:
+        with open(os.path.join(build_dir, MANIFEST_NAME), encoding="utf-8") as f:
+            return json.load(f)
+    except FileNotFoundError:
+        return None
+
+
+if __name__ == "__main__":
+    if len(sys.argv) != 3:
+        sys.exit("usage: python -m assets.pipeline <client directory> <build directory>")
+    print(f"Built {len(build_assets(sys.argv[1], sys.argv[2]))} assets into {sys.argv[2]}")
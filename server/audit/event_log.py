@@ -0,0 +1,234 @@
+"""
+event_log.py - Write-Behind Authentication Event Log
+
+This module records authentication events without adding a database round-trip to the request
+that produced them. Routes call `record_auth_event`, which only appends the event to a bounded
+in-process queue; a background thread drains the queue and batch-inserts the events into the
+`auth_event` table.
+
+Flushing:
+- A batch is written once AUTH_EVENT_BATCH_SIZE events are queued or AUTH_EVENT_FLUSH_INTERVAL
+  seconds have passed since the first event of the batch.
+- On PostgreSQL the flusher creates the daily partition of each batch's days before inserting.
+- Pending events are flushed when the process exits.
+
+When the queue is full, AUTH_EVENT_OVERFLOW decides:
+- "drop": the new event is discarded and counted in `dropped`, so requests never wait.
+- "block": the request waits up to AUTH_EVENT_BLOCK_SECONDS for room (backpressure), then drops.
+"""
+
+import atexit
+import datetime
+import queue
+import threading
+import time
+
+from flask import current_app, request
+
+from database.db import db
+from models.auth_event import AuthEvent
+
+# Queued by `close` to wake the flusher for a final drain
+_STOP = object()
+
+
+class AuthEventLog:
+    """
+    A bounded queue of authentication events with a background batch writer.
+
+    Attributes:
+        dropped (int): Events discarded because the queue was full.
+        failed (int): Events lost because their batch could not be written.
+        written (int): Events written to the database.
+    """
+
+    def __init__(self, app, queue_size=10000, batch_size=500, flush_interval=1.0,
+                 overflow="drop", block_seconds=0.05):
+        """
+        :param app: The Flask application, used for database access from the flusher thread.
+        :param queue_size: Maximum number of queued events.
+        :param batch_size: Maximum number of events per INSERT.
+        :param flush_interval: Maximum seconds an event waits before being written.
+        :param overflow: "drop" or "block", the policy when the queue is full.
+        :param block_seconds: Maximum wait for room under the "block" policy.
+        """
+        self.app = app
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.overflow = overflow
+        self.block_seconds = block_seconds
+        self.dropped = 0
+        self.failed = 0
+        self.written = 0
+
+        self._queue = queue.Queue(maxsize=queue_size)
+        self._lock = threading.Lock()
+        self._thread = None
+        self._closed = False
+        self._partitions = set()
+
+    def record(self, event):
+        """
+        Queue an event for writing.
+
+        :param event: A dict of AuthEvent column values.
+        :return: False if the event was dropped.
+        """
+        if self._closed:
+            return False
+        self._ensure_started()
+        try:
+            if self.overflow == "block":
+                self._queue.put(event, timeout=self.block_seconds)
+            else:
+                self._queue.put_nowait(event)
+            return True
+        except queue.Full:
+            with self._lock:
+                self.dropped += 1
+            return False
+
+    def _ensure_started(self):
+        # Started on first use so that forking servers start it in each worker
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="auth-event-flusher", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.close)
+
+    def _run(self):
+        stopping = False
+        while not stopping:
+            batch = [self._queue.get()]
+            deadline = time.monotonic() + self.flush_interval
+            while len(batch) < self.batch_size:
+                try:
+                    batch.append(self._queue.get(timeout=max(deadline - time.monotonic(), 0)))
+                except queue.Empty:
+                    break
+            if any(event is _STOP for event in batch):
+                stopping = True
+                batch = [event for event in batch if event is not _STOP]
+            self._write(batch)
+
+        # Final drain of whatever arrived before the stop marker
+        self.flush()
+
+    def flush(self):
+        """
+        Synchronously write every queued event.
+        """
+        while True:
+            batch = []
+            while len(batch) < self.batch_size:
+                try:
+                    event = self._queue.get_nowait()
+                except queue.Empty:
+                    break
+                if event is not _STOP:
+                    batch.append(event)
+            if not batch:
+                return
+            self._write(batch)
+
+    def close(self, timeout=5.0):
+        """
+        Stop accepting events, flush the queue and stop the flusher.
+
+        :param timeout: Maximum seconds to wait for the flusher.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        if self._thread is not None:
+            try:
+                self._queue.put(_STOP, timeout=timeout)
+            except queue.Full:
+                # The flusher is stuck behind a full queue: drain it from here, then stop it
+                self.flush()
+                try:
+                    self._queue.put_nowait(_STOP)
+                except queue.Full:
+                    return
+            self._thread.join(timeout)
+        else:
+            self.flush()
+
+    def _write(self, batch):
+        if not batch:
+            return
+        # A connection of its own, so that a synchronous flush never touches the request's session
+        engine = db.get_engine(self.app)
+        try:
+            with engine.begin() as connection:
+                days = set()
+                if engine.dialect.name == "postgresql":
+                    days = self._create_partitions(connection, batch)
+                connection.execute(AuthEvent.__table__.insert(), batch)
+            self._partitions |= days
+            self.written += len(batch)
+        except Exception as e:
+            self.failed += len(batch)
+            print("Error:", f"Could not write {len(batch)} auth events: {e}")
+
+    def _create_partitions(self, connection, batch):
+        """
+        Create the daily partitions of `auth_event` needed by a batch.
+
+        :param connection: The connection the batch is inserted with.
+        :param batch: The batch's events.
+        :return: The days whose partitions were ensured.
+        """
+        days = {event["occurred_at"].date() for event in batch} - self._partitions
+        for day in days:
+            next_day = day + datetime.timedelta(days=1)
+            connection.execute(db.text(
+                f"CREATE TABLE IF NOT EXISTS auth_event_{day:%Y%m%d} PARTITION OF auth_event "
+                f"FOR VALUES FROM ('{day.isoformat()}') TO ('{next_day.isoformat()}')"))
+        return days
+
+
+def get_auth_event_log():
+    """
+    Return the authentication event log of the current application.
+
+    :return: The application's AuthEventLog instance.
+    """
+    log = current_app.extensions.get("auth_event_log")
+    if log is None:
+        config = current_app.config
+        log = AuthEventLog(
+            current_app._get_current_object(),
+            queue_size=config.get("AUTH_EVENT_QUEUE_SIZE", 10000),
+            batch_size=config.get("AUTH_EVENT_BATCH_SIZE", 500),
+            flush_interval=config.get("AUTH_EVENT_FLUSH_INTERVAL", 1.0),
+            overflow=config.get("AUTH_EVENT_OVERFLOW", "drop"),
+            block_seconds=config.get("AUTH_EVENT_BLOCK_SECONDS", 0.05))
+        current_app.extensions["auth_event_log"] = log
+    return log
+
+
+def record_auth_event(event_type, outcome, started, user_id=None, distance=None):
+    """
+    Queue an authentication event for the current request.
+
+    :param event_type: "login", "biometric", "biometric_stream", "refresh", "delete" or
+        "enroll".
+    :param outcome: "success", "failure", "error" or "duplicate" (enrollment refused).
+    :param started: The request's start time from `time.perf_counter()`.
+    :param user_id: The id of the user concerned, if known.
+    :param distance: The best face descriptor distance, for biometric attempts.
+    """
+    if not current_app.config.get("AUTH_EVENT_LOG_ENABLED", True):
+        return
+    get_auth_event_log().record({
+        "occurred_at": datetime.datetime.utcnow(),
+        "event_type": event_type,
+        "outcome": outcome,
+        "user_id": user_id,
+        "distance": None if distance is None else float(distance),
+        "latency_ms": (time.perf_counter() - started) * 1000.0,
+        "ip_address": request.remote_addr,
+    })
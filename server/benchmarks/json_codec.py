@@ -0,0 +1,145 @@
+"""
+json_codec.py - JSON Codec Benchmark
+
+This script measures the per-request time of each JSON endpoint with the stdlib codec and with
+the fast codec (JSON_CODEC="stdlib" vs "auto"), using the Flask test client against an in-memory
+SQLite database. Routes that are dominated by other work (bcrypt in /user/register and
+/user/login) are listed too, to show how much of their time is JSON.
+
+/user/extract_face_descriptors needs the face-api weights, so its response is measured by
+encoding a typical payload (one descriptor per frame of a 32-frame batch) directly.
+
+Usage (from the server directory):
+    python -m benchmarks.json_codec [--requests N] [--rounds N]
+"""
+
+import argparse
+import os
+import time
+
+os.environ.setdefault("TEST_DATABASE_URL", "sqlite://")
+os.environ.setdefault("TEST_SECRET_KEY", "benchmark-secret-key-benchmark-secret")
+
+import numpy as np  # noqa: E402
+from flask import json  # noqa: E402
+from flask_jwt_extended import create_access_token, create_refresh_token  # noqa: E402
+
+from app import create_app  # noqa: E402
+from database.db import db  # noqa: E402
+from models.user import User  # noqa: E402
+from biometrics.wire import encode_template  # noqa: E402
+
+
+def build_app(codec):
+    """
+    Create a testing app using the given codec, with 200 enrolled users.
+    """
+    app = create_app("testing")
+    app.config["JSON_CODEC"] = codec
+    app.config["ADMIN_EMAILS"] = {"user0@example.com"}
+    from json_provider import init_json
+    init_json(app)
+
+    rng = np.random.default_rng(0)
+    with app.app_context():
+        db.create_all()
+        for idx in range(200):
+            db.session.add(User(
+                username=f"user{idx}", email=f"user{idx}@example.com", password="x", salt="x",
+                user_id=f"uuid-{idx}", biometric_data=encode_template(rng.normal(0, 0.1, 128))))
+        db.session.commit()
+    return app
+
+
+def endpoints(app):
+    """
+    Return (name, request function) pairs for every JSON endpoint.
+    """
+    client = app.test_client()
+    with app.app_context():
+        access = {"Authorization": f"Bearer {create_access_token(identity=1)}"}
+        refresh = {"Authorization": f"Bearer {create_refresh_token(identity=1)}"}
+        probe = np.random.default_rng(1).normal(0, 0.1, 128).tolist()
+        counter = iter(range(10 ** 9))
+
+    def register():
+        idx = next(counter)
+        client.post("/user/register", json={
+            "email": f"new{idx}@example.com", "password": "Passw0rd!", "username": f"new{idx}"})
+
+    return [
+        ("GET /user/details", lambda: client.get("/user/details", headers=access)),
+        ("POST /user/refresh_token",
+         lambda: client.post("/user/refresh_token", headers=refresh)),
+        ("POST /user/register", register),
+        ("POST /user/login", lambda: client.post(
+            "/user/login", json={"usernameEmail": "new0", "password": "Passw0rd!"})),
+        ("POST /user/logout", lambda: client.post("/user/logout")),
+        ("POST /user/store_biometric_data", lambda: client.post(
+            "/user/store_biometric_data", json={"faceData": probe}, headers=access)),
+        ("POST /user/authenticate_with_biometrics", lambda: client.post(
+            "/user/authenticate_with_biometrics", json={"faceData": probe})),
+        ("DELETE /user/delete_account", lambda: client.delete(
+            "/user/delete_account", json={"email": "nobody@example.com"})),
+        ("GET /admin/users (100 rows)",
+         lambda: client.get("/admin/users?limit=100", headers=access)),
+        ("GET /user/start-backend", lambda: client.get("/user/start-backend")),
+    ]
+
+
+def extract_payload(app):
+    """
+    Encode a typical /user/extract_face_descriptors response.
+    """
+    descriptors = list(np.random.default_rng(2).normal(0, 0.1, (32, 128)).astype(np.float32))
+
+    def run():
+        with app.test_request_context():
+            if app.json_encoder.__name__ == "StdlibJSONEncoder":
+                payload = [d.tolist() for d in descriptors]
+            else:
+                payload = descriptors
+            json.dumps({"message": "success", "descriptors": payload})
+    return run
+
+
+def measure(func, requests):
+    func()  # Warm-up
+    start = time.perf_counter()
+    for _ in range(requests):
+        func()
+    return (time.perf_counter() - start) / requests * 1e6
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n\n")[0])
+    parser.add_argument("--requests", type=int, default=200)
+    parser.add_argument("--rounds", type=int, default=5)
+    args = parser.parse_args()
+
+    apps = {codec: build_app(codec) for codec in ("stdlib", "auto")}
+    cases = {codec: endpoints(app) + [("extract_face_descriptors response (32 x 128)",
+                                       extract_payload(app))]
+             for codec, app in apps.items()}
+
+    # Alternate codecs over several rounds and keep the best round, to factor out noise
+    results = {}
+    for _ in range(args.rounds):
+        for codec in apps:
+            for name, func in cases[codec]:
+                # bcrypt makes these slow; fewer iterations give the same picture
+                requests = 3 if name in ("POST /user/register", "POST /user/login") \
+                    else args.requests
+                timing = measure(func, requests)
+                best = results.setdefault(name, {}).get(codec, timing)
+                results[name][codec] = min(best, timing)
+
+    print(f"{'endpoint':<48} {'stdlib us':>10} {'fast us':>10} {'saved us':>9} {'saved':>6}")
+    for name, timings in results.items():
+        saved = timings["stdlib"] - timings["auto"]
+        print(f"{name:<48} {timings['stdlib']:>10.1f} {timings['auto']:>10.1f} "
+              f"{saved:>9.1f} {saved / timings['stdlib']:>6.1%}")
+
+
+if __name__ == "__main__":
+    main()
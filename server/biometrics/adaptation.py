@@ -0,0 +1,294 @@
+"""
+adaptation.py - Adaptive Template Refresh
+
+Faces change over time, so the distance between a user's probes and the template stored at
+enrollment slowly grows toward BIOMETRIC_MATCH_THRESHOLD. When BIOMETRIC_ADAPTIVE_ENABLED is set,
+a successful /user/authenticate_with_biometrics whose distance is at most
+BIOMETRIC_ADAPTIVE_MAX_DISTANCE moves the user's template toward the probe:
+
+    template += rate * (probe - template)
+
+with rate = BIOMETRIC_ADAPTIVE_RATE, capped at MAX_ADAPTIVE_RATE. Replaying one probe must not be
+able to walk a template onto it, so adaptation is bounded three ways:
+- Only high-confidence matches found by a gallery search adapt; probe cache hits do not.
+- A user's template adapts at most once per BIOMETRIC_ADAPTIVE_INTERVAL seconds, across all
+  server processes (`User.biometric_adapted_at`).
+- `User.biometric_drift` adds up the length of every step since enrollment, and the steps stop at
+  BIOMETRIC_ADAPTIVE_MAX_DRIFT. The template therefore never ends up further than that from the
+  enrolled one. A new enrollment resets the drift.
+
+Logins only queue the probe, one per user. A background thread applies the queue every
+BIOMETRIC_ADAPTIVE_FLUSH_INTERVAL seconds, in batches. For each user it reads the stored template
+from the database, blends it, and writes it back only if the stored data is still the data it
+read. So a template re-enrolled, adapted or rotated meanwhile by any process is never overwritten.
+The flusher then refreshes the gallery of this process (`Gallery.refresh`), unless the gallery no
+longer holds the template the blend started from. Other processes see the refreshed template
+when they next reload their gallery (BIOMETRIC_GALLERY_RELOAD_SECONDS). Queued probes are applied
+when the process exits; a crash loses at most one interval of adaptation, never an enrollment.
+"""
+
+import atexit
+import datetime
+import itertools
+import pickle
+import threading
+import time
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import LargeBinary, and_, bindparam, select, type_coerce
+
+from biometrics.engine import DESCRIPTOR_SIZE
+from biometrics.encryption import get_keyring, open_template, seal_template
+from database.db import db
+
+# Upper bound of BIOMETRIC_ADAPTIVE_RATE
+MAX_ADAPTIVE_RATE = 0.5
+
+
+class TemplateUpdater:
+    """
+    Rate-limited, drift-capped, write-behind adaptation of stored templates.
+
+    Attributes:
+        queued (int): Probes queued for adaptation.
+        written (int): Templates adapted in the database.
+        skipped (int): Probes not applied: adapted too recently, drift exhausted, too far from
+            the stored template, stored template undecodable, or the template changed while it
+            was being adapted.
+        failed (int): Probes lost because their batch could not be applied.
+    """
+
+    def __init__(self, app, keyring=None, rate=0.05, max_distance=0.35, max_drift=0.25,
+                 interval=86400.0, flush_interval=30.0, batch_size=500):
+        """
+        :param app: The Flask application, used for database access from the flusher thread.
+        :param keyring: The template keyring, or None to store templates unencrypted.
+        :param rate: Fraction of the way the template moves toward each probe.
+        :param max_distance: Maximum match distance of a probe that adapts the template.
+        :param max_drift: Maximum total distance the template moves from enrollment.
+        :param interval: Minimum seconds between two adaptations of a user's template.
+        :param flush_interval: Seconds between database writes.
+        :param batch_size: Maximum templates per batch.
+        """
+        self.app = app
+        self.keyring = keyring
+        self.rate = min(max(rate, 0.0), MAX_ADAPTIVE_RATE)
+        self.max_distance = max_distance
+        self.max_drift = max_drift
+        self.interval = interval
+        self.flush_interval = flush_interval
+        self.batch_size = batch_size
+        self.queued = 0
+        self.written = 0
+        self.skipped = 0
+        self.failed = 0
+
+        self._pending = {}
+        # When each user's last probe was queued, so a burst of logins queues only one
+        self._last_queued = {}
+        self._lock = threading.Lock()
+        # Held while one batch is applied, so `discard` can wait out an in-flight write
+        self._write_lock = threading.Lock()
+        self._wake = threading.Event()
+        self._thread = None
+        self._closed = False
+
+    def observe(self, gallery, user_id, probe, distance):
+        """
+        Queue the adaptation of a user's template after a successful gallery search.
+
+        :param gallery: The Gallery or ShardedGallery the probe matched in.
+        :param user_id: The matched user's id.
+        :param probe: The probe descriptor.
+        :param distance: The probe's distance to the user's template.
+        :return: True if the probe was queued.
+        """
+        if self._closed or self.rate <= 0 or distance > self.max_distance:
+            return False
+        probe = np.asarray(probe, dtype=np.float32).reshape(DESCRIPTOR_SIZE)
+        now = time.monotonic()
+        with self._lock:
+            last = self._last_queued.get(user_id)
+            if last is not None and now - last < self.interval:
+                return False
+            self._last_queued[user_id] = now
+            self._pending[user_id] = (gallery, probe)
+            self.queued += 1
+        self._ensure_started()
+        return True
+
+    def discard(self, user_id):
+        """
+        Drop a user's queued probe, before the user's template is replaced or deleted.
+
+        Waits for the batch being applied, if any, so that it cannot write an adapted old
+        template; later batches are taken from the queue only after the probe is dropped.
+
+        :param user_id: The user's id.
+        """
+        with self._write_lock:
+            with self._lock:
+                self._pending.pop(user_id, None)
+                self._last_queued.pop(user_id, None)
+
+    def pending(self):
+        """
+        Return the number of queued probes not yet applied.
+        """
+        with self._lock:
+            return len(self._pending)
+
+    def blend(self, template, probe, drift):
+        """
+        Move a template toward a probe, within the remaining drift.
+
+        :param template: The stored template.
+        :param probe: The probe descriptor.
+        :param drift: The template's drift so far.
+        :return: A tuple of (adapted template, length of the step), the step being 0 when the
+            drift is exhausted.
+        """
+        remaining = self.max_drift - drift
+        if remaining <= 0:
+            return template, 0.0
+        step = self.rate * (probe - template)
+        length = float(np.linalg.norm(step))
+        if length > remaining:
+            step *= remaining / length
+            length = remaining
+        return template + step, length
+
+    def _ensure_started(self):
+        # Started on first use so that forking servers start it in each worker
+        if self._thread is None:
+            with self._lock:
+                if self._thread is None:
+                    self._thread = threading.Thread(
+                        target=self._run, name="template-refresh-flusher", daemon=True)
+                    self._thread.start()
+                    atexit.register(self.close)
+
+    def _run(self):
+        while not self._closed:
+            self._wake.wait(self.flush_interval)
+            self.flush()
+
+    def flush(self):
+        """
+        Synchronously apply every queued probe.
+
+        Probes are taken from the queue one batch at a time, and `_write_lock` is held only while
+        that batch is applied, so a large flush never blocks `discard` (and so enrollments) for
+        longer than one batch.
+        """
+        with self._lock:
+            remaining = len(self._pending)
+            cutoff = time.monotonic() - self.interval
+            self._last_queued = {user_id: queued_at
+                                 for user_id, queued_at in self._last_queued.items()
+                                 if queued_at > cutoff}
+        # Probes queued during the flush wait for the next one
+        while remaining > 0:
+            with self._write_lock:
+                with self._lock:
+                    user_ids = list(itertools.islice(
+                        self._pending, min(remaining, self.batch_size)))
+                    batch = {user_id: self._pending.pop(user_id) for user_id in user_ids}
+                if not batch:
+                    return
+                remaining -= len(batch)
+                with self.app.app_context():
+                    self._apply(batch)
+
+    def _apply(self, batch):
+        from models.user import User
+
+        table = User.__table__
+        stored = type_coerce(table.c.biometric_data, LargeBinary)
+        update = table.update().where(and_(
+            table.c.id == bindparam("row_id"),
+            stored == bindparam("old_data", type_=LargeBinary),
+        )).values(biometric_data=bindparam("data"), biometric_key_version=bindparam("version"),
+                  biometric_drift=bindparam("drift"),
+                  biometric_adapted_at=bindparam("adapted_at"))
+        now = datetime.datetime.utcnow()
+        adapted = []
+        try:
+            # A connection of its own to the primary, so that a synchronous flush never touches
+            # the request's session and never reads a lagging replica
+            with db.get_engine(self.app).begin() as connection:
+                rows = connection.execute(select(
+                    table.c.id, table.c.biometric_key_version, stored, table.c.biometric_drift,
+                    table.c.biometric_adapted_at,
+                ).where(table.c.id.in_(list(batch)))).all()
+                for row_id, key_version, pickled, drift, adapted_at in rows:
+                    gallery, probe = batch[row_id]
+                    try:
+                        template = open_template(pickle.loads(pickled), key_version, row_id,
+                                                 self.keyring)
+                    except Exception as e:
+                        # One undecodable template skips its user, not the whole batch
+                        print("Error:", f"Could not decode the template of user {row_id}: {e}")
+                        continue
+                    drift = drift or 0.0
+                    if (template is None or np.linalg.norm(probe - template) > self.max_distance
+                            or (adapted_at is not None
+                                and (now - adapted_at).total_seconds() < self.interval)):
+                        continue
+                    new_template, step = self.blend(template, probe, drift)
+                    if step <= 0:
+                        continue
+                    data, version = seal_template(new_template, row_id, self.keyring)
+                    result = connection.execute(update, {
+                        "row_id": row_id, "old_data": pickled, "data": data, "version": version,
+                        "drift": drift + step, "adapted_at": now})
+                    if result.rowcount == 1:
+                        adapted.append((gallery, row_id, template, new_template))
+        except Exception as e:
+            self.failed += len(batch)
+            print("Error:", f"Could not adapt {len(batch)} templates: {e}")
+            return
+
+        self.written += len(adapted)
+        self.skipped += len(batch) - len(adapted)
+        for gallery, row_id, template, new_template in adapted:
+            gallery.refresh(row_id, new_template, expected=template)
+
+    def close(self, timeout=5.0):
+        """
+        Stop adapting, apply the queued probes and stop the flusher.
+
+        :param timeout: Maximum seconds to wait for the flusher.
+        """
+        if self._closed:
+            return
+        self._closed = True
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        self.flush()
+
+
+def get_template_updater():
+    """
+    Return the adaptive template updater of the current application.
+
+    :return: The application's TemplateUpdater, or None if BIOMETRIC_ADAPTIVE_ENABLED is off.
+    """
+    if not current_app.config.get("BIOMETRIC_ADAPTIVE_ENABLED"):
+        return None
+    updater = current_app.extensions.get("template_updater")
+    if updater is None:
+        config = current_app.config
+        updater = TemplateUpdater(
+            current_app._get_current_object(),
+            keyring=get_keyring(),
+            rate=config.get("BIOMETRIC_ADAPTIVE_RATE", 0.05),
+            max_distance=config.get("BIOMETRIC_ADAPTIVE_MAX_DISTANCE", 0.35),
+            max_drift=config.get("BIOMETRIC_ADAPTIVE_MAX_DRIFT", 0.25),
+            interval=config.get("BIOMETRIC_ADAPTIVE_INTERVAL", 86400.0),
+            flush_interval=config.get("BIOMETRIC_ADAPTIVE_FLUSH_INTERVAL", 30.0),
+            batch_size=config.get("BIOMETRIC_ADAPTIVE_BATCH_SIZE", 500))
+        current_app.extensions["template_updater"] = updater
+    return updater
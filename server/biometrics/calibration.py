@@ -0,0 +1,210 @@
+"""
+calibration.py - Match Threshold Calibration
+
+This module estimates genuine and impostor distance distributions over the enrolled gallery and
+derives ROC/DET curves and thresholds for target false-accept rates (FAR).
+
+All-pairs distances are never materialized. The pair matrix is cut into square tiles, each tile
+is computed with one matrix multiply (|a|^2 + |b|^2 - 2 a.b) and immediately reduced to a fixed
+histogram with `np.bincount`, so memory stays at one tile per worker regardless of gallery size.
+Tiles are spread over a process pool to use every core.
+
+Impostor pairs come from the gallery (one template per user). Genuine pairs need several samples
+of the same identity, so they are read from an optional labelled sample file when present.
+"""
+
+import csv
+import multiprocessing
+import os
+from dataclasses import dataclass
+
+import numpy as np
+
+DEFAULT_BINS = 4000
+DEFAULT_MAX_DISTANCE = 2.0
+DEFAULT_BLOCK_SIZE = 4096
+DEFAULT_TARGET_FARS = (1e-3, 1e-4, 1e-5, 1e-6)
+
+# Per-process state shared with pool workers (inherited on fork)
+_worker_state = {}
+
+
+def _init_worker(descriptors, labels, mode, bins, max_distance):
+    _worker_state.update(descriptors=descriptors, labels=labels, mode=mode,
+                         bins=bins, max_distance=max_distance)
+    _worker_state["norms"] = np.einsum("ij,ij->i", descriptors, descriptors)
+
+
+def _tile_histogram(tile):
+    """
+    Compute the distance histogram of one (row block, column block) tile.
+    """
+    (row_start, row_stop), (col_start, col_stop) = tile
+    state = _worker_state
+    rows = state["descriptors"][row_start:row_stop]
+    cols = state["descriptors"][col_start:col_stop]
+
+    # Work in place on the product to keep one tile-sized buffer per worker
+    distances = rows @ cols.T
+    distances *= -2.0
+    distances += state["norms"][row_start:row_stop, None]
+    distances += state["norms"][None, col_start:col_stop]
+    np.maximum(distances, 0.0, out=distances)
+    np.sqrt(distances, out=distances)
+
+    # Keep each unordered pair once and drop self-pairs on diagonal tiles
+    mask = None
+    if row_start == col_start:
+        mask = np.triu(np.ones(distances.shape, dtype=bool), k=1)
+    labels = state["labels"]
+    if labels is not None:
+        same = labels[row_start:row_stop, None] == labels[None, col_start:col_stop]
+        same = same if state["mode"] == "genuine" else ~same
+        mask = same if mask is None else mask & same
+    if mask is not None:
+        distances = distances[mask]
+
+    distances *= state["bins"] / state["max_distance"]
+    np.minimum(distances, state["bins"] - 1, out=distances)
+    indices = distances.astype(np.intp).ravel()
+    return np.bincount(indices, minlength=state["bins"])
+
+
+def pairwise_histogram(descriptors, labels=None, mode="impostor", bins=DEFAULT_BINS,
+                       max_distance=DEFAULT_MAX_DISTANCE, block_size=DEFAULT_BLOCK_SIZE,
+                       processes=None):
+    """
+    Histogram of pairwise Euclidean distances, computed tile by tile.
+
+    :param descriptors: Array of shape (N, 128).
+    :param labels: Optional identity label per descriptor. Without labels every pair is an
+        impostor pair.
+    :param mode: "impostor" for pairs of different identities, "genuine" for the same identity.
+    :param bins: Number of histogram bins over [0, max_distance]; larger distances fall in the
+        last bin.
+    :param max_distance: Upper edge of the histogram.
+    :param block_size: Side length of a tile.
+    :param processes: Number of worker processes; None uses all cores, 1 runs inline.
+    :return: Array of `bins` pair counts.
+    """
+    descriptors = np.ascontiguousarray(descriptors, dtype=np.float32)
+    labels = None if labels is None else np.asarray(labels)
+    blocks = [(start, min(start + block_size, len(descriptors)))
+              for start in range(0, len(descriptors), block_size)]
+    tiles = [(blocks[i], blocks[j]) for i in range(len(blocks)) for j in range(i, len(blocks))]
+    counts = np.zeros(bins, dtype=np.int64)
+    if mode == "genuine" and labels is None:
+        return counts
+
+    processes = processes or os.cpu_count() or 1
+    init_args = (descriptors, labels, mode, bins, max_distance)
+    if processes == 1 or len(tiles) == 1:
+        _init_worker(*init_args)
+        for tile in tiles:
+            counts += _tile_histogram(tile)
+        return counts
+
+    # Fork shares the descriptor matrix copy-on-write instead of pickling it per worker
+    methods = multiprocessing.get_all_start_methods()
+    context = multiprocessing.get_context("fork" if "fork" in methods else None)
+    with context.Pool(processes, initializer=_init_worker, initargs=init_args) as pool:
+        for tile_counts in pool.imap_unordered(_tile_histogram, tiles, chunksize=4):
+            counts += tile_counts
+    return counts
+
+
+@dataclass
+class CalibrationResult:
+    """
+    Genuine and impostor distance histograms over shared bins.
+
+    Attributes:
+        edges (np.ndarray): Upper edge of each bin, i.e. the candidate thresholds.
+        impostor_counts (np.ndarray): Impostor pair count per bin.
+        genuine_counts (np.ndarray): Genuine pair count per bin (all zero without samples).
+    """
+    edges: np.ndarray
+    impostor_counts: np.ndarray
+    genuine_counts: np.ndarray
+
+    @property
+    def has_genuine(self):
+        return self.genuine_counts.sum() > 0
+
+    def curve(self):
+        """
+        Compute the ROC/DET curve.
+
+        :return: A tuple of (thresholds, far, frr) arrays. A pair matches when its distance is
+            at most the threshold. FRR is NaN without genuine samples.
+        """
+        impostors = max(self.impostor_counts.sum(), 1)
+        far = np.cumsum(self.impostor_counts) / impostors
+        if self.has_genuine:
+            frr = 1.0 - np.cumsum(self.genuine_counts) / self.genuine_counts.sum()
+        else:
+            frr = np.full(len(self.edges), np.nan)
+        return self.edges, far, frr
+
+    def threshold_for_far(self, target_far):
+        """
+        Return the largest threshold whose false-accept rate does not exceed the target.
+
+        :param target_far: The target false-accept rate.
+        :return: A tuple of (threshold, far, frr), or None if no threshold meets the target.
+        """
+        thresholds, far, frr = self.curve()
+        eligible = np.nonzero(far <= target_far)[0]
+        if len(eligible) == 0:
+            return None
+        idx = eligible[-1]
+        return float(thresholds[idx]), float(far[idx]), float(frr[idx])
+
+    def write_csv(self, path):
+        """
+        Write the curve as CSV with threshold, far and frr columns.
+
+        :param path: Output file path.
+        """
+        thresholds, far, frr = self.curve()
+        with open(path, "w", newline="") as output:
+            writer = csv.writer(output)
+            writer.writerow(["threshold", "far", "frr"])
+            for row in zip(thresholds, far, frr):
+                writer.writerow([f"{row[0]:.4f}", f"{row[1]:.6e}", f"{row[2]:.6e}"])
+
+
+def calibrate(templates, samples=None, sample_labels=None, bins=DEFAULT_BINS,
+              max_distance=DEFAULT_MAX_DISTANCE, block_size=DEFAULT_BLOCK_SIZE, processes=None):
+    """
+    Build genuine and impostor distance distributions.
+
+    :param templates: Enrolled gallery templates, one per user, shape (N, 128).
+    :param samples: Optional labelled descriptors with several samples per identity.
+    :param sample_labels: Identity label of each sample.
+    :return: A CalibrationResult.
+    """
+    options = dict(bins=bins, max_distance=max_distance,
+                   block_size=block_size, processes=processes)
+    impostor_counts = np.zeros(bins, dtype=np.int64)
+    genuine_counts = np.zeros(bins, dtype=np.int64)
+
+    if len(templates) > 1:
+        impostor_counts += pairwise_histogram(templates, **options)
+    if samples is not None and len(samples) > 1:
+        genuine_counts += pairwise_histogram(samples, sample_labels, "genuine", **options)
+        impostor_counts += pairwise_histogram(samples, sample_labels, "impostor", **options)
+
+    edges = np.arange(1, bins + 1) * (max_distance / bins)
+    return CalibrationResult(edges, impostor_counts, genuine_counts)
+
+
+def load_samples(path):
+    """
+    Load labelled multi-sample descriptors from an .npz file with "descriptors" and "labels".
+
+    :param path: Path to the .npz file.
+    :return: A tuple of (descriptors, labels).
+    """
+    with np.load(path) as data:
+        return data["descriptors"].astype(np.float32), data["labels"]
@@ -0,0 +1,150 @@
+"""
+cli.py - Biometrics Command-Line Interface
+
+This module registers the `flask biometrics` command group.
+
+Commands:
+- calibrate: Estimate FAR/FRR over the enrolled gallery and recommend match thresholds.
+- rotate-key: Create a new template key version and re-encrypt the stored templates.
+- dedup: Find clusters of accounts enrolled with the same face.
+"""
+
+import json
+
+import click
+import numpy as np
+from flask import current_app
+from flask.cli import AppGroup
+
+from biometrics.calibration import (DEFAULT_BINS, DEFAULT_BLOCK_SIZE, DEFAULT_MAX_DISTANCE,
+                                    DEFAULT_TARGET_FARS, calibrate, load_samples)
+from biometrics.dedup import DEFAULT_DUPLICATE_K, find_duplicate_clusters
+from biometrics.encryption import count_stale_templates, get_keyring, rotate_template_key
+from biometrics.gallery import load_gallery_arrays
+
+biometrics_cli = AppGroup("biometrics", help="Biometric matching maintenance commands.")
+
+
+@biometrics_cli.command("calibrate")
+@click.option("--samples", type=click.Path(exists=True, dir_okay=False),
+              help="Labelled multi-sample descriptors (.npz with 'descriptors' and 'labels') "
+                   "used for genuine pairs.")
+@click.option("--far", "target_fars", type=float, multiple=True,
+              help="Target false-accept rate; may be repeated.")
+@click.option("--output", type=click.Path(dir_okay=False),
+              help="Write the ROC/DET curve (threshold, far, frr) as CSV.")
+@click.option("--block-size", default=DEFAULT_BLOCK_SIZE, show_default=True,
+              help="Templates per tile of the pairwise distance matrix.")
+@click.option("--bins", default=DEFAULT_BINS, show_default=True,
+              help="Histogram bins over [0, --max-distance].")
+@click.option("--max-distance", default=DEFAULT_MAX_DISTANCE, show_default=True)
+@click.option("--processes", type=int, default=None,
+              help="Worker processes (defaults to all cores).")
+def calibrate_command(samples, target_fars, output, block_size, bins, max_distance, processes):
+    """
+    Calibrate BIOMETRIC_MATCH_THRESHOLD against the enrolled gallery.
+    """
+    _, templates = load_gallery_arrays()
+    sample_descriptors, sample_labels = load_samples(samples) if samples else (None, None)
+    click.echo(f"Loaded {len(templates)} enrolled templates"
+               + (f" and {len(sample_descriptors)} labelled samples" if samples else ""))
+
+    result = calibrate(templates, sample_descriptors, sample_labels, bins=bins,
+                       max_distance=max_distance, block_size=block_size, processes=processes)
+    click.echo(f"Impostor pairs: {int(result.impostor_counts.sum())}, "
+               f"genuine pairs: {int(result.genuine_counts.sum())}")
+    if not result.has_genuine:
+        click.echo("No genuine pairs (enrollment stores one template per user); "
+                   "pass --samples to estimate FRR.")
+
+    click.echo(f"{'target FAR':>12} {'threshold':>10} {'FAR':>12} {'FRR':>10}")
+    for target in target_fars or DEFAULT_TARGET_FARS:
+        recommended = result.threshold_for_far(target)
+        if recommended is None:
+            click.echo(f"{target:>12.0e} {'-':>10} {'-':>12} {'-':>10}")
+            continue
+        threshold, far, frr = recommended
+        click.echo(f"{target:>12.0e} {threshold:>10.4f} {far:>12.3e} {frr:>10.4f}")
+
+    current = current_app.config.get("BIOMETRIC_MATCH_THRESHOLD")
+    if current is not None:
+        thresholds, far, frr = result.curve()
+        idx = min(np.searchsorted(thresholds, current), len(thresholds) - 1)
+        click.echo(f"Current BIOMETRIC_MATCH_THRESHOLD={current}: "
+                   f"FAR {far[idx]:.3e}, FRR {frr[idx]:.4f}")
+
+    if output:
+        result.write_csv(output)
+        click.echo(f"Wrote ROC/DET curve to {output}")
+
+
+@biometrics_cli.command("rotate-key")
+@click.option("--batch-size", default=1000, show_default=True,
+              help="Templates re-encrypted per transaction.")
+@click.option("--pause", default=0.0, show_default=True,
+              help="Seconds to sleep between batches.")
+@click.option("--workers", default=4, show_default=True,
+              help="Threads decrypting each batch.")
+@click.option("--resume", is_flag=True,
+              help="Finish re-encrypting with the active key instead of creating a new one.")
+def rotate_key_command(batch_size, pause, workers, resume):
+    """
+    Rotate the template data key and re-encrypt every stored template with it.
+    """
+    keyring = get_keyring()
+    if keyring is None:
+        raise click.ClickException("TEMPLATE_MASTER_KEY is not set")
+
+    rotated = 0
+    for rotated in rotate_template_key(keyring, batch_size=batch_size, new_key=not resume,
+                                       pause=pause, workers=workers):
+        click.echo(f"Re-encrypted {rotated} templates with key version {keyring.active_version}")
+    click.echo(f"Done: {rotated} templates re-encrypted with key version "
+               f"{keyring.active_version}")
+
+    # Templates stored by processes that have not yet picked up the new key
+    stale = count_stale_templates(keyring.active_version)
+    if stale:
+        click.echo(f"{stale} templates still use an older key; run again with --resume after "
+                   f"TEMPLATE_KEY_REFRESH_SECONDS.")
+
+
+@biometrics_cli.command("dedup")
+@click.option("--threshold", type=float, default=None,
+              help="Maximum distance counted as the same face "
+                   "(defaults to BIOMETRIC_DUPLICATE_THRESHOLD).")
+@click.option("--k", "k", default=DEFAULT_DUPLICATE_K, show_default=True,
+              help="Maximum suspect pairs kept per account.")
+@click.option("--output", type=click.Path(dir_okay=False),
+              help="Write the clusters as JSON lines.")
+@click.option("--block-size", default=DEFAULT_BLOCK_SIZE, show_default=True,
+              help="Templates per tile of the pairwise distance matrix.")
+@click.option("--processes", type=int, default=None,
+              help="Worker processes (defaults to all cores).")
+def dedup_command(threshold, k, output, block_size, processes):
+    """
+    Find clusters of accounts whose enrolled templates are near-duplicates.
+    """
+    if threshold is None:
+        threshold = current_app.config["BIOMETRIC_DUPLICATE_THRESHOLD"]
+    if threshold <= 0:
+        raise click.ClickException("The duplicate threshold must be positive")
+
+    user_ids, templates = load_gallery_arrays()
+    click.echo(f"Scanning {len(templates)} enrolled templates at threshold {threshold}")
+    clusters = find_duplicate_clusters(user_ids, templates, threshold, k=k,
+                                       block_size=block_size, processes=processes)
+    click.echo(f"Found {len(clusters)} clusters covering "
+               f"{sum(len(cluster.user_ids) for cluster in clusters)} accounts")
+
+    for cluster in clusters[:20]:
+        closest = cluster.pairs[0][2]
+        click.echo(f"{len(cluster.user_ids):>4} accounts, closest {closest:.4f}: "
+                   + ", ".join(str(user_id) for user_id in cluster.user_ids[:10])
+                   + (" ..." if len(cluster.user_ids) > 10 else ""))
+
+    if output:
+        with open(output, "w") as handle:
+            for cluster in clusters:
+                handle.write(json.dumps(cluster.to_dict()) + "\n")
+        click.echo(f"Wrote clusters to {output}")
@@ -0,0 +1,224 @@
+"""
+dedup.py - Duplicate Face Detection
+
+This module finds faces enrolled on more than one account.
+
+At enrollment, `find_duplicate` asks the gallery for the nearest template of another user; a
+template closer than BIOMETRIC_DUPLICATE_THRESHOLD is refused by /user/store_biometric_data.
+This check is best-effort. Within one process, `enrollment_lock` makes the check and the gallery
+update atomic. But each server process has its own gallery, which only sees other processes'
+enrollments after its next reload (BIOMETRIC_GALLERY_RELOAD_SECONDS). Two accounts enrolling the
+same face on different processes within that window can both be accepted. The offline scan below
+(`flask biometrics dedup`, run periodically) is what finds them.
+
+Offline, `find_duplicate_clusters` scans every pair of the enrolled gallery. As in calibration.py,
+the pair matrix is cut into square tiles computed with one matrix multiply each, so memory stays at
+one tile per worker. Near-duplicates are rare, so each tile only yields its few pairs under the
+threshold, and the scan keeps a streaming top-k of the nearest suspects per template: a template
+that is close to thousands of others (such as a blank face) cannot grow the result beyond k pairs
+per account. Suspect pairs are joined into clusters of accounts sharing one face.
+"""
+
+import multiprocessing
+import os
+import threading
+from dataclasses import dataclass
+
+import numpy as np
+
+from biometrics.calibration import DEFAULT_BLOCK_SIZE
+
+DEFAULT_DUPLICATE_K = 5
+
+# Candidate pairs buffered before they are reduced to the top k per template
+COMPACT_PAIRS = 1_000_000
+
+# Per-process state shared with pool workers (inherited on fork)
+_worker_state = {}
+
+# Held from the duplicate check of an enrollment until its template is in the gallery
+enrollment_lock = threading.Lock()
+
+
+def find_duplicate(gallery, descriptor, threshold, user_id=None):
+    """
+    Find the nearest enrolled template of another user within a distance threshold.
+
+    :param gallery: The Gallery or ShardedGallery to search.
+    :param descriptor: The 128-d template being enrolled.
+    :param threshold: Maximum distance counted as the same face; 0 disables the check.
+    :param user_id: The enrolling user, whose own template is ignored.
+    :return: A tuple of (user_id, distance), or None if no other account is that close.
+    """
+    if threshold <= 0 or len(gallery) == 0:
+        return None
+    user_ids, distances = gallery.search(descriptor, k=2)
+    for match_id, distance in zip(user_ids[0], distances[0]):
+        if int(match_id) != user_id and distance <= threshold:
+            return int(match_id), float(distance)
+    return None
+
+
+@dataclass
+class DuplicateCluster:
+    """
+    Accounts whose templates are near-duplicates of each other.
+
+    Attributes:
+        user_ids (list): The user ids in the cluster, ascending.
+        pairs (list): The suspect pairs linking them, as (user_id, user_id, distance) tuples.
+    """
+    user_ids: list
+    pairs: list
+
+    def to_dict(self):
+        return {"user_ids": self.user_ids,
+                "pairs": [[a, b, round(distance, 4)] for a, b, distance in self.pairs]}
+
+
+def _init_worker(templates, squared_threshold):
+    _worker_state.update(templates=templates, squared_threshold=squared_threshold)
+    _worker_state["norms"] = np.einsum("ij,ij->i", templates, templates)
+
+
+def _tile_pairs(tile):
+    """
+    Return the pairs of one (row block, column block) tile within the threshold.
+    """
+    (row_start, row_stop), (col_start, col_stop) = tile
+    state = _worker_state
+    rows = state["templates"][row_start:row_stop]
+    cols = state["templates"][col_start:col_stop]
+
+    distances = rows @ cols.T
+    distances *= -2.0
+    distances += state["norms"][row_start:row_stop, None]
+    distances += state["norms"][None, col_start:col_stop]
+
+    close = distances <= state["squared_threshold"]
+    if row_start == col_start:
+        # Keep each unordered pair once and drop self-pairs on diagonal tiles
+        close &= np.triu(np.ones(close.shape, dtype=bool), k=1)
+    row_idx, col_idx = np.nonzero(close)
+    squared = np.maximum(distances[row_idx, col_idx], 0.0)
+    return row_idx + row_start, col_idx + col_start, squared
+
+
+def _top_k(rows, cols, squared, k):
+    """
+    Keep the k nearest columns of each row.
+    """
+    order = np.lexsort((squared, rows))
+    rows, cols, squared = rows[order], cols[order], squared[order]
+    starts = np.r_[0, np.flatnonzero(np.diff(rows)) + 1]
+    rank = np.arange(len(rows)) - np.repeat(starts, np.diff(np.r_[starts, len(rows)]))
+    keep = rank < k
+    return rows[keep], cols[keep], squared[keep]
+
+
+class _TopK:
+    """
+    Streaming top-k of the suspect pairs of every template.
+    """
+
+    def __init__(self, k):
+        self.k = k
+        self._parts = []
+        self._pending = 0
+
+    def add(self, rows, cols, squared):
+        if len(rows) == 0:
+            return
+        # Each pair is a suspect of both of its templates
+        self._parts.append((np.concatenate([rows, cols]), np.concatenate([cols, rows]),
+                            np.concatenate([squared, squared])))
+        self._pending += 2 * len(rows)
+        if self._pending >= COMPACT_PAIRS:
+            self._compact()
+
+    def _compact(self):
+        if len(self._parts) > 1:
+            merged = tuple(np.concatenate(part) for part in zip(*self._parts))
+            self._parts = [_top_k(*merged, self.k)]
+        elif self._parts:
+            self._parts = [_top_k(*self._parts[0], self.k)]
+        self._pending = len(self._parts[0][0]) if self._parts else 0
+
+    def result(self):
+        self._compact()
+        if not self._parts:
+            empty = np.empty(0, dtype=np.intp)
+            return empty, empty, np.empty(0, dtype=np.float32)
+        return self._parts[0]
+
+
+def _clusters(user_ids, rows, cols, squared):
+    """
+    Join suspect pairs into connected clusters of accounts.
+    """
+    parent = {}
+
+    def find(node):
+        root = node
+        while parent.get(root, root) != root:
+            root = parent[root]
+        while node != root:
+            parent[node], node = root, parent.get(node, node)
+        return root
+
+    pairs = {}
+    for row, col, value in zip(rows.tolist(), cols.tolist(), squared.tolist()):
+        a, b = (row, col) if row < col else (col, row)
+        pairs[(a, b)] = value
+        root_a, root_b = find(a), find(b)
+        if root_a != root_b:
+            parent[max(root_a, root_b)] = min(root_a, root_b)
+
+    members, links = {}, {}
+    for (a, b), value in pairs.items():
+        root = find(a)
+        members.setdefault(root, set()).update((a, b))
+        links.setdefault(root, []).append(
+            (int(user_ids[a]), int(user_ids[b]), float(np.sqrt(value))))
+
+    clusters = [DuplicateCluster(sorted(int(user_ids[idx]) for idx in members[root]),
+                                 sorted(links[root], key=lambda pair: pair[2]))
+                for root in members]
+    clusters.sort(key=lambda cluster: (-len(cluster.user_ids), cluster.user_ids[0]))
+    return clusters
+
+
+def find_duplicate_clusters(user_ids, templates, threshold, k=DEFAULT_DUPLICATE_K,
+                            block_size=DEFAULT_BLOCK_SIZE, processes=None):
+    """
+    Scan every pair of enrolled templates for near-duplicates.
+
+    :param user_ids: The user id of each template, shape (N,).
+    :param templates: Enrolled templates, shape (N, 128).
+    :param threshold: Maximum distance counted as the same face.
+    :param k: Maximum suspect pairs kept per template.
+    :param block_size: Side length of a tile.
+    :param processes: Number of worker processes; None uses all cores, 1 runs inline.
+    :return: A list of DuplicateCluster, largest first.
+    """
+    templates = np.ascontiguousarray(templates, dtype=np.float32)
+    blocks = [(start, min(start + block_size, len(templates)))
+              for start in range(0, len(templates), block_size)]
+    tiles = [(blocks[i], blocks[j]) for i in range(len(blocks)) for j in range(i, len(blocks))]
+    top_k = _TopK(k)
+
+    processes = processes or os.cpu_count() or 1
+    init_args = (templates, np.float32(threshold) ** 2)
+    if processes == 1 or len(tiles) <= 1:
+        _init_worker(*init_args)
+        for tile in tiles:
+            top_k.add(*_tile_pairs(tile))
+    else:
+        # Fork shares the template matrix copy-on-write instead of pickling it per worker
+        methods = multiprocessing.get_all_start_methods()
+        context = multiprocessing.get_context("fork" if "fork" in methods else None)
+        with context.Pool(processes, initializer=_init_worker, initargs=init_args) as pool:
+            for pairs in pool.imap_unordered(_tile_pairs, tiles, chunksize=4):
+                top_k.add(*pairs)
+
+    return _clusters(np.asarray(user_ids), *top_k.result())
@@ -0,0 +1,375 @@
+"""
+encryption.py - Encrypted Biometric Templates
+
+This module encrypts the templates stored in `User.biometric_data` with envelope encryption:
+- Templates are sealed with AES-256-GCM under a versioned data key. The associated data binds
+  each ciphertext to its user row, so a template copied onto another user fails to decrypt.
+- Data keys are stored in the `template_key` table wrapped (encrypted) by the master key from
+  TEMPLATE_MASTER_KEY, which never reaches the database.
+- Every sealed template, and its row's `biometric_key_version` column, carries the version of the
+  data key that sealed it.
+
+Sealed template layout:
+    magic (2s) = b"TE", format (B) = 1, key version (H), nonce (12 bytes),
+    ciphertext of the 512-byte float32 template followed by the 16-byte tag.
+
+Without TEMPLATE_MASTER_KEY, templates are stored unencrypted as before (`biometric_key_version`
+NULL), and `rotate_template_key` encrypts them once a master key is configured.
+
+Gallery loading decodes whole row batches into preallocated NumPy arrays on a thread pool
+(`open_template_rows`), overlapping decryption with fetching the next batch; data keys are
+unwrapped once per version, so each row costs one AES-GCM decryption of about 2 us. Key rotation
+creates a new data key version and re-encrypts the templates in keyset-paginated batches
+(`rotate_template_key`, run by `flask biometrics rotate-key`).
+"""
+
+import base64
+import os
+import pickle
+import struct
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from flask import current_app
+from sqlalchemy import LargeBinary, and_, bindparam, exc, func, or_, select, type_coerce
+
+from biometrics.engine import DESCRIPTOR_SIZE
+from biometrics.wire import TEMPLATE_DTYPE, decode_template, encode_template
+from database.db import db
+from models.template_key import TemplateKey
+
+try:
+    from cryptography.exceptions import InvalidTag
+    from cryptography.hazmat.primitives.ciphers.aead import AESGCM
+except ImportError:  # pragma: no cover - depends on the environment
+    AESGCM = None
+
+SEALED_HEADER = struct.Struct("<2sBH")
+SEALED_MAGIC = b"TE"
+SEALED_FORMAT = 1
+NONCE_SIZE = 12
+ROW_ID = struct.Struct("<q")
+TEMPLATE_SIZE = DESCRIPTOR_SIZE * TEMPLATE_DTYPE.itemsize
+
+
+class TemplateKeyError(Exception):
+    """
+    Raised when a template cannot be sealed or opened with the available keys.
+    """
+
+
+class TemplateKeyring:
+    """
+    The unwrapped template data keys, loaded from the `template_key` table.
+
+    Attributes:
+        active_version (int): The version sealing new templates, or None before the first key.
+    """
+
+    def __init__(self, engine, master_key, refresh_seconds=60.0):
+        """
+        :param engine: The primary database engine.
+        :param master_key: The 32-byte master key.
+        :param refresh_seconds: Seconds after which a new active version is picked up.
+        """
+        if AESGCM is None:
+            raise RuntimeError("TEMPLATE_MASTER_KEY is set but cryptography is not installed")
+        self.engine = engine
+        self.refresh_seconds = refresh_seconds
+        self.active_version = None
+        self._master = AESGCM(master_key)
+        self._keys = {}
+        self._lock = threading.Lock()
+        self._loaded_at = float("-inf")
+
+    @staticmethod
+    def _wrap_aad(version):
+        return b"template-key:%d" % version
+
+    def refresh(self):
+        """
+        Load the key versions created since the last refresh.
+        """
+        table = TemplateKey.__table__
+        with self.engine.connect() as connection:
+            rows = connection.execute(
+                select(table.c.version, table.c.wrapped_key).order_by(table.c.version)).fetchall()
+        with self._lock:
+            for version, wrapped in rows:
+                if version not in self._keys:
+                    key = self._master.decrypt(wrapped[:NONCE_SIZE], wrapped[NONCE_SIZE:],
+                                               self._wrap_aad(version))
+                    self._keys[version] = AESGCM(key)
+            self.active_version = max(self._keys, default=None)
+            self._loaded_at = time.monotonic()
+
+    def create_version(self):
+        """
+        Create, wrap and store a new data key, which becomes the active version.
+
+        :return: The new version.
+        """
+        self.refresh()
+        version = (self.active_version or 0) + 1
+        nonce = os.urandom(NONCE_SIZE)
+        wrapped = nonce + self._master.encrypt(
+            nonce, AESGCM.generate_key(bit_length=256), self._wrap_aad(version))
+        try:
+            with self.engine.begin() as connection:
+                connection.execute(TemplateKey.__table__.insert(),
+                                   {"version": version, "wrapped_key": wrapped})
+        except exc.IntegrityError:
+            # Another process created this version first; use theirs
+            pass
+        self.refresh()
+        return self.active_version
+
+    def active(self):
+        """
+        Return the data key sealing new templates, creating the first one if needed.
+
+        :return: A tuple of (version, AESGCM).
+        """
+        if time.monotonic() - self._loaded_at > self.refresh_seconds:
+            self.refresh()
+        if self.active_version is None:
+            self.create_version()
+        version = self.active_version
+        return version, self._keys[version]
+
+    def key(self, version):
+        """
+        Return the data key of a version.
+
+        :param version: The key version.
+        :return: An AESGCM instance.
+        :raises TemplateKeyError: If the version does not exist.
+        """
+        aead = self._keys.get(version)
+        if aead is None:
+            self.refresh()
+            aead = self._keys.get(version)
+            if aead is None:
+                raise TemplateKeyError(f"Unknown template key version: {version}")
+        return aead
+
+
+def get_keyring():
+    """
+    Return the template keyring of the current application.
+
+    :return: The application's TemplateKeyring, or None if TEMPLATE_MASTER_KEY is not set.
+    """
+    if "template_keyring" not in current_app.extensions:
+        master_key = current_app.config.get("TEMPLATE_MASTER_KEY")
+        keyring = None
+        if master_key:
+            keyring = TemplateKeyring(
+                db.get_engine(current_app), base64.b64decode(master_key),
+                current_app.config.get("TEMPLATE_KEY_REFRESH_SECONDS", 60.0))
+        current_app.extensions["template_keyring"] = keyring
+    return current_app.extensions["template_keyring"]
+
+
+def _seal(version, aead, descriptor, row_id):
+    header = SEALED_HEADER.pack(SEALED_MAGIC, SEALED_FORMAT, version)
+    nonce = os.urandom(NONCE_SIZE)
+    return header + nonce + aead.encrypt(nonce, encode_template(descriptor),
+                                         header + ROW_ID.pack(row_id))
+
+
+def seal_template(descriptor, row_id, keyring=None):
+    """
+    Encode a descriptor for storage in `User.biometric_data`, encrypted when a master key is set.
+
+    :param descriptor: Array-like of 128 values.
+    :param row_id: The user's id (`User.id`), bound to the ciphertext.
+    :param keyring: The keyring; defaults to the current application's.
+    :return: A tuple of (data, key version), the version being None for unencrypted data.
+    """
+    keyring = keyring or get_keyring()
+    if keyring is None:
+        return encode_template(descriptor), None
+    version, aead = keyring.active()
+    return _seal(version, aead, descriptor, row_id), version
+
+
+def _open_bytes(data, key_version, row_id, keyring):
+    # The raw float32 bytes of a stored template, or None if the data is not a template
+    if key_version is None:
+        if not isinstance(data, (bytes, bytearray, memoryview)) or len(data) != TEMPLATE_SIZE:
+            return None
+        return bytes(data)
+    if keyring is None:
+        raise TemplateKeyError("Template is encrypted but TEMPLATE_MASTER_KEY is not set")
+    data = bytes(data)
+    if len(data) < SEALED_HEADER.size + NONCE_SIZE:
+        raise TemplateKeyError("Malformed encrypted template")
+    header = data[:SEALED_HEADER.size]
+    magic, sealed_format, version = SEALED_HEADER.unpack(header)
+    if magic != SEALED_MAGIC or sealed_format != SEALED_FORMAT or version != key_version:
+        raise TemplateKeyError("Malformed encrypted template")
+    nonce = data[SEALED_HEADER.size:SEALED_HEADER.size + NONCE_SIZE]
+    try:
+        plain = keyring.key(version).decrypt(
+            nonce, data[SEALED_HEADER.size + NONCE_SIZE:], header + ROW_ID.pack(row_id))
+    except InvalidTag:
+        raise TemplateKeyError("Template failed authentication")
+    return plain if len(plain) == TEMPLATE_SIZE else None
+
+
+def open_template(data, key_version, row_id, keyring):
+    """
+    Decode a template stored in `User.biometric_data`.
+
+    :param data: The stored data.
+    :param key_version: The row's `biometric_key_version`.
+    :param row_id: The user's id.
+    :param keyring: The keyring, or None when no master key is set.
+    :return: A float32 array of 128 values, or None if the data is not a template.
+    :raises TemplateKeyError: If an encrypted template cannot be decrypted.
+    """
+    return decode_template(_open_bytes(data, key_version, row_id, keyring))
+
+
+def template_rows_select():
+    """
+    Return the statement reading enrolled templates for bulk decoding.
+
+    The pickled column is read as raw bytes so that unpickling happens on the worker threads.
+
+    :return: A select of (id, biometric_key_version, pickled biometric_data) rows ordered by id.
+    """
+    from models.user import User
+
+    return select(
+        User.id, User.biometric_key_version, type_coerce(User.biometric_data, LargeBinary)
+    ).where(User.biometric_data.isnot(None)).order_by(User.id)
+
+
+def open_template_rows(rows, keyring, user_ids, templates, valid, start=0):
+    """
+    Decode a batch of template rows into preallocated arrays.
+
+    :param rows: Rows from `template_rows_select`.
+    :param keyring: The keyring, or None when no master key is set.
+    :param user_ids: Int64 output array of user ids.
+    :param templates: Float32 output array of shape (N, 128).
+    :param valid: Bool output array, set False for rows that are not valid templates.
+    :param start: The output index of the first row.
+    """
+    plain = []
+    for row_id, key_version, pickled in rows:
+        try:
+            plain.append(_open_bytes(pickle.loads(pickled), key_version, row_id, keyring))
+        except Exception as e:
+            print("Error:", f"Could not decode the template of user {row_id}: {e}")
+            plain.append(None)
+
+    # One copy of the whole batch into the output rather than one per row
+    stop = start + len(rows)
+    user_ids[start:stop] = [row[0] for row in rows]
+    decoded = [index for index, data in enumerate(plain) if data is not None]
+    valid[start:stop] = False
+    valid[start + np.array(decoded, dtype=np.int64)] = True
+    values = np.frombuffer(b"".join(plain[index] for index in decoded), dtype=TEMPLATE_DTYPE)
+    if len(decoded) == len(rows):
+        templates[start:stop] = values.reshape(-1, DESCRIPTOR_SIZE)
+    elif decoded:
+        templates[start + np.array(decoded)] = values.reshape(-1, DESCRIPTOR_SIZE)
+
+
+def rotate_template_key(keyring, batch_size=1000, new_key=True, pause=0.0, workers=1):
+    """
+    Re-encrypt every template not sealed with the active key version, in batches.
+
+    Rows are read in keyset-paginated batches by id and each batch is committed on its own, so
+    the job can run alongside the application and be stopped and resumed at any time. A row is
+    only updated if its stored data is unchanged since it was read, so a template re-enrolled
+    concurrently is never overwritten. Rows are read from the primary database, never from a
+    read replica, whose lagging data would make those updates miss.
+
+    :param keyring: The keyring.
+    :param batch_size: Rows per batch.
+    :param new_key: Create a new data key version first.
+    :param pause: Seconds to sleep between batches, to limit the load on the database.
+    :param workers: Threads decrypting each batch.
+    :return: A generator of the running count of re-encrypted templates after each batch.
+    """
+    from models.user import User
+
+    version = keyring.create_version() if new_key else keyring.active()[0]
+    table = User.__table__
+    update = table.update().where(and_(
+        table.c.id == bindparam("row_id"),
+        type_coerce(table.c.biometric_data, LargeBinary) == bindparam("old_data", type_=LargeBinary),
+    )).values(biometric_data=bindparam("data"), biometric_key_version=bindparam("version"))
+
+    with ThreadPoolExecutor(workers) as pool:
+        yield from _rotate_batches(keyring, version, update, batch_size, pause, pool, workers)
+
+
+def _rotate_batches(keyring, version, update, batch_size, pause, pool, workers):
+    from models.user import User
+
+    aead = keyring.key(version)
+    primary = {"bind": db.get_engine()}
+    last_id, rotated = 0, 0
+    while True:
+        rows = db.session.execute(template_rows_select().where(
+            User.id > last_id,
+            or_(User.biometric_key_version.is_(None), User.biometric_key_version != version),
+        ).limit(batch_size), bind_arguments=primary).all()
+        if not rows:
+            return
+
+        count = len(rows)
+        user_ids = np.empty(count, dtype=np.int64)
+        templates = np.empty((count, DESCRIPTOR_SIZE), dtype=np.float32)
+        valid = np.zeros(count, dtype=bool)
+        chunk = -(-count // workers)
+        list(pool.map(
+            lambda start: open_template_rows(
+                rows[start:start + chunk], keyring, user_ids, templates, valid, start),
+            range(0, count, chunk)))
+
+        params = [{"row_id": int(row_id), "old_data": pickled,
+                   "data": _seal(version, aead, templates[index], int(row_id)),
+                   "version": version}
+                  for index, (row_id, _, pickled) in enumerate(rows) if valid[index]]
+        if params:
+            result = db.session.execute(update, params)
+            rotated += max(result.rowcount, 0) if result.rowcount is not None else len(params)
+        db.session.commit()
+        last_id = rows[-1][0]
+        yield rotated
+        if pause:
+            time.sleep(pause)
+
+
+def count_templates():
+    """
+    Count the enrolled templates.
+
+    :return: The number of rows with a template.
+    """
+    from models.user import User
+
+    return db.session.query(func.count(User.id)).filter(User.biometric_data.isnot(None)).scalar()
+
+
+def count_stale_templates(version):
+    """
+    Count the templates not sealed with a key version, on the primary database.
+
+    :param version: The key version.
+    :return: The number of rows still to re-encrypt.
+    """
+    from models.user import User
+
+    return db.session.execute(select(func.count(User.id)).where(
+        User.biometric_data.isnot(None),
+        or_(User.biometric_key_version.is_(None), User.biometric_key_version != version),
+    ), bind_arguments={"bind": db.get_engine()}).scalar()
@@ -0,0 +1,672 @@
+"""
+engine.py - Face Descriptor Extraction Engine
+
+This module runs the face-api.js networks shipped in `client/face-api` on the CPU with NumPy,
+so the server can compute the same 128-d face descriptors that `captureAndEncodeFace` produces
+in the browser. Frames are processed in batches and every convolution is lowered to a single
+matrix multiply (im2col) or a handful of vectorized multiply-adds, so throughput comes from BLAS
+rather than Python loops.
+
+The pipeline mirrors `detectAllFaces(...).withFaceLandmarks().withFaceDescriptors()`:
+- TinyFaceDetector: locates faces in each frame.
+- FaceLandmark68Net: predicts 68 landmarks for every detected face.
+- FaceRecognitionNet: encodes the dlib-aligned face crops into 128-d descriptors.
+"""
+
+import io
+import json
+import os
+from dataclasses import dataclass
+
+import numpy as np
+from numpy.lib.stride_tricks import sliding_window_view
+
+# Default location of the face-api.js weight manifests and shards
+DEFAULT_MODEL_DIR = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "..", "..", "client", "face-api")
+
+# Constants taken from face-api.js
+DETECTOR_MEAN_RGB = np.array([117.001, 114.697, 97.404], dtype=np.float32)
+FACE_MEAN_RGB = np.array([122.782, 117.001, 104.298], dtype=np.float32)
+DETECTOR_ANCHORS = np.array([
+    [1.603231, 2.094468],
+    [6.041143, 7.080126],
+    [2.882459, 3.518061],
+    [4.266906, 5.178857],
+    [9.041765, 10.66308],
+], dtype=np.float32)
+DETECTOR_IOU_THRESHOLD = 0.4
+DLIB_ALIGN_REL_X = 0.5
+DLIB_ALIGN_REL_Y = 0.43
+DLIB_ALIGN_REL_SCALE = 0.45
+
+DESCRIPTOR_SIZE = 128
+
+
+def load_weight_map(model_dir, model_name):
+    """
+    Load the weights of a face-api.js model from its manifest and binary shards.
+
+    :param model_dir: Directory containing the manifest and shard files.
+    :param model_name: The model name, e.g. "tiny_face_detector_model".
+    :return: A dictionary mapping weight names to float32 NumPy arrays.
+    :raises FileNotFoundError: If the manifest or one of its shards is missing.
+    """
+    manifest_path = os.path.join(model_dir, f"{model_name}-weights_manifest.json")
+    with open(manifest_path) as manifest_file:
+        manifest = json.load(manifest_file)
+
+    weight_map = {}
+    for group in manifest:
+        # Shards of a group are a single buffer split into files
+        buffers = []
+        for path in group["paths"]:
+            with open(os.path.join(model_dir, path), "rb") as shard:
+                buffers.append(shard.read())
+        buffer = b"".join(buffers)
+
+        offset = 0
+        for spec in group["weights"]:
+            size = int(np.prod(spec["shape"]))
+            quantization = spec.get("quantization")
+            if quantization:
+                # Quantized weights are stored as uint8 and dequantized with scale and min
+                values = np.frombuffer(buffer, dtype=np.uint8, count=size, offset=offset)
+                values = values.astype(np.float32) * \
+                    quantization["scale"] + quantization["min"]
+                offset += size
+            else:
+                values = np.frombuffer(buffer, dtype="<f4", count=size, offset=offset)
+                offset += size * 4
+            weight_map[spec["name"]] = values.astype(
+                np.float32).reshape(spec["shape"])
+
+    return weight_map
+
+
+def _same_padding(size, kernel, stride):
+    """
+    Compute TensorFlow 'same' padding for one spatial dimension.
+
+    :return: A (before, after) padding tuple.
+    """
+    out_size = -(-size // stride)
+    total = max((out_size - 1) * stride + kernel - size, 0)
+    return total // 2, total - total // 2
+
+
+def _pad(x, kernel, stride, padding, value=0.0):
+    """
+    Pad an NHWC batch for a windowed operation.
+    """
+    if padding != "same":
+        return x
+    pad_h = _same_padding(x.shape[1], kernel[0], stride)
+    pad_w = _same_padding(x.shape[2], kernel[1], stride)
+    if pad_h == (0, 0) and pad_w == (0, 0):
+        return x
+    return np.pad(x, ((0, 0), pad_h, pad_w, (0, 0)), constant_values=value)
+
+
+def conv2d(x, filters, stride=1, padding="same"):
+    """
+    2D convolution of an NHWC batch using im2col and a single matrix multiply.
+
+    :param x: Input batch of shape (N, H, W, C).
+    :param filters: Filters of shape (KH, KW, C, O).
+    :param stride: Stride applied to both spatial dimensions.
+    :param padding: "same" or "valid".
+    :return: Output batch of shape (N, H', W', O).
+    """
+    kh, kw, channels_in, channels_out = filters.shape
+    if kh == 1 and kw == 1:
+        return x[:, ::stride, ::stride, :] @ filters[0, 0]
+
+    x = _pad(x, (kh, kw), stride, padding)
+    windows = sliding_window_view(x, (kh, kw), axis=(1, 2))[
+        :, ::stride, ::stride]
+    n, out_h, out_w = windows.shape[:3]
+    # (N, H', W', C, KH, KW) -> (N, H', W', KH, KW, C) to match the filter layout
+    cols = windows.transpose(0, 1, 2, 4, 5, 3).reshape(
+        n * out_h * out_w, kh * kw * channels_in)
+    out = cols @ filters.reshape(kh * kw * channels_in, channels_out)
+    return out.reshape(n, out_h, out_w, channels_out)
+
+
+def depthwise_conv2d(x, filters, stride=1, padding="same"):
+    """
+    Depthwise 2D convolution of an NHWC batch, accumulated one kernel tap at a time.
+
+    :param x: Input batch of shape (N, H, W, C).
+    :param filters: Filters of shape (KH, KW, C, 1).
+    :param stride: Stride applied to both spatial dimensions.
+    :param padding: "same" or "valid".
+    :return: Output batch of shape (N, H', W', C).
+    """
+    kh, kw = filters.shape[:2]
+    x = _pad(x, (kh, kw), stride, padding)
+    out_h = (x.shape[1] - kh) // stride + 1
+    out_w = (x.shape[2] - kw) // stride + 1
+
+    out = np.zeros((x.shape[0], out_h, out_w, x.shape[3]), dtype=np.float32)
+    for i in range(kh):
+        for j in range(kw):
+            tap = x[:, i:i + (out_h - 1) * stride + 1:stride,
+                    j:j + (out_w - 1) * stride + 1:stride, :]
+            out += tap * filters[i, j, :, 0]
+    return out
+
+
+def separable_conv2d(x, depthwise_filter, pointwise_filter, stride=1, padding="same"):
+    """
+    Depthwise separable convolution (depthwise followed by a 1x1 pointwise convolution).
+    """
+    out = depthwise_conv2d(x, depthwise_filter, stride, padding)
+    return out @ pointwise_filter[0, 0]
+
+
+def max_pool(x, size, stride, padding="valid"):
+    """
+    Max pooling of an NHWC batch.
+    """
+    x = _pad(x, (size, size), stride, padding, value=-np.inf)
+    windows = sliding_window_view(x, (size, size), axis=(1, 2))[
+        :, ::stride, ::stride]
+    return windows.max(axis=(-2, -1))
+
+
+def avg_pool(x, size, stride):
+    """
+    Average pooling of an NHWC batch with 'valid' padding.
+    """
+    windows = sliding_window_view(x, (size, size), axis=(1, 2))[
+        :, ::stride, ::stride]
+    return windows.mean(axis=(-2, -1), dtype=np.float32)
+
+
+def relu(x):
+    """
+    Rectified linear unit.
+    """
+    return np.maximum(x, 0.0)
+
+
+def leaky_relu(x):
+    """
+    Leaky ReLU with the 0.1 slope used by the tiny face detector.
+    """
+    return np.maximum(x, x * np.float32(0.1))
+
+
+def sigmoid(x):
+    """
+    Logistic sigmoid.
+    """
+    return 1.0 / (1.0 + np.exp(-x))
+
+
+def resize_bilinear(image, out_h, out_w):
+    """
+    Resize a single HWC image with bilinear interpolation (align_corners=False).
+
+    :param image: Image of shape (H, W, C).
+    :param out_h: Target height.
+    :param out_w: Target width.
+    :return: The resized float32 image of shape (out_h, out_w, C).
+    """
+    in_h, in_w = image.shape[:2]
+    image = image.astype(np.float32, copy=False)
+    if (in_h, in_w) == (out_h, out_w):
+        return image
+
+    ys = np.arange(out_h, dtype=np.float32) * (in_h / out_h)
+    xs = np.arange(out_w, dtype=np.float32) * (in_w / out_w)
+    y0 = np.minimum(ys.astype(np.int64), in_h - 1)
+    x0 = np.minimum(xs.astype(np.int64), in_w - 1)
+    y1 = np.minimum(y0 + 1, in_h - 1)
+    x1 = np.minimum(x0 + 1, in_w - 1)
+    wy = (ys - y0)[:, None, None]
+    wx = (xs - x0)[None, :, None]
+
+    top = image[y0][:, x0] * (1 - wx) + image[y0][:, x1] * wx
+    bottom = image[y1][:, x0] * (1 - wx) + image[y1][:, x1] * wx
+    return top * (1 - wy) + bottom * wy
+
+
+def to_square(image, size, center):
+    """
+    Scale an image to fit a size x size square and zero-pad the remainder, like `imageToSquare`.
+
+    :param image: Image of shape (H, W, 3).
+    :param size: Side length of the square output.
+    :param center: Whether to center the image along its minor dimension.
+    :return: A tuple of the square float32 image and the (height, width) of the scaled image.
+    """
+    height, width = image.shape[:2]
+    scale = size / max(height, width)
+    scaled_h = max(1, int(round(height * scale)))
+    scaled_w = max(1, int(round(width * scale)))
+
+    square = np.zeros((size, size, 3), dtype=np.float32)
+    offset_y = (size - scaled_h) // 2 if center else 0
+    offset_x = (size - scaled_w) // 2 if center else 0
+    square[offset_y:offset_y + scaled_h, offset_x:offset_x + scaled_w] = \
+        resize_bilinear(image, scaled_h, scaled_w)
+    return square, (height * scale, width * scale)
+
+
+def non_max_suppression(boxes, scores, iou_threshold):
+    """
+    Greedy non-maximum suppression.
+
+    :param boxes: Array of shape (K, 4) holding (left, top, right, bottom).
+    :param scores: Array of shape (K,).
+    :param iou_threshold: Boxes overlapping a kept box by more than this are dropped.
+    :return: Indices of the kept boxes, highest score first.
+    """
+    order = np.argsort(scores)[::-1]
+    areas = (boxes[:, 2] - boxes[:, 0]) * (boxes[:, 3] - boxes[:, 1])
+    keep = []
+    while order.size > 0:
+        current = order[0]
+        keep.append(int(current))
+        rest = order[1:]
+        width = np.maximum(0.0, np.minimum(boxes[current, 2], boxes[rest, 2]) -
+                           np.maximum(boxes[current, 0], boxes[rest, 0]))
+        height = np.maximum(0.0, np.minimum(boxes[current, 3], boxes[rest, 3]) -
+                            np.maximum(boxes[current, 1], boxes[rest, 1]))
+        intersection = width * height
+        iou = intersection / (areas[current] + areas[rest] - intersection)
+        order = rest[iou <= iou_threshold]
+    return keep
+
+
+def clip_box(box, image_width, image_height):
+    """
+    Floor a (x, y, width, height) box and clip it at the image borders, like `clipAtImageBorders`.
+
+    :return: The clipped integer box as a (x, y, width, height) tuple.
+    """
+    x, y, width, height = (int(np.floor(v)) for v in box)
+    clipped_x = max(x, 0)
+    clipped_y = max(y, 0)
+    clipped_w = min(x + width - clipped_x, image_width - clipped_x)
+    clipped_h = min(y + height - clipped_y, image_height - clipped_y)
+    return clipped_x, clipped_y, max(clipped_w, 1), max(clipped_h, 1)
+
+
+@dataclass
+class FaceDetection:
+    """
+    A face found in a frame.
+
+    Attributes:
+        frame_index (int): Index of the frame within the processed batch.
+        score (float): Detector confidence.
+        box (tuple): The clipped (x, y, width, height) face box in pixels.
+        landmarks (np.ndarray): The 68 landmark positions in pixels, shape (68, 2).
+        descriptor (np.ndarray): The 128-d float32 face descriptor.
+    """
+    frame_index: int
+    score: float
+    box: tuple
+    landmarks: np.ndarray = None
+    descriptor: np.ndarray = None
+
+
+class TinyFaceDetector:
+    """
+    NumPy port of the face-api.js TinyFaceDetector (separable-convolution Tiny YOLOv2).
+    """
+
+    def __init__(self, weights):
+        """
+        :param weights: Weight map loaded from "tiny_face_detector_model".
+        """
+        self.weights = weights
+
+    def _separable_block(self, x, name):
+        w = self.weights
+        x = np.pad(x, ((0, 0), (1, 1), (1, 1), (0, 0)))
+        out = separable_conv2d(x, w[f"{name}/depthwise_filter"],
+                               w[f"{name}/pointwise_filter"], padding="valid")
+        return leaky_relu(out + w[f"{name}/bias"])
+
+    def forward(self, batch):
+        """
+        Run the detector network.
+
+        :param batch: Normalized input batch of shape (N, S, S, 3).
+        :return: Raw network output of shape (N, S/32, S/32, 25).
+        """
+        w = self.weights
+        out = leaky_relu(conv2d(batch, w["conv0/filters"],
+                         padding="valid") + w["conv0/bias"])
+        out = max_pool(out, 2, 2, "same")
+        for idx in range(1, 5):
+            out = self._separable_block(out, f"conv{idx}")
+            out = max_pool(out, 2, 2, "same")
+        out = self._separable_block(out, "conv5")
+        out = max_pool(out, 2, 1, "same")
+        return conv2d(out, w["conv8/filters"], padding="valid") + w["conv8/bias"]
+
+    def detect(self, frames, input_size=416, score_threshold=0.5):
+        """
+        Detect faces in a batch of frames.
+
+        :param frames: List of RGB frames of shape (H, W, 3).
+        :param input_size: Network input size, must be divisible by 32.
+        :param score_threshold: Minimum detection score.
+        :return: A list of FaceDetection objects (without landmarks or descriptors).
+        """
+        if input_size % 32 != 0:
+            raise ValueError("input_size must be divisible by 32")
+
+        squares, dims = zip(*(to_square(frame, input_size, center=False)
+                              for frame in frames))
+        batch = (np.stack(squares) - DETECTOR_MEAN_RGB) / np.float32(256)
+        output = self.forward(batch)
+
+        num_cells = output.shape[1]
+        num_anchors = len(DETECTOR_ANCHORS)
+        grid = output.reshape(len(frames), num_cells, num_cells, num_anchors, 5)
+        rows = np.arange(num_cells, dtype=np.float32)[:, None, None]
+        cols = np.arange(num_cells, dtype=np.float32)[None, :, None]
+
+        detections = []
+        for frame_index, (frame, (scaled_h, scaled_w)) in enumerate(zip(frames, dims)):
+            cells = grid[frame_index]
+            scores = sigmoid(cells[..., 4])
+            # Correct for the padding added to make the frame square
+            correction_x = input_size / scaled_w
+            correction_y = input_size / scaled_h
+            center_x = (cols + sigmoid(cells[..., 0])) / num_cells * correction_x
+            center_y = (rows + sigmoid(cells[..., 1])) / num_cells * correction_y
+            width = np.exp(cells[..., 2]) * DETECTOR_ANCHORS[:, 0] / num_cells * correction_x
+            height = np.exp(cells[..., 3]) * DETECTOR_ANCHORS[:, 1] / num_cells * correction_y
+
+            mask = scores > score_threshold
+            if not mask.any():
+                continue
+            left = (center_x - width / 2)[mask]
+            top = (center_y - height / 2)[mask]
+            boxes = np.stack([left, top, left + width[mask], top + height[mask]], axis=1)
+            kept = non_max_suppression(
+                boxes * input_size, scores[mask], DETECTOR_IOU_THRESHOLD)
+
+            image_h, image_w = frame.shape[:2]
+            for idx in kept:
+                x0, y0, x1, y1 = boxes[idx] * [image_w, image_h, image_w, image_h]
+                box = clip_box((x0, y0, x1 - x0, y1 - y0), image_w, image_h)
+                detections.append(FaceDetection(
+                    frame_index, float(scores[mask][idx]), box))
+        return detections
+
+
+class FaceLandmark68Net:
+    """
+    NumPy port of the face-api.js FaceLandmark68Net.
+    """
+
+    def __init__(self, weights):
+        """
+        :param weights: Weight map loaded from "face_landmark_68_model".
+        """
+        self.weights = weights
+
+    def _separable(self, x, name, stride=1):
+        w = self.weights
+        out = separable_conv2d(x, w[f"{name}/depthwise_filter"],
+                               w[f"{name}/pointwise_filter"], stride)
+        return out + w[f"{name}/bias"]
+
+    def _dense_block(self, x, name, is_first_layer=False):
+        w = self.weights
+        if is_first_layer:
+            out1 = conv2d(x, w[f"{name}/conv0/filters"], 2) + w[f"{name}/conv0/bias"]
+        else:
+            out1 = self._separable(x, f"{name}/conv0", 2)
+        out1 = relu(out1)
+        out2 = self._separable(out1, f"{name}/conv1")
+        out3 = self._separable(relu(out1 + out2), f"{name}/conv2")
+        out4 = self._separable(relu(out1 + out2 + out3), f"{name}/conv3")
+        return relu(out1 + out2 + out3 + out4)
+
+    def forward(self, batch):
+        """
+        Run the landmark network.
+
+        :param batch: Normalized input batch of shape (N, 112, 112, 3).
+        :return: Relative landmark coordinates of shape (N, 136), interleaved x/y.
+        """
+        out = self._dense_block(batch, "dense0", is_first_layer=True)
+        out = self._dense_block(out, "dense1")
+        out = self._dense_block(out, "dense2")
+        out = self._dense_block(out, "dense3")
+        out = avg_pool(out, 7, 2).reshape(batch.shape[0], -1)
+        return out @ self.weights["fc/weights"] + self.weights["fc/bias"]
+
+    def detect_landmarks(self, faces):
+        """
+        Predict 68 landmarks for a batch of face crops.
+
+        :param faces: List of RGB face crops of shape (H, W, 3).
+        :return: Landmark positions relative to each crop in pixels, shape (N, 68, 2).
+        """
+        squares, dims = zip(*(to_square(face, 112, center=True) for face in faces))
+        batch = (np.stack(squares) - FACE_MEAN_RGB) / np.float32(255)
+        output = self.forward(batch).reshape(len(faces), 68, 2)
+
+        landmarks = np.empty_like(output)
+        for idx, (face, (scaled_h, scaled_w)) in enumerate(zip(faces, dims)):
+            # Undo the centered padding, then map back to crop pixels
+            pad_x = abs(scaled_w - scaled_h) / 2 if scaled_w < scaled_h else 0.0
+            pad_y = abs(scaled_w - scaled_h) / 2 if scaled_h < scaled_w else 0.0
+            rel_x = (output[idx, :, 0] * 112 - pad_x) / scaled_w
+            rel_y = (output[idx, :, 1] * 112 - pad_y) / scaled_h
+            landmarks[idx, :, 0] = rel_x * face.shape[1]
+            landmarks[idx, :, 1] = rel_y * face.shape[0]
+        return landmarks
+
+
+class FaceRecognitionNet:
+    """
+    NumPy port of the face-api.js FaceRecognitionNet (ResNet-34 style descriptor network).
+    """
+
+    def __init__(self, weights):
+        """
+        :param weights: Weight map loaded from "face_recognition_model".
+        """
+        self.weights = weights
+
+    def _conv(self, x, name, stride=1, padding="same", with_relu=True):
+        w = self.weights
+        out = conv2d(x, w[f"{name}/conv/filters"], stride, padding) + \
+            w[f"{name}/conv/bias"]
+        out = out * w[f"{name}/scale/weights"] + w[f"{name}/scale/biases"]
+        return relu(out) if with_relu else out
+
+    def _residual(self, x, name):
+        out = self._conv(x, f"{name}/conv1")
+        out = self._conv(out, f"{name}/conv2", with_relu=False)
+        return relu(out + x)
+
+    def _residual_down(self, x, name):
+        out = self._conv(x, f"{name}/conv1", 2, "valid")
+        out = self._conv(out, f"{name}/conv2", with_relu=False)
+        pooled = avg_pool(x, 2, 2)
+
+        # Zero-pad the branch whose spatial size or channel count falls short
+        pad_h = pooled.shape[1] - out.shape[1]
+        pad_w = pooled.shape[2] - out.shape[2]
+        if pad_h or pad_w:
+            out = np.pad(out, ((0, 0), (0, pad_h), (0, pad_w), (0, 0)))
+        pad_c = out.shape[3] - pooled.shape[3]
+        if pad_c:
+            pooled = np.pad(pooled, ((0, 0), (0, 0), (0, 0), (0, pad_c)))
+        return relu(pooled + out)
+
+    def forward(self, batch):
+        """
+        Run the recognition network.
+
+        :param batch: Normalized input batch of shape (N, 150, 150, 3).
+        :return: Face descriptors of shape (N, 128).
+        """
+        out = self._conv(batch, "conv32_down", 2, "valid")
+        out = max_pool(out, 3, 2)
+        for name in ("conv32_1", "conv32_2", "conv32_3"):
+            out = self._residual(out, name)
+        out = self._residual_down(out, "conv64_down")
+        for name in ("conv64_1", "conv64_2", "conv64_3"):
+            out = self._residual(out, name)
+        out = self._residual_down(out, "conv128_down")
+        for name in ("conv128_1", "conv128_2"):
+            out = self._residual(out, name)
+        out = self._residual_down(out, "conv256_down")
+        for name in ("conv256_1", "conv256_2"):
+            out = self._residual(out, name)
+        out = self._residual_down(out, "conv256_down_out")
+        return out.mean(axis=(1, 2)) @ self.weights["fc"]
+
+    def compute_descriptors(self, faces):
+        """
+        Compute descriptors for a batch of aligned face crops.
+
+        :param faces: List of RGB face crops of shape (H, W, 3).
+        :return: Face descriptors of shape (N, 128).
+        """
+        squares = [to_square(face, 150, center=True)[0] for face in faces]
+        batch = (np.stack(squares) - FACE_MEAN_RGB) / np.float32(256)
+        return self.forward(batch).astype(np.float32)
+
+
+def align_dlib(landmarks, crop_width, crop_height):
+    """
+    Compute the dlib-style alignment box from 68 landmarks, like `FaceLandmarks.alignDlib`.
+
+    :param landmarks: Landmark positions in frame pixels, shape (68, 2).
+    :param crop_width: Width of the detection crop the landmarks were predicted on.
+    :param crop_height: Height of the detection crop the landmarks were predicted on.
+    :return: The alignment box as a (x, y, width, height) tuple.
+    """
+    left_eye = landmarks[36:42].mean(axis=0)
+    right_eye = landmarks[42:48].mean(axis=0)
+    mouth = landmarks[48:68].mean(axis=0)
+    eye_to_mouth = (np.linalg.norm(mouth - left_eye) +
+                    np.linalg.norm(mouth - right_eye)) / 2
+    size = int(np.floor(eye_to_mouth / DLIB_ALIGN_REL_SCALE))
+    ref_x, ref_y = (left_eye + right_eye + mouth) / 3
+
+    x = int(np.floor(max(0, ref_x - DLIB_ALIGN_REL_X * size)))
+    y = int(np.floor(max(0, ref_y - DLIB_ALIGN_REL_Y * size)))
+    return x, y, min(size, crop_width + x), min(size, crop_height + y)
+
+
+def _crop(frame, box):
+    x, y, width, height = box
+    return frame[y:y + height, x:x + width]
+
+
+class FaceEngine:
+    """
+    Batched face descriptor extraction using the three face-api.js networks.
+    """
+
+    def __init__(self, model_dir=DEFAULT_MODEL_DIR):
+        """
+        Load all model weights from the given directory.
+
+        :param model_dir: Directory containing the face-api.js manifests and shards.
+        """
+        self.detector = TinyFaceDetector(
+            load_weight_map(model_dir, "tiny_face_detector_model"))
+        self.landmark_net = FaceLandmark68Net(
+            load_weight_map(model_dir, "face_landmark_68_model"))
+        self.recognition_net = FaceRecognitionNet(
+            load_weight_map(model_dir, "face_recognition_model"))
+
+    def process(self, frames, input_size=416, score_threshold=0.5, batch_size=32):
+        """
+        Detect every face in the frames and compute its landmarks and descriptor.
+
+        :param frames: List of RGB frames of shape (H, W, 3), dtype uint8 or float.
+        :param input_size: Detector input size, must be divisible by 32.
+        :param score_threshold: Minimum detection score.
+        :param batch_size: Maximum number of images per network forward pass.
+        :return: A list of FaceDetection objects with landmarks and descriptors filled in.
+        """
+        detections = []
+        for start in range(0, len(frames), batch_size):
+            chunk = frames[start:start + batch_size]
+            for detection in self.detector.detect(chunk, input_size, score_threshold):
+                detection.frame_index += start
+                detections.append(detection)
+
+        for start in range(0, len(detections), batch_size):
+            chunk = detections[start:start + batch_size]
+            faces = [_crop(frames[d.frame_index], d.box) for d in chunk]
+            landmarks = self.landmark_net.detect_landmarks(faces)
+
+            aligned = []
+            for detection, face, points in zip(chunk, faces, landmarks):
+                # Shift landmarks from crop to frame coordinates
+                detection.landmarks = points + detection.box[:2]
+                frame = frames[detection.frame_index]
+                box = align_dlib(detection.landmarks, face.shape[1], face.shape[0])
+                aligned.append(_crop(frame, clip_box(
+                    box, frame.shape[1], frame.shape[0])))
+
+            descriptors = self.recognition_net.compute_descriptors(aligned)
+            for detection, descriptor in zip(chunk, descriptors):
+                detection.descriptor = descriptor
+
+        return detections
+
+    def compute_descriptors(self, frames, **kwargs):
+        """
+        Compute the descriptor of the highest scoring face in each frame.
+
+        :param frames: List of RGB frames of shape (H, W, 3).
+        :return: A list with one 128-d descriptor (or None when no face is found) per frame.
+        """
+        best = {}
+        for detection in self.process(frames, **kwargs):
+            current = best.get(detection.frame_index)
+            if current is None or detection.score > current.score:
+                best[detection.frame_index] = detection
+        return [best[idx].descriptor if idx in best else None for idx in range(len(frames))]
+
+
+def decode_image(data):
+    """
+    Decode an encoded image (JPEG, PNG, ...) into an RGB uint8 array.
+
+    :param data: The encoded image bytes.
+    :return: An array of shape (H, W, 3).
+    :raises RuntimeError: If Pillow is not installed.
+    """
+    try:
+        from PIL import Image
+    except ImportError:
+        raise RuntimeError("Pillow is required to decode uploaded frames")
+
+    with Image.open(io.BytesIO(data)) as image:
+        return np.asarray(image.convert("RGB"))
+
+
+_engine = None
+
+
+def get_engine(model_dir=DEFAULT_MODEL_DIR):
+    """
+    Return the process-wide FaceEngine, loading the model weights on first use.
+
+    :param model_dir: Directory containing the face-api.js manifests and shards.
+    :return: The shared FaceEngine instance.
+    """
+    global _engine
+    if _engine is None:
+        _engine = FaceEngine(model_dir)
+    return _engine
@@ -0,0 +1,341 @@
+"""
+gallery.py - In-Memory Biometric Gallery
+
+This module keeps every enrolled face template in a single contiguous float32 matrix so that a
+probe can be matched against the whole gallery with one matrix multiply, instead of one database
+query per attempt. Squared Euclidean distances are computed as |p|^2 + |t|^2 - 2 p.t, with the
+template norms cached at load time.
+
+The gallery is loaded lazily from the `user` table on first use and kept up to date by the
+routes that change `User.biometric_data`. Each server process holds its own gallery, and those
+routes only update the gallery of the process that handled them: other Gunicorn workers see an
+enrollment, deletion or adaptive refresh when they reload the gallery, every
+BIOMETRIC_GALLERY_RELOAD_SECONDS (in a background thread; 0 never reloads).
+"""
+
+import atexit
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+from flask import current_app
+
+from biometrics.engine import DESCRIPTOR_SIZE
+from biometrics.encryption import (count_templates, get_keyring, open_template_rows,
+                                   template_rows_select)
+from biometrics.sharding import ShardedGallery
+from database.db import db
+
+
+class Gallery:
+    """
+    A thread-safe matrix of enrolled templates indexed by user id.
+
+    Attributes:
+        user_ids (np.ndarray): The user id of each row, shape (N,).
+        templates (np.ndarray): The enrolled templates, shape (N, 128).
+        norms (np.ndarray): The squared L2 norm of each template, shape (N,).
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self.user_ids = np.empty(0, dtype=np.int64)
+        self.templates = np.empty((0, DESCRIPTOR_SIZE), dtype=np.float32)
+        self.norms = np.empty(0, dtype=np.float32)
+        self._rows = {}
+        # Changes made while `reload` reads the database, replayed over what it read
+        self._journal = None
+
+    def __len__(self):
+        return len(self.user_ids)
+
+    def load(self, rows):
+        """
+        Replace the gallery contents.
+
+        :param rows: Iterable of (user_id, descriptor) pairs.
+        """
+        user_ids, templates = [], []
+        for user_id, descriptor in rows:
+            user_ids.append(user_id)
+            templates.append(descriptor)
+        self.load_arrays(np.array(user_ids, dtype=np.int64),
+                         np.array(templates, dtype=np.float32).reshape(-1, DESCRIPTOR_SIZE))
+
+    def load_arrays(self, user_ids, templates):
+        """
+        Replace the gallery contents with arrays, which are used without copying.
+
+        :param user_ids: Int64 array of shape (N,).
+        :param templates: Float32 array of shape (N, 128).
+        """
+        with self._lock:
+            self.user_ids = user_ids
+            self.templates = templates
+            self.norms = np.einsum("ij,ij->i", self.templates, self.templates)
+            self._rows = {int(user_id): row for row, user_id in enumerate(self.user_ids)}
+
+    def upsert(self, user_id, descriptor):
+        """
+        Add or replace the template of a user.
+
+        :param user_id: The user's id.
+        :param descriptor: The new 128-d template.
+        """
+        descriptor = np.asarray(descriptor, dtype=np.float32).reshape(DESCRIPTOR_SIZE)
+        with self._lock:
+            self._record(user_id, descriptor)
+            row = self._rows.get(user_id)
+            if row is None:
+                # Copy-on-write so concurrent searches keep a consistent snapshot
+                self._rows[user_id] = len(self.user_ids)
+                self.user_ids = np.append(self.user_ids, np.int64(user_id))
+                self.templates = np.vstack([self.templates, descriptor])
+                self.norms = np.append(self.norms, descriptor @ descriptor)
+            else:
+                templates = self.templates.copy()
+                norms = self.norms.copy()
+                templates[row] = descriptor
+                norms[row] = descriptor @ descriptor
+                self.templates, self.norms = templates, norms
+
+    def refresh(self, user_id, descriptor, expected=None):
+        """
+        Overwrite the template of an enrolled user in place.
+
+        Unlike `upsert`, the arrays are not copied, so a search running concurrently may see the
+        row half written. This is meant for small adaptive updates (see biometrics/adaptation.py),
+        where both versions match the user.
+
+        :param user_id: The user's id.
+        :param descriptor: The new 128-d template.
+        :param expected: If given, only refresh while the user's template still equals it.
+        :return: False if the user is not enrolled or the template is not the expected one.
+        """
+        descriptor = np.asarray(descriptor, dtype=np.float32).reshape(DESCRIPTOR_SIZE)
+        with self._lock:
+            row = self._rows.get(user_id)
+            if row is None:
+                return False
+            if expected is not None and not np.array_equal(self.templates[row], expected):
+                return False
+            self._record(user_id, descriptor)
+            if not self.templates.flags.writeable:
+                self.templates = self.templates.copy()
+            self.templates[row] = descriptor
+            self.norms[row] = descriptor @ descriptor
+            return True
+
+    def remove(self, user_id):
+        """
+        Remove the template of a user, if enrolled.
+
+        :param user_id: The user's id.
+        """
+        with self._lock:
+            self._record(user_id, None)
+            row = self._rows.pop(user_id, None)
+            if row is None:
+                return
+            keep = np.arange(len(self.user_ids)) != row
+            self.user_ids = self.user_ids[keep]
+            self.templates = self.templates[keep]
+            self.norms = self.norms[keep]
+            self._rows = {int(uid): idx for idx, uid in enumerate(self.user_ids)}
+
+    def _record(self, user_id, descriptor):
+        # Called with the lock held; None records a removal
+        if self._journal is not None:
+            self._journal[user_id] = descriptor
+
+    def reload(self, loader):
+        """
+        Replace the gallery contents with freshly read arrays, keeping the changes made meanwhile.
+
+        :param loader: Callable returning (user_ids, templates) arrays, such as
+            `load_gallery_arrays`.
+        """
+        with self._lock:
+            self._journal = {}
+        try:
+            user_ids, templates = loader()
+        except BaseException:
+            with self._lock:
+                self._journal = None
+            raise
+        # One acquisition, so that no change can land between the journal swap and the replay
+        with self._lock:
+            journal, self._journal = self._journal, None
+            self.load_arrays(user_ids, templates)
+            for user_id, descriptor in journal.items():
+                if descriptor is None:
+                    self.remove(user_id)
+                else:
+                    self.upsert(user_id, descriptor)
+
+    def stats(self):
+        """
+        Return the gallery size.
+
+        :return: A dict of gallery statistics.
+        """
+        return {"sharded": False, "size": len(self)}
+
+    def template(self, user_id):
+        """
+        Return the template of a user, or None if not enrolled.
+        """
+        with self._lock:
+            row = self._rows.get(user_id)
+            return None if row is None else self.templates[row]
+
+    def snapshot(self):
+        """
+        Return a consistent (user_ids, templates, norms) view of the gallery.
+        """
+        with self._lock:
+            return self.user_ids, self.templates, self.norms
+
+    def search(self, probes, k=1):
+        """
+        Find the k nearest templates for each probe.
+
+        :param probes: Array of shape (P, 128) or (128,).
+        :param k: Number of neighbours to return per probe.
+        :return: A tuple of (user_ids, distances), each of shape (P, min(k, N)), nearest first.
+        """
+        probes = np.atleast_2d(np.asarray(probes, dtype=np.float32))
+        user_ids, templates, norms = self.snapshot()
+        k = min(k, len(user_ids))
+        if k == 0:
+            empty = np.empty((len(probes), 0))
+            return empty.astype(np.int64), empty.astype(np.float32)
+
+        squared = norms[None, :] - 2.0 * (probes @ templates.T)
+        if k < len(user_ids):
+            candidates = np.argpartition(squared, k - 1, axis=1)[:, :k]
+        else:
+            candidates = np.broadcast_to(np.arange(len(user_ids)), squared.shape)
+        partial = np.take_along_axis(squared, candidates, axis=1)
+        order = np.argsort(partial, axis=1)
+        candidates = np.take_along_axis(candidates, order, axis=1)
+
+        probe_norms = np.einsum("ij,ij->i", probes, probes)[:, None]
+        distances = np.sqrt(np.maximum(
+            np.take_along_axis(partial, order, axis=1) + probe_norms, 0.0))
+        return user_ids[candidates], distances.astype(np.float32)
+
+
+def load_gallery_arrays(batch_size=10000, workers=1):
+    """
+    Read and decrypt every enrolled template from the `user` table.
+
+    Rows are fetched in batches; each batch is decoded on a thread pool straight into
+    preallocated arrays while the next one is fetched.
+
+    :param batch_size: Rows per fetched batch.
+    :param workers: Decoding threads.
+    :return: A tuple of (user_ids, templates) arrays of shapes (N,) and (N, 128).
+    """
+    keyring = get_keyring()
+    capacity = count_templates()
+    user_ids = np.empty(capacity, dtype=np.int64)
+    templates = np.empty((capacity, DESCRIPTOR_SIZE), dtype=np.float32)
+    valid = np.zeros(capacity, dtype=bool)
+
+    count, pending = 0, []
+
+    def submit(batch):
+        nonlocal user_ids, templates, valid, capacity, count
+        if count + len(batch) > capacity:
+            # Rows enrolled since the count; grow once the pending batches are written
+            for future in pending:
+                future.result()
+            capacity = max(2 * capacity, count + len(batch))
+            user_ids = np.resize(user_ids, capacity)
+            templates = np.resize(templates, (capacity, DESCRIPTOR_SIZE))
+            valid = np.resize(valid, capacity)
+            valid[count:] = False
+        pending.append(pool.submit(
+            open_template_rows, batch, keyring, user_ids, templates, valid, count))
+        count += len(batch)
+
+    with ThreadPoolExecutor(workers) as pool:
+        result = db.session.execute(
+            template_rows_select().execution_options(yield_per=batch_size))
+        for batch in result.partitions(batch_size):
+            submit(batch)
+        for future in pending:
+            future.result()
+
+    valid = valid[:count]
+    if valid.all():
+        return user_ids[:count], templates[:count]
+    return user_ids[:count][valid], templates[:count][valid]
+
+
+def load_gallery_rows():
+    """
+    Read every enrolled template from the `user` table.
+
+    :return: A list of (user_id, descriptor) pairs.
+    """
+    return list(zip(*load_gallery_arrays()))
+
+
+# Guards the first load and the scheduling of reloads
+_gallery_lock = threading.Lock()
+
+
+def _read_gallery_arrays(config):
+    return load_gallery_arrays(batch_size=config.get("BIOMETRIC_GALLERY_LOAD_BATCH", 10000),
+                               workers=config.get("BIOMETRIC_GALLERY_LOAD_WORKERS", 1))
+
+
+def _reload_gallery(app, gallery):
+    with app.app_context():
+        try:
+            gallery.reload(lambda: _read_gallery_arrays(app.config))
+        except Exception as e:
+            print("Error:", f"Could not reload the biometric gallery: {e}")
+
+
+def get_gallery():
+    """
+    Return the gallery of the current application, loading it from the database on first use.
+
+    Once BIOMETRIC_GALLERY_RELOAD_SECONDS have passed since the last load, the gallery is
+    reloaded in a background thread while requests keep using it.
+
+    :return: The application's Gallery, or a ShardedGallery when BIOMETRIC_GALLERY_SHARDS > 1.
+    """
+    extensions = current_app.extensions
+    config = current_app.config
+    gallery = extensions.get("biometric_gallery")
+    if gallery is None:
+        with _gallery_lock:
+            gallery = extensions.get("biometric_gallery")
+            if gallery is None:
+                shards = config.get("BIOMETRIC_GALLERY_SHARDS", 0)
+                if shards > 1:
+                    gallery = ShardedGallery(
+                        shards, timeout=config.get("BIOMETRIC_SHARD_TIMEOUT", 5.0),
+                        health_interval=config.get("BIOMETRIC_SHARD_HEALTH_SECONDS", 30.0))
+                    atexit.register(gallery.close)
+                else:
+                    gallery = Gallery()
+                gallery.load_arrays(*_read_gallery_arrays(config))
+                extensions["biometric_gallery_loaded"] = time.monotonic()
+                extensions["biometric_gallery"] = gallery
+        return gallery
+
+    interval = config.get("BIOMETRIC_GALLERY_RELOAD_SECONDS", 0)
+    if interval > 0 and time.monotonic() - extensions["biometric_gallery_loaded"] >= interval:
+        with _gallery_lock:
+            # Only the first request past the interval starts a reload
+            if time.monotonic() - extensions["biometric_gallery_loaded"] >= interval:
+                extensions["biometric_gallery_loaded"] = time.monotonic()
+                threading.Thread(target=_reload_gallery, name="gallery-reload", daemon=True,
+                                 args=(current_app._get_current_object(), gallery)).start()
+    return gallery
@@ -0,0 +1,162 @@
+"""
+probe_cache.py - Repeat Probe Cache
+
+This module remembers which user recent probe descriptors matched, so a user retrying a face scan
+seconds later skips the full gallery search.
+
+Probes are keyed by random-hyperplane LSH signatures: each bit records on which side of a random
+hyperplane the descriptor lies, so nearly identical descriptors share a signature with high
+probability. Several independent tables are kept to make a near-miss on one hyperplane unlikely to
+lose the hit. A hit only names a candidate; the caller still checks the exact distance against
+that user's template before trusting it.
+
+Entries expire after a TTL and the least recently used entries are evicted past the size limit.
+Entries of a user are evicted whenever that user's template changes or the user is deleted.
+"""
+
+import threading
+import time
+from collections import OrderedDict
+
+import numpy as np
+from flask import current_app
+
+from biometrics.engine import DESCRIPTOR_SIZE
+
+TABLES = 4
+BITS_PER_TABLE = 16
+
+
+class ProbeCache:
+    """
+    A TTL/LRU cache from LSH signatures of probe descriptors to matched users.
+    """
+
+    def __init__(self, max_entries=1024, ttl=30.0, tables=TABLES, bits=BITS_PER_TABLE, seed=0):
+        """
+        :param max_entries: Maximum number of cached probes; 0 disables the cache.
+        :param ttl: Seconds a cached probe stays valid.
+        :param tables: Number of independent signature tables.
+        :param bits: Hyperplanes (signature bits) per table.
+        :param seed: Seed of the random hyperplanes.
+        """
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self.tables = tables
+        self._planes = np.random.default_rng(seed).standard_normal(
+            (tables * bits, DESCRIPTOR_SIZE)).astype(np.float32)
+        self._weights = (1 << np.arange(bits, dtype=np.int64))
+        self._lock = threading.Lock()
+        # (user_id, distance, expires_at, keys) per probe, with one key per table pointing at it
+        self._entries = OrderedDict()
+        self._keys = {}
+        self._by_user = {}
+        self._next_id = 0
+
+    def __len__(self):
+        return len(self._entries)
+
+    def signatures(self, descriptor):
+        """
+        Compute one LSH signature per table.
+
+        :param descriptor: A 128-d descriptor.
+        :return: A list of (table, signature) keys.
+        """
+        descriptor = np.asarray(descriptor, dtype=np.float32).reshape(DESCRIPTOR_SIZE)
+        bits = (self._planes @ descriptor > 0).reshape(self.tables, -1)
+        return list(enumerate((bits @ self._weights).tolist()))
+
+    def get(self, descriptor):
+        """
+        Return the cached match of a probe.
+
+        :param descriptor: The probe descriptor.
+        :return: A tuple of (user_id, distance), or None on a miss.
+        """
+        if self.max_entries == 0:
+            return None
+        now = time.monotonic()
+        with self._lock:
+            for key in self.signatures(descriptor):
+                entry_id = self._keys.get(key)
+                if entry_id is None:
+                    continue
+                user_id, distance, expires_at, _ = self._entries[entry_id]
+                if expires_at <= now:
+                    self._discard(entry_id)
+                    continue
+                self._entries.move_to_end(entry_id)
+                return user_id, distance
+        return None
+
+    def put(self, descriptor, user_id, distance):
+        """
+        Remember that a probe matched a user.
+
+        :param descriptor: The probe descriptor.
+        :param user_id: The matched user's id.
+        :param distance: The match distance.
+        """
+        if self.max_entries == 0:
+            return
+        keys = self.signatures(descriptor)
+        with self._lock:
+            for key in keys:
+                if key in self._keys:
+                    self._discard(self._keys[key])
+            entry_id = self._next_id
+            self._next_id += 1
+            self._entries[entry_id] = (user_id, float(distance), time.monotonic() + self.ttl, keys)
+            for key in keys:
+                self._keys[key] = entry_id
+            self._by_user.setdefault(user_id, set()).add(entry_id)
+            while len(self._entries) > self.max_entries:
+                self._discard(next(iter(self._entries)))
+
+    def invalidate(self, user_id, descriptor=None):
+        """
+        Evict the cached probes of a user.
+
+        :param user_id: The user whose template changed or who was deleted.
+        :param descriptor: The user's new template, if any. Probes sharing its signatures are
+            evicted too, since they may now be closer to this user than to their cached match.
+        """
+        with self._lock:
+            for entry_id in list(self._by_user.get(user_id, ())):
+                self._discard(entry_id)
+            if descriptor is not None:
+                for key in self.signatures(descriptor):
+                    if key in self._keys:
+                        self._discard(self._keys[key])
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+            self._keys.clear()
+            self._by_user.clear()
+
+    def _discard(self, entry_id):
+        user_id, _, _, keys = self._entries.pop(entry_id)
+        for key in keys:
+            if self._keys.get(key) == entry_id:
+                del self._keys[key]
+        entries = self._by_user.get(user_id)
+        if entries is not None:
+            entries.discard(entry_id)
+            if not entries:
+                del self._by_user[user_id]
+
+
+def get_probe_cache():
+    """
+    Return the probe cache of the current application.
+
+    :return: The application's ProbeCache instance.
+    """
+    cache = current_app.extensions.get("biometric_probe_cache")
+    if cache is None:
+        cache = ProbeCache(current_app.config.get("BIOMETRIC_PROBE_CACHE_SIZE", 1024),
+                           current_app.config.get("BIOMETRIC_PROBE_CACHE_TTL", 30.0))
+        current_app.extensions["biometric_probe_cache"] = cache
+    return cache
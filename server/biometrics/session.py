@@ -0,0 +1,132 @@
+"""
+session.py - Streaming Biometric Authentication Session
+
+This module accumulates match evidence over successive probe descriptors from one login attempt.
+Every frame is matched against the gallery and each candidate collects a score of
+(threshold - distance) per frame; a candidate that falls outside the frame's top-k is credited
+with the k-th distance, which is the best it could have had. The session decides as soon as:
+- the best candidate's evidence reaches the accept level and beats the runner-up, or
+- the best candidate's evidence drops below the reject level, or
+- the frame budget runs out, in which case it decides as `finish` would.
+
+A clear frame therefore decides on its own, while borderline frames are averaged out instead of
+costing the user a fresh scan and request.
+"""
+
+from dataclasses import dataclass
+
+
+@dataclass
+class Decision:
+    """
+    The outcome of an authentication session.
+
+    Attributes:
+        accepted (bool): Whether a user was recognized.
+        user_id (int): The recognized user's id, or None.
+        distance (float): The best distance observed for the decided candidate.
+        frames (int): The number of frames consumed before deciding.
+    """
+    accepted: bool
+    user_id: int
+    distance: float
+    frames: int
+
+
+class AuthenticationSession:
+    """
+    Accumulates evidence per candidate over a stream of probe descriptors.
+    """
+
+    def __init__(self, gallery, threshold, accept_evidence=0.15, reject_evidence=1.0,
+                 max_frames=10, top_k=5):
+        """
+        :param gallery: The Gallery to match against.
+        :param threshold: Maximum distance of a single-frame match.
+        :param accept_evidence: Accumulated score needed to accept the best candidate.
+        :param reject_evidence: Accumulated deficit at which the attempt is rejected.
+        :param max_frames: Frame budget of the session.
+        :param top_k: Number of candidates matched per frame.
+        """
+        self.gallery = gallery
+        self.threshold = threshold
+        self.accept_evidence = accept_evidence
+        self.reject_evidence = reject_evidence
+        self.max_frames = max_frames
+        self.top_k = top_k
+
+        self.frames = 0
+        self.decision = None
+        self._evidence = {}
+        self._best_distance = {}
+        self._baseline = 0.0
+
+    def _leader(self):
+        """
+        Return the (user_id, evidence, runner_up_evidence) of the current best candidate.
+        """
+        ranked = sorted(self._evidence.items(), key=lambda item: item[1], reverse=True)
+        if not ranked:
+            return None, self._baseline, self._baseline
+        runner_up = ranked[1][1] if len(ranked) > 1 else self._baseline
+        return ranked[0][0], ranked[0][1], runner_up
+
+    def add(self, probes):
+        """
+        Add one or more probe descriptors to the session.
+
+        :param probes: Array of shape (P, 128).
+        :return: The Decision once one is reached, otherwise None.
+        """
+        if self.decision is not None:
+            return self.decision
+
+        user_ids, distances = self.gallery.search(probes, k=self.top_k)
+        for frame_ids, frame_distances in zip(user_ids, distances):
+            self.frames += 1
+            if len(frame_ids) == 0:
+                return self._decide(None)
+
+            # Candidates outside the top-k are credited with the k-th distance
+            floor_score = self.threshold - float(frame_distances[-1])
+            seen = set()
+            for user_id, distance in zip(frame_ids.tolist(), frame_distances.tolist()):
+                seen.add(user_id)
+                self._evidence[user_id] = self._evidence.get(
+                    user_id, self._baseline) + self.threshold - distance
+                self._best_distance[user_id] = min(
+                    distance, self._best_distance.get(user_id, distance))
+            for user_id in self._evidence.keys() - seen:
+                self._evidence[user_id] += floor_score
+            self._baseline += floor_score
+
+            leader, evidence, runner_up = self._leader()
+            if evidence >= self.accept_evidence and evidence > runner_up:
+                return self._decide(leader)
+            if evidence <= -self.reject_evidence:
+                return self._decide(None)
+            if self.frames >= self.max_frames:
+                return self.finish()
+
+        return None
+
+    def finish(self):
+        """
+        Force a decision with the evidence collected so far.
+
+        :return: The final Decision.
+        """
+        if self.decision is not None:
+            return self.decision
+        leader, evidence, runner_up = self._leader()
+        if leader is not None and evidence > 0 and evidence > runner_up:
+            return self._decide(leader)
+        return self._decide(None)
+
+    def _decide(self, user_id):
+        if user_id is None:
+            best = min(self._best_distance.values(), default=None)
+            self.decision = Decision(False, None, best, self.frames)
+        else:
+            self.decision = Decision(True, user_id, self._best_distance[user_id], self.frames)
+        return self.decision
@@ -0,0 +1,616 @@
+"""
+sharding.py - Sharded Biometric Gallery
+
+This module partitions the enrolled templates across a pool of worker processes so that one
+probe is matched against every shard in parallel, instead of one process scanning the whole
+gallery on a single core.
+
+Each shard lives in a shared memory segment owned by the web process. Workers attach to their
+segment and only read it, so templates are never copied between processes and a dead worker can
+be respawned without reloading the gallery. Searches hold a read lock, so several can be in
+flight at once (each request and reply carries an id); writes take the lock exclusively, so a
+worker never sees a half-written row.
+
+Search flow:
+1. The probe batch is sent to every shard worker.
+2. Each worker returns its own top-k as (user_ids, partial squared distances).
+3. The per-shard candidates are merged into the global top-k.
+
+A shard that fails to answer is searched in the owner process for that request and its worker
+is respawned, so a crashed worker costs latency rather than correctness. A background health
+check also pings every worker each BIOMETRIC_SHARD_HEALTH_SECONDS, so an idle dead worker is
+respawned before a request needs it.
+
+Workers are spawned, so each one imports the `__main__` module of the web process; app.py does
+not build the application when imported that way.
+"""
+
+import contextlib
+import itertools
+import multiprocessing
+import threading
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from biometrics.engine import DESCRIPTOR_SIZE
+
+INITIAL_CAPACITY = 1024
+
+# Bytes per row: user id (int64), norm (float32) and template (float32 x 128)
+_ROW_BYTES = 8 + 4 + 4 * DESCRIPTOR_SIZE
+
+
+def _shard_views(buffer, capacity):
+    """
+    Map the (user_ids, norms, templates) arrays onto a shard's shared memory buffer.
+    """
+    user_ids = np.ndarray((capacity,), dtype=np.int64, buffer=buffer)
+    norms = np.ndarray((capacity,), dtype=np.float32, buffer=buffer, offset=8 * capacity)
+    templates = np.ndarray((capacity, DESCRIPTOR_SIZE), dtype=np.float32, buffer=buffer,
+                           offset=12 * capacity)
+    return user_ids, norms, templates
+
+
+def _shard_top_k(views, count, probes, k):
+    """
+    Return the k best rows of one shard as (user_ids, partial squared distances).
+
+    The probe norm is left out of the distances; it is the same for every shard and is added
+    back once after merging.
+    """
+    user_ids, norms, templates = (view[:count] for view in views)
+    k = min(k, count)
+    if k == 0:
+        empty = np.empty((len(probes), 0))
+        return empty.astype(np.int64), empty.astype(np.float32)
+
+    partial = norms[None, :] - 2.0 * (probes @ templates.T)
+    if k < count:
+        candidates = np.argpartition(partial, k - 1, axis=1)[:, :k]
+        partial = np.take_along_axis(partial, candidates, axis=1)
+    else:
+        candidates = np.broadcast_to(np.arange(count), partial.shape)
+    return user_ids[candidates], partial
+
+
+def _shard_worker(connection):
+    """
+    Serve requests for one shard until told to stop.
+
+    Requests are (request_id, command, *args) tuples and every reply is (request_id, result), so
+    that the owner can have several searches in flight on one pipe.
+    """
+    segment, views = None, None
+    try:
+        while True:
+            request_id, command, *args = connection.recv()
+            if command == "search":
+                connection.send((request_id, _shard_top_k(views, *args)))
+            elif command == "attach":
+                # First segment on start-up, or a larger one after the owner grew the shard
+                if segment is not None:
+                    del views
+                    segment.close()
+                name, capacity = args
+                segment = shared_memory.SharedMemory(name=name)
+                views = _shard_views(segment.buf, capacity)
+                connection.send((request_id, True))
+            elif command == "ping":
+                connection.send((request_id, True))
+            elif command == "stop":
+                break
+    except (EOFError, KeyboardInterrupt):
+        pass
+    finally:
+        del views
+        if segment is not None:
+            segment.close()
+
+
+class _Reply:
+    """
+    The pending answer of a shard worker to one request.
+    """
+
+    def __init__(self, pending=None, request_id=None):
+        self._event = threading.Event()
+        self._value = None
+        self._pending = pending
+        self._request_id = request_id
+
+    def set(self, value):
+        self._value = value
+        self._event.set()
+
+    def get(self, timeout):
+        """
+        Wait for the answer.
+
+        :return: The worker's answer, or None if it failed or did not answer in time.
+        """
+        if not self._event.wait(timeout) and self._pending is not None:
+            # Nobody waits for a late answer, so stop tracking the request
+            self._pending.pop(self._request_id, None)
+        return self._value
+
+
+class _Shard:
+    """
+    One shared memory segment and the worker process serving it.
+    """
+
+    def __init__(self, context, capacity, timeout):
+        self.context = context
+        self.timeout = timeout
+        self.count = 0
+        self.process = None
+        self.connection = None
+        self._send_lock = threading.Lock()
+        self._request_ids = itertools.count()
+        self._pending = {}
+        self._ready = None
+        self._allocate(capacity)
+
+    def _allocate(self, capacity):
+        self.capacity = capacity
+        self.segment = shared_memory.SharedMemory(create=True, size=capacity * _ROW_BYTES)
+        self.views = _shard_views(self.segment.buf, capacity)
+
+    def start(self):
+        """
+        Start (or restart) the worker process of this shard and point it at the segment.
+        """
+        connection, child = self.context.Pipe()
+        self.process = self.context.Process(target=_shard_worker, args=(child,), daemon=True)
+        self.process.start()
+        child.close()
+        with self._send_lock:
+            self.connection, self._pending = connection, {}
+        threading.Thread(target=self._read_replies, args=(connection, self._pending),
+                         name="gallery-shard-reader", daemon=True).start()
+        self._ready = self.request("attach", self.segment.name, self.capacity)
+
+    def _read_replies(self, connection, pending):
+        # Hands each reply to its request; fails every pending request once the pipe breaks
+        try:
+            while True:
+                request_id, result = connection.recv()
+                reply = pending.pop(request_id, None)
+                if reply is not None:
+                    reply.set(result)
+        except (EOFError, OSError):
+            pass
+        finally:
+            with self._send_lock:
+                replies = list(pending.values())
+                pending.clear()
+            for reply in replies:
+                reply.set(None)
+
+    def request(self, command, *args):
+        """
+        Send a request to the worker.
+
+        :return: A _Reply, answered with None if the worker cannot be reached.
+        """
+        with self._send_lock:
+            request_id = next(self._request_ids)
+            reply = _Reply(self._pending, request_id)
+            self._pending[request_id] = reply
+            try:
+                self.connection.send((request_id, command, *args))
+            except (OSError, ValueError):
+                self._pending.pop(request_id, None)
+                reply.set(None)
+        return reply
+
+    def wait_ready(self):
+        """
+        Wait for the worker to acknowledge its segment.
+
+        :return: True if the worker attached within the timeout.
+        """
+        return bool(self._ready.get(self.timeout))
+
+    def stop(self):
+        if self.process is None:
+            return
+        with self._send_lock:
+            try:
+                self.connection.send((None, "stop"))
+            except (OSError, ValueError):
+                pass
+        self.process.join(timeout=1)
+        if self.process.is_alive():
+            self.process.kill()
+        self.connection.close()
+        self.process = None
+
+    def close(self):
+        self.stop()
+        del self.views
+        self.segment.close()
+        self.segment.unlink()
+
+    def grow(self, capacity):
+        """
+        Move the shard into a larger segment and point the worker at it.
+        """
+        old_segment, old_views = self.segment, self.views
+        self._allocate(capacity)
+        for old, new in zip(old_views, self.views):
+            new[:self.count] = old[:self.count]
+        self._ready = self.request("attach", self.segment.name, self.capacity)
+        if not self.wait_ready():
+            self.restart()
+        # Only unlink once the worker has let go of the old segment
+        del old_views
+        old_segment.close()
+        old_segment.unlink()
+
+    def restart(self):
+        self.stop()
+        self.start()
+        self.wait_ready()
+
+    def alive(self):
+        """
+        Check that the worker is running and answers a ping within the timeout.
+        """
+        if self.process is None or not self.process.is_alive():
+            return False
+        return bool(self.request("ping").get(self.timeout))
+
+
+class _ReadWriteLock:
+    """
+    Lets searches read the shards concurrently while writes have them to themselves.
+
+    Writes are reentrant, and the writing thread may also read. Waiting writers block new readers
+    so that a stream of searches cannot starve a write.
+    """
+
+    def __init__(self):
+        self._condition = threading.Condition()
+        self._readers = 0
+        self._writer = None
+        self._depth = 0
+        self._waiting_writers = 0
+
+    @contextlib.contextmanager
+    def read(self):
+        me = threading.get_ident()
+        with self._condition:
+            nested = self._writer == me
+            if not nested:
+                while self._writer is not None or self._waiting_writers:
+                    self._condition.wait()
+                self._readers += 1
+        try:
+            yield
+        finally:
+            if not nested:
+                with self._condition:
+                    self._readers -= 1
+                    if not self._readers:
+                        self._condition.notify_all()
+
+    @contextlib.contextmanager
+    def write(self):
+        me = threading.get_ident()
+        with self._condition:
+            if self._writer == me:
+                self._depth += 1
+            else:
+                self._waiting_writers += 1
+                while self._writer is not None or self._readers:
+                    self._condition.wait()
+                self._waiting_writers -= 1
+                self._writer, self._depth = me, 1
+        try:
+            yield
+        finally:
+            with self._condition:
+                self._depth -= 1
+                if not self._depth:
+                    self._writer = None
+                    self._condition.notify_all()
+
+
+class ShardedGallery:
+    """
+    A gallery partitioned across worker processes, with the same interface as Gallery.
+    """
+
+    def __init__(self, shards, timeout=5.0, health_interval=30.0):
+        """
+        :param shards: Number of shards (worker processes).
+        :param timeout: Seconds to wait for a shard's answer before searching it locally.
+        :param health_interval: Seconds between background health checks (0 disables them).
+        """
+        # Spawn rather than fork: the web process may already be running threads
+        self._context = multiprocessing.get_context("spawn")
+        self._lock = _ReadWriteLock()
+        self.timeout = timeout
+        self.restarts = 0
+        self.health = None
+        self._shards = [_Shard(self._context, INITIAL_CAPACITY, timeout) for _ in range(shards)]
+        # Start every worker before waiting so they boot in parallel
+        for shard in self._shards:
+            shard.start()
+        for shard in self._shards:
+            shard.wait_ready()
+        self._location = {}
+        # Changes made while `reload` reads the database, replayed over what it read
+        self._journal = None
+
+        self._closed = threading.Event()
+        if health_interval > 0:
+            threading.Thread(target=self._monitor, args=(health_interval,),
+                             name="gallery-shard-health", daemon=True).start()
+
+    def __len__(self):
+        return len(self._location)
+
+    def close(self):
+        """
+        Stop the workers and release the shared memory.
+        """
+        self._closed.set()
+        with self._lock.write():
+            for shard in self._shards:
+                shard.close()
+            self._shards = []
+
+    def _write(self, shard, row, user_id, descriptor):
+        user_ids, norms, templates = shard.views
+        user_ids[row] = user_id
+        templates[row] = descriptor
+        norms[row] = descriptor @ descriptor
+
+    def _append(self, user_id, descriptor):
+        shard_index = user_id % len(self._shards)
+        shard = self._shards[shard_index]
+        if shard.count == shard.capacity:
+            shard.grow(2 * shard.capacity)
+        self._write(shard, shard.count, user_id, descriptor)
+        self._location[user_id] = (shard_index, shard.count)
+        shard.count += 1
+
+    def load(self, rows):
+        """
+        Replace the gallery contents.
+
+        :param rows: Iterable of (user_id, descriptor) pairs.
+        """
+        rows = list(rows)
+        self.load_arrays(
+            np.array([int(user_id) for user_id, _ in rows], dtype=np.int64),
+            np.array([descriptor for _, descriptor in rows],
+                     dtype=np.float32).reshape(len(rows), DESCRIPTOR_SIZE))
+
+    def load_arrays(self, user_ids, templates):
+        """
+        Replace the gallery contents with arrays, copied into each shard's segment in bulk.
+
+        :param user_ids: Int64 array of shape (N,).
+        :param templates: Float32 array of shape (N, 128).
+        """
+        user_ids = np.asarray(user_ids, dtype=np.int64).reshape(-1)
+        templates = np.asarray(templates, dtype=np.float32).reshape(len(user_ids), DESCRIPTOR_SIZE)
+        assignment = user_ids % len(self._shards)
+        with self._lock.write():
+            self._location = {}
+            for shard_index, shard in enumerate(self._shards):
+                rows = np.flatnonzero(assignment == shard_index)
+                count = len(rows)
+                shard.count = 0
+                if count > shard.capacity:
+                    capacity = shard.capacity
+                    while capacity < count:
+                        capacity *= 2
+                    shard.grow(capacity)
+                shard_ids, norms, shard_templates = shard.views
+                shard_ids[:count] = user_ids[rows]
+                shard_templates[:count] = templates[rows]
+                norms[:count] = np.einsum("ij,ij->i", shard_templates[:count],
+                                          shard_templates[:count])
+                shard.count = count
+                self._location.update(
+                    (user_id, (shard_index, row))
+                    for row, user_id in enumerate(shard_ids[:count].tolist()))
+
+    def upsert(self, user_id, descriptor):
+        """
+        Add or replace the template of a user.
+
+        :param user_id: The user's id.
+        :param descriptor: The new 128-d template.
+        """
+        descriptor = np.asarray(descriptor, dtype=np.float32).reshape(DESCRIPTOR_SIZE)
+        with self._lock.write():
+            self._record(user_id, descriptor)
+            location = self._location.get(user_id)
+            if location is None:
+                self._append(user_id, descriptor)
+            else:
+                shard_index, row = location
+                self._write(self._shards[shard_index], row, user_id, descriptor)
+
+    def refresh(self, user_id, descriptor, expected=None):
+        """
+        Overwrite the template of an enrolled user in place.
+
+        :param user_id: The user's id.
+        :param descriptor: The new 128-d template.
+        :param expected: If given, only refresh while the user's template still equals it.
+        :return: False if the user is not enrolled or the template is not the expected one.
+        """
+        descriptor = np.asarray(descriptor, dtype=np.float32).reshape(DESCRIPTOR_SIZE)
+        with self._lock.write():
+            location = self._location.get(user_id)
+            if location is None:
+                return False
+            shard_index, row = location
+            if expected is not None and not np.array_equal(
+                    self._shards[shard_index].views[2][row], expected):
+                return False
+            self._record(user_id, descriptor)
+            self._write(self._shards[shard_index], row, user_id, descriptor)
+            return True
+
+    def remove(self, user_id):
+        """
+        Remove the template of a user, if enrolled.
+
+        :param user_id: The user's id.
+        """
+        with self._lock.write():
+            self._record(user_id, None)
+            location = self._location.pop(user_id, None)
+            if location is None:
+                return
+            shard_index, row = location
+            shard = self._shards[shard_index]
+            last = shard.count - 1
+            if row != last:
+                # Move the last row into the hole
+                for view in shard.views:
+                    view[row] = view[last]
+                self._location[int(shard.views[0][row])] = (shard_index, row)
+            shard.count = last
+
+    def _record(self, user_id, descriptor):
+        # Called with the lock held; None records a removal
+        if self._journal is not None:
+            self._journal[user_id] = descriptor
+
+    def reload(self, loader):
+        """
+        Replace the gallery contents with freshly read arrays, keeping the changes made meanwhile.
+
+        :param loader: Callable returning (user_ids, templates) arrays, such as
+            `load_gallery_arrays`.
+        """
+        with self._lock.write():
+            self._journal = {}
+        try:
+            user_ids, templates = loader()
+        except BaseException:
+            with self._lock.write():
+                self._journal = None
+            raise
+        # One acquisition, so that no change can land between the journal swap and the replay
+        with self._lock.write():
+            journal, self._journal = self._journal, None
+            self.load_arrays(user_ids, templates)
+            for user_id, descriptor in journal.items():
+                if descriptor is None:
+                    self.remove(user_id)
+                else:
+                    self.upsert(user_id, descriptor)
+
+    def template(self, user_id):
+        """
+        Return the template of a user, or None if not enrolled.
+        """
+        with self._lock.read():
+            location = self._location.get(user_id)
+            if location is None:
+                return None
+            shard_index, row = location
+            return self._shards[shard_index].views[2][row].copy()
+
+    def health_check(self):
+        """
+        Ping every shard worker and respawn the ones that are dead or unresponsive.
+
+        Runs every `health_interval` seconds in the background; the latest result is kept in
+        `health` and served at /admin/gallery.
+
+        :return: A list with one bool per shard, True if the shard was healthy.
+        """
+        with self._lock.read():
+            shards = list(self._shards)
+        healthy = [shard.alive() for shard in shards]
+        self.health = {"checked_at": time.time(), "healthy": healthy}
+        if not all(healthy):
+            self._restart([shard for shard, ok in zip(shards, healthy) if not ok])
+        return healthy
+
+    def _restart(self, shards):
+        with self._lock.write():
+            for shard in shards:
+                # Another search or health check may have restarted it meanwhile
+                if shard in self._shards and not shard.alive():
+                    shard.restart()
+                    self.restarts += 1
+
+    def _monitor(self, interval):
+        while not self._closed.wait(interval):
+            try:
+                self.health_check()
+            except Exception as e:
+                print("Error:", f"Gallery shard health check failed: {e}")
+
+    def stats(self):
+        """
+        Return the size of each shard and the latest health check.
+
+        :return: A dict of gallery statistics.
+        """
+        with self._lock.read():
+            shards = [{"count": shard.count, "capacity": shard.capacity,
+                       "pid": shard.process.pid if shard.process else None}
+                      for shard in self._shards]
+        return {"sharded": True, "size": len(self), "shards": shards,
+                "health": self.health, "restarts": self.restarts}
+
+    def search(self, probes, k=1):
+        """
+        Find the k nearest templates for each probe across all shards.
+
+        Searches only share the lock with each other, so several can be in flight at once.
+
+        :param probes: Array of shape (P, 128) or (128,).
+        :param k: Number of neighbours to return per probe.
+        :return: A tuple of (user_ids, distances), each of shape (P, min(k, N)), nearest first.
+        """
+        probes = np.atleast_2d(np.asarray(probes, dtype=np.float32))
+        with self._lock.read():
+            # Scatter to every shard before gathering so the shards run in parallel
+            shards = list(self._shards)
+            replies = [shard.request("search", shard.count, probes, k) for shard in shards]
+
+            results, failed = [], []
+            for shard, reply in zip(shards, replies):
+                result = reply.get(self.timeout)
+                if result is None:
+                    failed.append(shard)
+                    result = _shard_top_k(shard.views, shard.count, probes, k)
+                results.append(result)
+        # A shard that is only busy is left alone: restarting it would hold the write lock, and
+        # so every search, behind its backlog. Hung workers are left to the health check.
+        dead = [shard for shard in failed
+                if shard.process is None or not shard.process.is_alive()]
+        if dead:
+            self._restart(dead)
+
+        return self._merge(results, probes, k)
+
+    @staticmethod
+    def _merge(results, probes, k):
+        """
+        Merge per-shard top-k candidates into the global top-k.
+        """
+        user_ids = np.concatenate([ids for ids, _ in results], axis=1)
+        partial = np.concatenate([dist for _, dist in results], axis=1)
+        k = min(k, user_ids.shape[1])
+        order = np.argsort(partial, axis=1, kind="stable")[:, :k]
+
+        probe_norms = np.einsum("ij,ij->i", probes, probes)[:, None]
+        distances = np.sqrt(np.maximum(
+            np.take_along_axis(partial, order, axis=1) + probe_norms, 0.0))
+        return np.take_along_axis(user_ids, order, axis=1), distances.astype(np.float32)
@@ -0,0 +1,238 @@
+"""
+wire.py - Face Descriptor Wire Format
+
+This module decodes face descriptors sent to the biometric endpoints and encodes the templates
+stored in `User.biometric_data`.
+
+Supported request bodies:
+- application/octet-stream: An 8-byte header followed by raw little-endian descriptors.
+- application/msgpack: A map with "dtype", "dim" and "data" (raw little-endian descriptors).
+- application/json: The legacy {"faceData": ...} body, kept as a fallback.
+
+Binary header layout (little-endian, 8 bytes):
+    magic (2s) = b"FD", version (B) = 1, dtype (B) = 1 for float32 / 2 for float16,
+    count (H) = number of descriptors, dim (H) = values per descriptor.
+
+Binary payloads are decoded with `np.frombuffer`, so float32 descriptors are returned as a
+read-only view over the request body without copying.
+"""
+
+import base64
+import struct
+
+import numpy as np
+
+from biometrics.engine import DESCRIPTOR_SIZE
+
+OCTET_STREAM = "application/octet-stream"
+MSGPACK_TYPES = ("application/msgpack", "application/x-msgpack")
+
+HEADER = struct.Struct("<2sBBHH")
+MAGIC = b"FD"
+VERSION = 1
+DTYPE_CODES = {1: np.dtype("<f4"), 2: np.dtype("<f2")}
+DTYPE_NAMES = {"f4": np.dtype("<f4"), "f2": np.dtype("<f2")}
+
+# Storage format of a template in User.biometric_data
+TEMPLATE_DTYPE = np.dtype("<f4")
+
+
+class WireFormatError(ValueError):
+    """
+    Raised when a descriptor payload cannot be decoded.
+    """
+
+
+def _validate(descriptors):
+    """
+    Check decoded descriptors and return them as a float32 (count, 128) array.
+    """
+    if descriptors.shape[0] == 0 or descriptors.shape[1] != DESCRIPTOR_SIZE:
+        raise WireFormatError(
+            f"Expected descriptors of {DESCRIPTOR_SIZE} values, have shape {descriptors.shape}")
+    if descriptors.dtype != np.float32:
+        descriptors = descriptors.astype(np.float32)
+    if not np.isfinite(descriptors).all():
+        raise WireFormatError("Descriptors contain non-finite values")
+    return descriptors
+
+
+def encode_frame(descriptors, dtype="<f4"):
+    """
+    Encode descriptors into the binary wire format.
+
+    :param descriptors: Array-like of shape (count, dim) or (dim,).
+    :param dtype: "<f4" for float32 or "<f2" for float16.
+    :return: The encoded bytes.
+    """
+    dtype = np.dtype(dtype)
+    code = next(code for code, value in DTYPE_CODES.items() if value == dtype)
+    descriptors = np.atleast_2d(np.asarray(descriptors, dtype=dtype))
+    count, dim = descriptors.shape
+    return HEADER.pack(MAGIC, VERSION, code, count, dim) + descriptors.tobytes()
+
+
+def decode_frame(buffer):
+    """
+    Decode descriptors from the binary wire format.
+
+    :param buffer: The request body (bytes-like).
+    :return: A float32 array of shape (count, 128).
+    :raises WireFormatError: If the header or payload size is invalid.
+    """
+    if len(buffer) < HEADER.size:
+        raise WireFormatError("Payload is shorter than the header")
+
+    magic, version, code, count, dim = HEADER.unpack_from(buffer)
+    if magic != MAGIC or version != VERSION:
+        raise WireFormatError("Unknown descriptor payload header")
+    dtype = DTYPE_CODES.get(code)
+    if dtype is None:
+        raise WireFormatError(f"Unknown descriptor dtype code: {code}")
+    if len(buffer) != HEADER.size + count * dim * dtype.itemsize:
+        raise WireFormatError("Payload size does not match the header")
+
+    descriptors = np.frombuffer(buffer, dtype=dtype, count=count * dim, offset=HEADER.size)
+    return _validate(descriptors.reshape(count, dim))
+
+
+def _read_exact(stream, size):
+    """
+    Read exactly `size` bytes from a stream, or fewer only at end of stream.
+    """
+    chunks = []
+    while size > 0:
+        chunk = stream.read(size)
+        if not chunk:
+            break
+        chunks.append(chunk)
+        size -= len(chunk)
+    return b"".join(chunks)
+
+
+def read_frames(stream):
+    """
+    Decode successive binary descriptor payloads from a streamed request body.
+
+    Each payload is decoded as soon as its bytes have arrived, so a caller can act on early
+    frames while the client is still sending later ones.
+
+    :param stream: A file-like object, e.g. `request.stream`.
+    :return: A generator of float32 arrays of shape (count, 128).
+    :raises WireFormatError: If a payload is invalid or truncated.
+    """
+    while True:
+        header = _read_exact(stream, HEADER.size)
+        if not header:
+            return
+        if len(header) < HEADER.size:
+            raise WireFormatError("Payload is shorter than the header")
+
+        magic, version, code, count, dim = HEADER.unpack(header)
+        dtype = DTYPE_CODES.get(code)
+        if magic != MAGIC or version != VERSION or dtype is None:
+            raise WireFormatError("Unknown descriptor payload header")
+        payload = _read_exact(stream, count * dim * dtype.itemsize)
+        yield decode_frame(header + payload)
+
+
+def decode_msgpack(buffer):
+    """
+    Decode descriptors from a MessagePack payload.
+
+    :param buffer: The request body (bytes-like).
+    :return: A float32 array of shape (count, 128).
+    :raises WireFormatError: If the payload is invalid or msgpack is not installed.
+    """
+    try:
+        import msgpack
+    except ImportError:
+        raise WireFormatError("MessagePack payloads are not supported on this server")
+
+    try:
+        payload = msgpack.unpackb(buffer, raw=False)
+        dtype = DTYPE_NAMES[payload.get("dtype", "f4")]
+        dim = int(payload.get("dim", DESCRIPTOR_SIZE))
+        data = payload["data"]
+    except Exception:
+        raise WireFormatError("Invalid MessagePack descriptor payload")
+
+    if not isinstance(data, (bytes, bytearray)) or dim <= 0 or len(data) % (dim * dtype.itemsize):
+        raise WireFormatError("Invalid MessagePack descriptor data")
+    return _validate(np.frombuffer(data, dtype=dtype).reshape(-1, dim))
+
+
+def decode_json(face_data):
+    """
+    Decode descriptors from the legacy JSON "faceData" field.
+
+    Accepted forms are a list of numbers, an object keyed by index (how `JSON.stringify`
+    serializes a Float32Array) and a base64 string of raw little-endian float32 values.
+
+    :param face_data: The value of the "faceData" field.
+    :return: A float32 array of shape (count, 128).
+    :raises WireFormatError: If the value cannot be decoded.
+    """
+    try:
+        if isinstance(face_data, str):
+            raw = base64.b64decode(face_data, validate=True)
+            values = np.frombuffer(raw, dtype=TEMPLATE_DTYPE)
+        elif isinstance(face_data, dict):
+            values = np.array([face_data[str(idx)] for idx in range(len(face_data))],
+                              dtype=np.float32)
+        elif isinstance(face_data, list):
+            values = np.array(face_data, dtype=np.float32)
+        else:
+            raise WireFormatError("Missing face data")
+    except WireFormatError:
+        raise
+    except Exception:
+        raise WireFormatError("Invalid face data format")
+
+    if values.size == 0 or values.size % DESCRIPTOR_SIZE:
+        raise WireFormatError("Invalid face data length")
+    return _validate(values.reshape(-1, DESCRIPTOR_SIZE))
+
+
+def descriptors_from_request(request):
+    """
+    Decode the descriptors carried by a Flask request according to its content type.
+
+    :param request: The Flask request.
+    :return: A float32 array of shape (count, 128).
+    :raises WireFormatError: If the body cannot be decoded.
+    """
+    if request.mimetype == OCTET_STREAM:
+        return decode_frame(request.get_data(cache=False))
+    if request.mimetype in MSGPACK_TYPES:
+        return decode_msgpack(request.get_data(cache=False))
+
+    body = request.get_json(silent=True)
+    if body is None:
+        body = {}
+    if not isinstance(body, dict):
+        raise WireFormatError("Invalid face data format")
+    return decode_json(body.get("faceData"))
+
+
+def encode_template(descriptor):
+    """
+    Encode a descriptor for storage in `User.biometric_data`.
+
+    :param descriptor: Array-like of 128 values.
+    :return: The raw little-endian float32 bytes.
+    """
+    return np.asarray(descriptor, dtype=TEMPLATE_DTYPE).reshape(DESCRIPTOR_SIZE).tobytes()
+
+
+def decode_template(data):
+    """
+    Decode a descriptor stored in `User.biometric_data`.
+
+    :param data: The raw little-endian float32 bytes.
+    :return: A read-only float32 array of 128 values, or None if the data is not a template.
+    """
+    if not isinstance(data, (bytes, bytearray, memoryview)) or \
+            len(data) != DESCRIPTOR_SIZE * TEMPLATE_DTYPE.itemsize:
+        return None
+    return np.frombuffer(data, dtype=TEMPLATE_DTYPE)
@@ -1,14 +1,150 @@
 # config.py
 import os
+import tempfile
 from dotenv import load_dotenv
 
 # Load environment variables from the .env file
 load_dotenv()
 
 
+def env_list(name):
+    """Read a comma-separated list from an environment variable."""
+    return [item.strip() for item in os.getenv(name, "").split(",") if item.strip()]
+
+
 class Config:
     """Base configuration class."""
     SQLALCHEMY_TRACK_MODIFICATIONS = False
+    # Directory holding the face-api.js weight manifests and shards
+    FACE_API_MODEL_DIR = os.getenv("FACE_API_MODEL_DIR", os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "..", "client", "face-api"))
+    # Maximum number of images per network forward pass
+    FACE_ENGINE_BATCH_SIZE = int(os.getenv("FACE_ENGINE_BATCH_SIZE", "32"))
+    # Maximum face descriptor distance accepted as a match (face-api.js default)
+    BIOMETRIC_MATCH_THRESHOLD = float(os.getenv("BIOMETRIC_MATCH_THRESHOLD", "0.6"))
+    # Streaming authentication: evidence needed to accept or reject, and frame budget
+    BIOMETRIC_STREAM_ACCEPT_EVIDENCE = 0.15
+    BIOMETRIC_STREAM_REJECT_EVIDENCE = 1.0
+    BIOMETRIC_STREAM_MAX_FRAMES = 10
+    # Repeat probe cache: maximum cached probes (0 disables) and seconds they stay valid
+    BIOMETRIC_PROBE_CACHE_SIZE = int(os.getenv("BIOMETRIC_PROBE_CACHE_SIZE", "1024"))
+    BIOMETRIC_PROBE_CACHE_TTL = float(os.getenv("BIOMETRIC_PROBE_CACHE_TTL", "30"))
+    # Enrollment is refused when another account's template is at most this distance away
+    # (0 disables the check)
+    BIOMETRIC_DUPLICATE_THRESHOLD = float(os.getenv("BIOMETRIC_DUPLICATE_THRESHOLD", "0.4"))
+    # Adaptive templates (opt-in, see biometrics/adaptation.py): biometric logins at most
+    # BIOMETRIC_ADAPTIVE_MAX_DISTANCE from the template move it toward the probe by
+    # BIOMETRIC_ADAPTIVE_RATE (at most 0.5), at most once per BIOMETRIC_ADAPTIVE_INTERVAL seconds
+    # per user and BIOMETRIC_ADAPTIVE_MAX_DRIFT in total since enrollment; adaptations are applied
+    # in batches every BIOMETRIC_ADAPTIVE_FLUSH_INTERVAL seconds
+    BIOMETRIC_ADAPTIVE_ENABLED = os.getenv("BIOMETRIC_ADAPTIVE_ENABLED", "false").lower() == "true"
+    BIOMETRIC_ADAPTIVE_RATE = float(os.getenv("BIOMETRIC_ADAPTIVE_RATE", "0.05"))
+    BIOMETRIC_ADAPTIVE_MAX_DISTANCE = float(os.getenv("BIOMETRIC_ADAPTIVE_MAX_DISTANCE", "0.35"))
+    BIOMETRIC_ADAPTIVE_INTERVAL = float(os.getenv("BIOMETRIC_ADAPTIVE_INTERVAL", "86400"))
+    BIOMETRIC_ADAPTIVE_MAX_DRIFT = float(os.getenv("BIOMETRIC_ADAPTIVE_MAX_DRIFT", "0.25"))
+    BIOMETRIC_ADAPTIVE_FLUSH_INTERVAL = float(os.getenv("BIOMETRIC_ADAPTIVE_FLUSH_INTERVAL", "30"))
+    BIOMETRIC_ADAPTIVE_BATCH_SIZE = int(os.getenv("BIOMETRIC_ADAPTIVE_BATCH_SIZE", "500"))
+    # Seconds between background reloads of each process's gallery from the database, so that
+    # enrollments and deletions handled by other workers become visible (0 never reloads)
+    BIOMETRIC_GALLERY_RELOAD_SECONDS = float(os.getenv("BIOMETRIC_GALLERY_RELOAD_SECONDS", "60"))
+    # Number of worker processes the gallery is sharded across (0 or 1 matches in-process)
+    BIOMETRIC_GALLERY_SHARDS = int(os.getenv("BIOMETRIC_GALLERY_SHARDS", "0"))
+    # Seconds to wait for a shard before searching it in the web process
+    BIOMETRIC_SHARD_TIMEOUT = float(os.getenv("BIOMETRIC_SHARD_TIMEOUT", "5.0"))
+    # Seconds between background health checks of the shard workers (0 disables them)
+    BIOMETRIC_SHARD_HEALTH_SECONDS = float(os.getenv("BIOMETRIC_SHARD_HEALTH_SECONDS", "30"))
+    # Base64 of the 32-byte master key wrapping the template encryption keys; templates are stored
+    # unencrypted when unset
+    TEMPLATE_MASTER_KEY = os.getenv("TEMPLATE_MASTER_KEY")
+    # Seconds before a template key created by rotation is used for new templates
+    TEMPLATE_KEY_REFRESH_SECONDS = float(os.getenv("TEMPLATE_KEY_REFRESH_SECONDS", "60"))
+    # Gallery loading: rows fetched per batch and threads decrypting them
+    BIOMETRIC_GALLERY_LOAD_BATCH = int(os.getenv("BIOMETRIC_GALLERY_LOAD_BATCH", "10000"))
+    BIOMETRIC_GALLERY_LOAD_WORKERS = int(
+        os.getenv("BIOMETRIC_GALLERY_LOAD_WORKERS", str(min(8, os.cpu_count() or 1))))
+    # JSON codec for responses and request bodies: "auto" (orjson if installed), "orjson" or "stdlib"
+    JSON_CODEC = os.getenv("JSON_CODEC", "auto")
+    # Seconds between rebuilds of the username/email availability filter from the database
+    AVAILABILITY_FILTER_REBUILD_SECONDS = float(
+        os.getenv("AVAILABILITY_FILTER_REBUILD_SECONDS", "300"))
+    # Write-behind authentication event log: whether routes record events, queue bound, and
+    # maximum events per INSERT and seconds before a partial batch is written
+    AUTH_EVENT_LOG_ENABLED = os.getenv("AUTH_EVENT_LOG_ENABLED", "true").lower() == "true"
+    AUTH_EVENT_QUEUE_SIZE = int(os.getenv("AUTH_EVENT_QUEUE_SIZE", "10000"))
+    AUTH_EVENT_BATCH_SIZE = int(os.getenv("AUTH_EVENT_BATCH_SIZE", "500"))
+    AUTH_EVENT_FLUSH_INTERVAL = float(os.getenv("AUTH_EVENT_FLUSH_INTERVAL", "1.0"))
+    # When the queue is full: "drop" the event, or "block" the request for up to
+    # AUTH_EVENT_BLOCK_SECONDS waiting for room
+    AUTH_EVENT_OVERFLOW = os.getenv("AUTH_EVENT_OVERFLOW", "drop")
+    AUTH_EVENT_BLOCK_SECONDS = float(os.getenv("AUTH_EVENT_BLOCK_SECONDS", "0.05"))
+    # On-demand request profiling (see diagnostics/profiling.py): master switch, fraction of
+    # requests profiled, optional path prefixes for sampling (comma-separated), and the key that
+    # signs X-Profile headers
+    PROFILING_ENABLED = os.getenv("PROFILING_ENABLED", "false").lower() == "true"
+    PROFILING_SAMPLE_RATE = float(os.getenv("PROFILING_SAMPLE_RATE", "0"))
+    PROFILING_PATHS = [path.strip()
+                       for path in os.getenv("PROFILING_PATHS", "").split(",") if path.strip()]
+    PROFILING_SECRET = os.getenv("PROFILING_SECRET")
+    # "cprofile" or "sampling", and the sampling profiler's interval in seconds
+    PROFILING_MODE = os.getenv("PROFILING_MODE", "cprofile")
+    PROFILING_SAMPLE_INTERVAL = float(os.getenv("PROFILING_SAMPLE_INTERVAL", "0.005"))
+    # Directory profiles are written to, and the number of newest profiles it keeps
+    PROFILING_DIR = os.getenv("PROFILING_DIR", os.path.join(tempfile.gettempdir(), "profiles"))
+    PROFILING_MAX_PROFILES = int(os.getenv("PROFILING_MAX_PROFILES", "200"))
+    # Client directory holding the face-api.js and MDB assets, and the directory
+    # `flask assets build` writes their hashed and precompressed variants to
+    ASSETS_SOURCE_DIR = os.getenv("ASSETS_SOURCE_DIR", os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "..", "client"))
+    ASSETS_BUILD_DIR = os.getenv("ASSETS_BUILD_DIR", os.path.join(
+        os.path.dirname(os.path.abspath(__file__)), "..", "client", "dist"))
+    # Seconds a client's reads stay on the primary after one of its requests writes
+    # (read-your-writes), and seconds a read replica that failed to connect is skipped
+    REPLICA_STICKY_SECONDS = float(os.getenv("REPLICA_STICKY_SECONDS", "5"))
+    REPLICA_RETRY_SECONDS = float(os.getenv("REPLICA_RETRY_SECONDS", "30"))
+    # Threads per server worker process (gunicorn --threads); admission budgets are per worker
+    # process and sized from them
+    SERVER_THREADS = int(os.getenv("SERVER_THREADS", "8"))
+    # Admission control of CPU-heavy routes (see admission/control.py): master switch, threads
+    # kept free for unbudgeted routes, and per budget its share of the other threads (running
+    # plus queued requests), its maximum concurrent requests (default one per CPU) and the
+    # maximum seconds a request waits in the queue. A biometric stream holds its thread for the
+    # whole capture, mostly waiting on the client, so streams have a budget of their own that
+    # runs every one of its threads at once
+    ADMISSION_CONTROL_ENABLED = os.getenv("ADMISSION_CONTROL_ENABLED", "true").lower() == "true"
+    ADMISSION_RESERVED_THREADS = int(os.getenv("ADMISSION_RESERVED_THREADS", "2"))
+    ADMISSION_BUDGETS = {
+        "password": {
+            "share": float(os.getenv("ADMISSION_PASSWORD_SHARE", "0.4")),
+            "concurrency": int(os.getenv("ADMISSION_PASSWORD_CONCURRENCY", "0")),
+            "max_wait": float(os.getenv("ADMISSION_PASSWORD_MAX_WAIT", "2.0")),
+        },
+        "biometric": {
+            "share": float(os.getenv("ADMISSION_BIOMETRIC_SHARE", "0.3")),
+            "concurrency": int(os.getenv("ADMISSION_BIOMETRIC_CONCURRENCY", "0")),
+            "max_wait": float(os.getenv("ADMISSION_BIOMETRIC_MAX_WAIT", "3.0")),
+        },
+        "biometric_stream": {
+            "share": float(os.getenv("ADMISSION_BIOMETRIC_STREAM_SHARE", "0.3")),
+            "concurrency": int(os.getenv("ADMISSION_BIOMETRIC_STREAM_CONCURRENCY",
+                                         str(SERVER_THREADS))),
+            "max_wait": float(os.getenv("ADMISSION_BIOMETRIC_STREAM_MAX_WAIT", "1.0")),
+        },
+    }
+    # Budget and priority class ("interactive" or "bulk") of each budgeted endpoint; endpoints not
+    # listed are never queued or shed
+    ADMISSION_ROUTES = {
+        "user.login": ("password", "interactive"),
+        "user.register": ("password", "bulk"),
+        "user.authenticate_with_biometrics": ("biometric", "interactive"),
+        "user.authenticate_with_biometrics_stream": ("biometric_stream", "interactive"),
+        "user.store_biometric_data": ("biometric", "bulk"),
+        "user.extract_face_descriptors": ("biometric", "bulk"),
+    }
+    # Emails of the accounts allowed to use the /admin routes (comma-separated)
+    ADMIN_EMAILS = {email.strip().lower()
+                    for email in os.getenv("ADMIN_EMAILS", "").split(",") if email.strip()}
+    # Maximum number of users per /admin/users page
+    ADMIN_PAGE_SIZE_MAX = 1000
     # Add this configuration option to force HTTPS
     # SESSION_COOKIE_SECURE = True
 
@@ -18,6 +154,8 @@ class DevelopmentConfig(Config):
     DEBUG = True
     # PostgreSQL database URL
     SQLALCHEMY_DATABASE_URI = os.getenv("DEV_DATABASE_URL")
+    # Read replica URLs (comma-separated) for read-only queries
+    SQLALCHEMY_REPLICA_URIS = env_list("DEV_DATABASE_REPLICA_URLS")
     # Secret key for session management
     JWT_SECRET_KEY = os.getenv("DEV_SECRET_KEY")
 
@@ -27,6 +165,8 @@ class TestingConfig(Config):
     TESTING = True
     # PostgreSQL database URL for testing
     SQLALCHEMY_DATABASE_URI = os.getenv("TEST_DATABASE_URL")
+    # Read replica URLs (comma-separated) for read-only queries
+    SQLALCHEMY_REPLICA_URIS = env_list("TEST_DATABASE_REPLICA_URLS")
     # Secret key for session management
     JWT_SECRET_KEY = os.getenv("TEST_SECRET_KEY")
 
@@ -35,6 +175,8 @@ class ProductionConfig(Config):
     """Production configuration."""
     # PostgreSQL database URL
     SQLALCHEMY_DATABASE_URI = os.getenv("PROD_DATABASE_URL")
+    # Read replica URLs (comma-separated) for read-only queries
+    SQLALCHEMY_REPLICA_URIS = env_list("PROD_DATABASE_REPLICA_URLS")
     # Secret key for session management
     JWT_SECRET_KEY = os.getenv("PROD_SECRET_KEY")
 
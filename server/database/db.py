@@ -4,10 +4,11 @@ db.py - Database Configuration
 This module configures the database using Flask-SQLAlchemy.
 
 Attributes:
-    db (SQLAlchemy): The SQLAlchemy object for database management.
+    db (RoutingSQLAlchemy): The SQLAlchemy object for database management, which sends read-only
+        queries to the configured read replicas (see database/routing.py).
 
 """
 
-from flask_sqlalchemy import SQLAlchemy
+from database.routing import RoutingSQLAlchemy
 
-db = SQLAlchemy()
+db = RoutingSQLAlchemy()
@@ -0,0 +1,198 @@
+"""
+routing.py - Read Replica Routing
+
+This module routes the session's read-only queries to read replicas so that reads scale with the
+number of replicas while every write still goes to the primary (SQLALCHEMY_DATABASE_URI).
+
+Routing rules:
+- Plain SELECTs go to a randomly chosen replica from SQLALCHEMY_REPLICA_URIS.
+- Flushes, INSERT/UPDATE/DELETE, SELECT ... FOR UPDATE and textual SQL go to the primary. Textual
+  SQL cannot be told apart from a write, but a textual SELECT does not count as one below.
+- Read-your-writes: once a session has written, its reads stay on the primary until it is closed
+  (the end of the request). A request that wrote also sets the STICKY_COOKIE cookie to the time of
+  the write, and for REPLICA_STICKY_SECONDS after it the reads of that client's requests stay on
+  the primary in every server process, which covers a client reading back its write in its next
+  request while the replicas catch up. Other clients keep reading from the replicas. Set it above
+  the replicas' usual lag. Cross-origin clients only send the cookie with credentialed requests;
+  work outside requests (CLI commands, background threads) has no sticky window.
+- Fallback: a replica that cannot be connected to is skipped for REPLICA_RETRY_SECONDS and the
+  query is run on the primary instead.
+
+Replicas are registered as the Flask-SQLAlchemy binds "replica_0", "replica_1", ...; no model uses
+them, so `db.create_all()` and migrations only touch the primary. Locally, two SQLite files or two
+Postgres databases can stand in for a primary and a replica.
+"""
+
+import math
+import random
+import threading
+import time
+
+from flask import current_app, g, has_request_context, request
+from flask_sqlalchemy import SignallingSession, SQLAlchemy
+from sqlalchemy import exc, orm
+from sqlalchemy.sql.expression import TextClause
+
+# Cookie holding the time (seconds since the epoch) of the client's last write
+STICKY_COOKIE = "replica_last_write"
+
+
+class ReplicaSet:
+    """
+    The replica binds of an application with their health.
+    """
+
+    def __init__(self, names, sticky_seconds=5.0, retry_seconds=30.0):
+        """
+        :param names: The replicas' bind names.
+        :param sticky_seconds: Seconds reads stay on the primary after a write.
+        :param retry_seconds: Seconds a replica is skipped after failing to connect.
+        """
+        self.names = list(names)
+        self.sticky_seconds = sticky_seconds
+        self.retry_seconds = retry_seconds
+        self._lock = threading.Lock()
+        self._down_until = {}
+        self._names_by_engine = {}
+
+    def recently_written(self):
+        """
+        :return: True if the current request's client wrote within the sticky window.
+        """
+        if self.sticky_seconds <= 0 or not has_request_context():
+            return False
+        try:
+            written_at = float(request.cookies.get(STICKY_COOKIE, ""))
+        except ValueError:
+            return False
+        # A time in the future is a forged cookie; ignore it rather than pin the client
+        return 0.0 <= time.time() - written_at < self.sticky_seconds
+
+    def choose(self):
+        """
+        Pick a healthy replica.
+
+        :return: A bind name, or None if every replica is down.
+        """
+        now = time.monotonic()
+        healthy = [name for name in self.names if self._down_until.get(name, 0.0) <= now]
+        return random.choice(healthy) if healthy else None
+
+    def mark_down(self, name):
+        with self._lock:
+            self._down_until[name] = time.monotonic() + self.retry_seconds
+
+    def register_engine(self, name, engine):
+        self._names_by_engine[engine] = name
+
+    def name_of(self, engine):
+        """
+        :return: The bind name of a replica engine, or None for other engines.
+        """
+        return self._names_by_engine.get(engine)
+
+
+def _is_read(clause):
+    return (clause is not None and getattr(clause, "is_select", False)
+            and getattr(clause, "_for_update_arg", None) is None)
+
+
+def _is_textual_select(clause):
+    return isinstance(clause, TextClause) and clause.text.lstrip().lower().startswith("select")
+
+
+def _mark_written():
+    if has_request_context():
+        g.replica_last_write = time.time()
+
+
+def _set_sticky_cookie(response):
+    written_at = g.pop("replica_last_write", None)
+    replicas = current_app.extensions.get("database_replicas")
+    if written_at is not None and replicas is not None and replicas.names \
+            and replicas.sticky_seconds > 0:
+        response.set_cookie(STICKY_COOKIE, f"{written_at:.3f}",
+                            max_age=math.ceil(replicas.sticky_seconds), httponly=True,
+                            secure=request.is_secure,
+                            samesite="None" if request.is_secure else "Lax")
+    return response
+
+
+class RoutingSession(SignallingSession):
+    """
+    A session sending read-only queries to replicas; see the module docstring for the rules.
+    """
+
+    def __init__(self, db, **options):
+        super().__init__(db, **options)
+        self._db = db
+        self._wrote = False
+
+    def get_bind(self, mapper=None, clause=None, **kwargs):
+        replicas = self.app.extensions.get("database_replicas")
+        if replicas is None or not replicas.names:
+            return super().get_bind(mapper, clause)
+
+        if self._flushing or (clause is not None and not _is_read(clause)
+                              and not _is_textual_select(clause)):
+            self._wrote = True
+            _mark_written()
+        elif _is_read(clause) and not self._wrote and not replicas.recently_written():
+            name = replicas.choose()
+            if name is not None:
+                engine = self._db.get_engine(self.app, bind=name)
+                replicas.register_engine(name, engine)
+                return engine
+        return super().get_bind(mapper, clause)
+
+    def _connection_for_bind(self, engine, execution_options=None, **kw):
+        replicas = self.app.extensions.get("database_replicas")
+        name = replicas.name_of(engine) if replicas is not None else None
+        if name is None:
+            return super()._connection_for_bind(engine, execution_options, **kw)
+        try:
+            return super()._connection_for_bind(engine, execution_options, **kw)
+        except exc.DBAPIError as e:
+            replicas.mark_down(name)
+            print("Error:", f"Replica {name} is unavailable, reading from the primary: {e}")
+            return super()._connection_for_bind(self.bind, execution_options, **kw)
+
+    def close(self):
+        self._wrote = False
+        super().close()
+
+
+class RoutingSQLAlchemy(SQLAlchemy):
+    """
+    Flask-SQLAlchemy with read replica routing for `db.session`.
+    """
+
+    def create_session(self, options):
+        return orm.sessionmaker(class_=RoutingSession, db=self, **options)
+
+    def _execute_for_all_tables(self, app, bind, operation, skip_tables=False):
+        # create_all()/drop_all()/reflect() never touch the replicas
+        if bind == "__all__":
+            app = self.get_app(app)
+            replicas = app.extensions["database_replicas"].names
+            bind = [None] + [key for key in app.config.get("SQLALCHEMY_BINDS") or ()
+                             if key not in replicas]
+        super()._execute_for_all_tables(app, bind, operation, skip_tables)
+
+    def init_app(self, app):
+        """
+        Register SQLALCHEMY_REPLICA_URIS as binds and initialize the extension.
+
+        :param app: The Flask application.
+        """
+        uris = app.config.get("SQLALCHEMY_REPLICA_URIS") or []
+        names = [f"replica_{index}" for index in range(len(uris))]
+        if uris:
+            app.config["SQLALCHEMY_BINDS"] = {
+                **(app.config.get("SQLALCHEMY_BINDS") or {}), **dict(zip(names, uris))}
+        app.extensions["database_replicas"] = ReplicaSet(
+            names,
+            sticky_seconds=app.config.get("REPLICA_STICKY_SECONDS", 5.0),
+            retry_seconds=app.config.get("REPLICA_RETRY_SECONDS", 30.0))
+        app.after_request(_set_sticky_cookie)
+        super().init_app(app)
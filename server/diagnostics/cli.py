@@ -0,0 +1,31 @@
+"""
+cli.py - Diagnostics Command-Line Interface
+
+This module registers the `flask profiling` command group.
+
+Commands:
+- token: Print a signed X-Profile header value that profiles the requests carrying it.
+"""
+
+import time
+
+import click
+from flask import current_app
+from flask.cli import AppGroup
+
+from diagnostics.profiling import sign_profile_token
+
+profiling_cli = AppGroup("profiling", help="Request profiling commands.")
+
+
+@profiling_cli.command("token")
+@click.option("--ttl", default=3600, show_default=True,
+              help="Seconds until the token expires.")
+def token_command(ttl):
+    """
+    Print an X-Profile header value signed with PROFILING_SECRET.
+    """
+    secret = current_app.config.get("PROFILING_SECRET")
+    if not secret:
+        raise click.ClickException("PROFILING_SECRET is not set")
+    click.echo(sign_profile_token(secret, time.time() + ttl))
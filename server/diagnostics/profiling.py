@@ -0,0 +1,374 @@
+"""
+profiling.py - On-Demand Request Profiling
+
+This module provides a WSGI middleware that profiles selected requests in production, so that a
+regressed endpoint can be examined where it regressed. A request is profiled when PROFILING_ENABLED
+is set and either:
+- it is picked by PROFILING_SAMPLE_RATE (restricted to the PROFILING_PATHS prefixes, if any), or
+- it carries an X-Profile header signed with PROFILING_SECRET (see `sign_profile_token` and
+  `flask profiling token`), which profiles that request whatever the sample rate.
+
+Each profiled request is captured with PROFILING_MODE:
+- "cprofile": deterministic cProfile of the request thread, saved as `<id>.prof` (pstats).
+- "sampling": the request thread's stack every PROFILING_SAMPLE_INTERVAL seconds, which costs far
+  less on call-heavy code such as the NumPy face engine.
+
+Both modes write `<id>.collapsed`, one "frame;frame;frame weight" line per stack, which
+flamegraph.pl and speedscope read directly, and `<id>.json` with the request method and path, its
+status, its duration and every SQL statement with its duration (neither the query string nor SQL
+parameters are recorded; they hold usernames, emails, password hashes and templates). Profiles go
+to PROFILING_DIR, which keeps the newest PROFILING_MAX_PROFILES; the profile id is returned in the
+X-Profile-Id response header.
+
+When PROFILING_ENABLED is off, the middleware costs one branch per request and the SQL hooks are
+never installed.
+"""
+
+import cProfile
+import datetime
+import hashlib
+import hmac
+import itertools
+import json
+import os
+import pstats
+import random
+import re
+import sys
+import threading
+import time
+from collections import Counter, defaultdict
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+PROFILE_HEADER = "HTTP_X_PROFILE"
+
+# Stacks deeper than this are truncated when collapsing cProfile's call graph
+MAX_STACK_DEPTH = 64
+
+_sql = threading.local()
+_sql_hooks_lock = threading.Lock()
+_sql_hooks_installed = False
+
+
+def _frame_label(filename, lineno, name):
+    # ";" separates frames in the collapsed format
+    if filename == "~":
+        return name.replace(";", ":")
+    return f"{name} ({os.path.basename(filename)}:{lineno})".replace(";", ":")
+
+
+def sign_profile_token(secret, expires):
+    """
+    Create an X-Profile header value.
+
+    :param secret: The PROFILING_SECRET.
+    :param expires: Unix time after which the token is rejected.
+    :return: The token string.
+    """
+    expires = str(int(expires))
+    signature = hmac.new(secret.encode("utf-8"), expires.encode("ascii"), hashlib.sha256)
+    return f"{expires}.{signature.hexdigest()}"
+
+
+def verify_profile_token(secret, token, now=None):
+    """
+    Check an X-Profile header value.
+
+    :param secret: The PROFILING_SECRET; without one no token is valid.
+    :param token: The header value.
+    :param now: The current Unix time, defaulting to `time.time()`.
+    :return: True if the token is correctly signed and has not expired.
+    """
+    if not secret or not token or "." not in token:
+        return False
+    expires, _ = token.split(".", 1)
+    if not expires.isdigit() or int(expires) < (time.time() if now is None else now):
+        return False
+    return hmac.compare_digest(token, sign_profile_token(secret, int(expires)))
+
+
+def collapse_pstats(stats):
+    """
+    Convert a cProfile call graph into collapsed stacks weighted in microseconds.
+
+    cProfile records caller/callee pairs rather than whole stacks, so each function's time is
+    split between the paths reaching it in proportion to the time spent through each caller.
+
+    :param stats: A pstats.Stats instance.
+    :return: A Counter mapping "frame;frame;frame" to microseconds.
+    """
+    entries = stats.stats
+    children = defaultdict(list)
+    roots = []
+    for func, (_, _, _, _, callers) in entries.items():
+        if not callers:
+            roots.append(func)
+        for caller, edge in callers.items():
+            children[caller].append((func, edge[3]))
+
+    stacks = Counter()
+
+    def walk(func, path, labels, share):
+        own_time = entries[func][2]
+        labels = labels + (_frame_label(*func),)
+        self_us = int(own_time * share * 1e6)
+        if self_us:
+            stacks[";".join(labels)] += self_us
+        if len(labels) >= MAX_STACK_DEPTH:
+            return
+        for child, edge_time in children[func]:
+            child_time = entries[child][3]
+            child_share = share * edge_time / child_time if child_time else 0.0
+            # Skip recursion and paths too small to show
+            if child not in path and child_share * child_time >= 1e-6:
+                walk(child, path | {child}, labels, child_share)
+
+    for root in roots:
+        walk(root, frozenset((root,)), (), 1.0)
+    return stacks
+
+
+class StackSampler:
+    """
+    Samples one thread's Python stack at a fixed interval from a background thread.
+    """
+
+    def __init__(self, thread_id, interval):
+        """
+        :param thread_id: The `threading.get_ident()` of the thread to sample.
+        :param interval: Seconds between samples.
+        """
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="profile-sampler", daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        self._thread.join()
+
+    def _run(self):
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            labels = []
+            while frame is not None:
+                code = frame.f_code
+                labels.append(_frame_label(code.co_filename, code.co_firstlineno, code.co_name))
+                frame = frame.f_back
+            if labels:
+                self.stacks[";".join(reversed(labels))] += 1
+
+
+def _install_sql_hooks():
+    global _sql_hooks_installed
+    with _sql_hooks_lock:
+        if _sql_hooks_installed:
+            return
+
+        @event.listens_for(Engine, "before_cursor_execute")
+        def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            if getattr(_sql, "queries", None) is not None:
+                context._profiling_started = time.perf_counter()
+
+        @event.listens_for(Engine, "after_cursor_execute")
+        def after_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+            queries = getattr(_sql, "queries", None)
+            started = getattr(context, "_profiling_started", None)
+            if queries is not None and started is not None:
+                queries.append({
+                    "statement": statement,
+                    "duration_ms": (time.perf_counter() - started) * 1000.0,
+                    "executemany": executemany,
+                })
+
+        _sql_hooks_installed = True
+
+
+class _Recording:
+    """
+    The profile of one request in progress.
+    """
+
+    _ids = itertools.count()
+
+    def __init__(self, environ, mode, interval):
+        started_at = datetime.datetime.utcnow()
+        path = re.sub(r"[^A-Za-z0-9]+", "_", environ.get("PATH_INFO", "")).strip("_") or "root"
+        self.profile_id = (f"{started_at:%Y%m%dT%H%M%S%f}-{os.getpid()}-{next(self._ids)}-"
+                           f"{environ.get('REQUEST_METHOD', 'GET').lower()}-{path[:60]}")
+        self.environ = environ
+        self.mode = mode
+        self.started_at = started_at
+        self.status = None
+        self.queries = []
+        self._started = None
+        self._duration = None
+        self._interval = interval
+        self._profiler = cProfile.Profile() if mode == "cprofile" else None
+        self._sampler = (StackSampler(threading.get_ident(), interval)
+                         if mode == "sampling" else None)
+
+    def start(self):
+        _sql.queries = self.queries
+        if self._profiler is not None:
+            try:
+                self._profiler.enable()
+            except ValueError:
+                # Python 3.12+ allows one cProfile at a time; sample concurrent requests instead
+                self._profiler = None
+                self.mode = "sampling"
+                self._sampler = StackSampler(threading.get_ident(), self._interval)
+        if self._sampler is not None:
+            self._sampler.start()
+        self._started = time.perf_counter()
+
+    def stop(self):
+        if self._profiler is not None:
+            self._profiler.disable()
+        self._duration = time.perf_counter() - self._started
+        if self._sampler is not None:
+            self._sampler.stop()
+        _sql.queries = None
+
+    def save(self, directory):
+        """
+        Write the profile files.
+
+        :param directory: The profile directory.
+        """
+        os.makedirs(directory, exist_ok=True)
+        base = os.path.join(directory, self.profile_id)
+        if self._profiler is not None:
+            self._profiler.dump_stats(base + ".prof")
+            stacks = collapse_pstats(pstats.Stats(self._profiler))
+        else:
+            stacks = self._sampler.stacks
+        with open(base + ".collapsed", "w", encoding="utf-8") as f:
+            for stack, weight in stacks.most_common():
+                f.write(f"{stack} {weight}\n")
+        with open(base + ".json", "w", encoding="utf-8") as f:
+            json.dump({
+                "id": self.profile_id,
+                "method": self.environ.get("REQUEST_METHOD"),
+                "path": self.environ.get("PATH_INFO"),
+                "status": self.status,
+                "started_at": self.started_at.isoformat(),
+                "duration_ms": self._duration * 1000.0,
+                "mode": self.mode,
+                "weight_unit": "microseconds" if self.mode == "cprofile" else "samples",
+                "sql_count": len(self.queries),
+                "sql_total_ms": sum(query["duration_ms"] for query in self.queries),
+                "sql": self.queries,
+            }, f, indent=2)
+
+
+class _ProfiledBody:
+    """
+    Wraps a response body so that profiling ends once the server has finished sending it.
+    """
+
+    def __init__(self, body, finish):
+        self._body = body
+        self._finish = finish
+
+    def __iter__(self):
+        return iter(self._body)
+
+    def close(self):
+        try:
+            if hasattr(self._body, "close"):
+                self._body.close()
+        finally:
+            self._finish()
+
+
+class ProfilingMiddleware:
+    """
+    WSGI middleware profiling the requests selected by the application's PROFILING_* settings.
+    """
+
+    def __init__(self, wsgi_app, config):
+        """
+        :param wsgi_app: The wrapped WSGI application.
+        :param config: The Flask application's config, read on every request.
+        """
+        self.wsgi_app = wsgi_app
+        self.config = config
+        self._rotate_lock = threading.Lock()
+
+    def __call__(self, environ, start_response):
+        if not self.config["PROFILING_ENABLED"]:
+            return self.wsgi_app(environ, start_response)
+        return self._dispatch(environ, start_response)
+
+    def _selected(self, environ):
+        config = self.config
+        if PROFILE_HEADER in environ:
+            return verify_profile_token(config.get("PROFILING_SECRET"), environ[PROFILE_HEADER])
+        rate = config.get("PROFILING_SAMPLE_RATE", 0.0)
+        if rate <= 0 or random.random() >= rate:
+            return False
+        prefixes = config.get("PROFILING_PATHS")
+        return not prefixes or environ.get("PATH_INFO", "").startswith(tuple(prefixes))
+
+    def _dispatch(self, environ, start_response):
+        if not self._selected(environ):
+            return self.wsgi_app(environ, start_response)
+
+        _install_sql_hooks()
+        recording = _Recording(environ, self.config.get("PROFILING_MODE", "cprofile"),
+                               self.config.get("PROFILING_SAMPLE_INTERVAL", 0.005))
+
+        def profiled_start_response(status, headers, exc_info=None):
+            recording.status = int(status.split(" ", 1)[0])
+            headers = list(headers) + [("X-Profile-Id", recording.profile_id)]
+            return start_response(status, headers, exc_info)
+
+        finished = []
+
+        def finish():
+            if finished:
+                return
+            finished.append(True)
+            recording.stop()
+            try:
+                self._save(recording)
+            except Exception as e:
+                print("Error:", f"Could not save profile {recording.profile_id}: {e}")
+
+        recording.start()
+        try:
+            body = self.wsgi_app(environ, profiled_start_response)
+        except BaseException:
+            finish()
+            raise
+        return _ProfiledBody(body, finish)
+
+    def _save(self, recording):
+        directory = self.config["PROFILING_DIR"]
+        recording.save(directory)
+
+        # Keep the newest profiles; ids start with their timestamp
+        with self._rotate_lock:
+            ids = sorted({name.split(".", 1)[0] for name in os.listdir(directory)})
+            for profile_id in ids[:max(len(ids) - self.config["PROFILING_MAX_PROFILES"], 0)]:
+                for extension in (".prof", ".collapsed", ".json"):
+                    try:
+                        os.remove(os.path.join(directory, profile_id + extension))
+                    except FileNotFoundError:
+                        pass
+
+
+def init_profiling(app):
+    """
+    Wrap an application's WSGI callable with the profiling middleware.
+
+    :param app: The Flask application.
+    """
+    app.wsgi_app = ProfilingMiddleware(app.wsgi_app, app.config)
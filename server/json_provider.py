@@ -0,0 +1,113 @@
+"""
+json_provider.py - Fast JSON Encoding and Decoding
+
+This module provides the JSON encoder and decoder classes the application uses for `jsonify`,
+`flask.json` and `request.json`. When orjson is installed, both delegate to it, which is several
+times faster than the stdlib codec and serializes NumPy arrays straight from their buffers
+instead of going through `tolist()`. Without orjson, or for values orjson rejects, they fall back
+to the stdlib codec with the same output conventions:
+- NumPy arrays and scalars are written as JSON arrays and numbers.
+- Dates and datetimes are written as ISO 8601 strings.
+- UUIDs and decimals are written as strings, dataclasses as objects.
+
+The codec is chosen with the JSON_CODEC setting: "auto" (orjson when available), "orjson" or
+"stdlib".
+"""
+
+import datetime
+import decimal
+import uuid
+
+import numpy as np
+from flask.json import JSONDecoder, JSONEncoder
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - depends on the environment
+    orjson = None
+
+
+class StdlibJSONEncoder(JSONEncoder):
+    """
+    The stdlib encoder, extended with NumPy values and ISO 8601 dates.
+    """
+
+    def default(self, o):
+        if isinstance(o, np.ndarray):
+            return o.tolist()
+        if isinstance(o, np.generic):
+            return o.item()
+        if isinstance(o, (datetime.date, datetime.time)):
+            return o.isoformat()
+        return super().default(o)
+
+
+class FastJSONEncoder(StdlibJSONEncoder):
+    """
+    An encoder that serializes with orjson and falls back to the stdlib encoder.
+    """
+
+    def encode(self, o):
+        # orjson can only indent by two spaces
+        if self.indent not in (None, 2):
+            return super().encode(o)
+
+        option = orjson.OPT_SERIALIZE_NUMPY | orjson.OPT_NON_STR_KEYS
+        if self.sort_keys:
+            option |= orjson.OPT_SORT_KEYS
+        if self.indent == 2:
+            option |= orjson.OPT_INDENT_2
+        try:
+            return orjson.dumps(o, default=self._default, option=option).decode("utf-8")
+        except orjson.JSONEncodeError:
+            return super().encode(o)
+
+    def iterencode(self, o, _one_shot=False):
+        # json.dump() streams through iterencode; one chunk is the whole document
+        yield self.encode(o)
+
+    def _default(self, o):
+        # orjson handles dataclasses, UUIDs and NumPy itself; these need converting
+        if isinstance(o, (decimal.Decimal, uuid.UUID)):
+            return str(o)
+        if isinstance(o, np.ndarray):
+            # Non-contiguous or unsupported dtypes
+            return o.tolist()
+        if isinstance(o, np.generic):
+            return o.item()
+        if hasattr(o, "__html__"):
+            return str(o.__html__())
+        raise TypeError(f"Object of type {type(o).__name__} is not JSON serializable")
+
+
+class FastJSONDecoder(JSONDecoder):
+    """
+    A decoder that parses with orjson and falls back to the stdlib decoder.
+    """
+
+    def decode(self, s, *args, **kwargs):
+        # Custom hooks are only supported by the stdlib decoder
+        if self.object_hook or self.object_pairs_hook or self.parse_float is not float:
+            return super().decode(s, *args, **kwargs)
+        try:
+            return orjson.loads(s)
+        except orjson.JSONDecodeError:
+            # Re-parse for the stdlib's error message and its NaN/Infinity extensions
+            return super().decode(s, *args, **kwargs)
+
+
+def init_json(app):
+    """
+    Install the JSON encoder and decoder selected by JSON_CODEC on an application.
+
+    :param app: The Flask application.
+    :raises RuntimeError: If JSON_CODEC is "orjson" but orjson is not installed.
+    """
+    codec = app.config.get("JSON_CODEC", "auto")
+    if codec == "orjson" and orjson is None:
+        raise RuntimeError("JSON_CODEC is 'orjson' but orjson is not installed")
+
+    if codec != "stdlib" and orjson is not None:
+        app.json_encoder, app.json_decoder = FastJSONEncoder, FastJSONDecoder
+    else:
+        app.json_encoder, app.json_decoder = StdlibJSONEncoder, JSONDecoder
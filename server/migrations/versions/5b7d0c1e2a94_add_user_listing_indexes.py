@@ -0,0 +1,37 @@
+"""Add indexes for keyset-paginated user listing and search
+
+Revision ID: 5b7d0c1e2a94
+Revises: 9350c4fd3059
+Create Date: 2026-10-19 10:12:31.402118
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5b7d0c1e2a94'
+down_revision = '9350c4fd3059'
+branch_labels = None
+depends_on = None
+
+
+def normalized(column):
+    # PostgreSQL: the "C" collation lets one btree serve both prefix LIKE and ORDER BY
+    if op.get_bind().dialect.name == 'postgresql':
+        return sa.text(f'lower({column}) COLLATE "C"')
+    return sa.text(f'lower({column})')
+
+
+def upgrade():
+    # Keyset pagination cannot seek past NULL sort keys
+    op.execute(sa.text('UPDATE "user" SET created_date = CURRENT_TIMESTAMP WHERE created_date IS NULL'))
+    op.create_index('ix_user_created_date_id', 'user', ['created_date', 'id'], unique=False)
+    op.create_index('ix_user_username_normalized', 'user', [normalized('username'), 'id'], unique=False)
+    op.create_index('ix_user_email_normalized', 'user', [normalized('email'), 'id'], unique=False)
+
+
+def downgrade():
+    op.drop_index('ix_user_email_normalized', table_name='user')
+    op.drop_index('ix_user_username_normalized', table_name='user')
+    op.drop_index('ix_user_created_date_id', table_name='user')
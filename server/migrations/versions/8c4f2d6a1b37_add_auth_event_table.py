@@ -0,0 +1,40 @@
+"""Add day-partitioned auth_event table
+
+Revision ID: 8c4f2d6a1b37
+Revises: 5b7d0c1e2a94
+Create Date: 2026-10-19 11:40:07.518263
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '8c4f2d6a1b37'
+down_revision = '5b7d0c1e2a94'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('auth_event',
+    sa.Column('id', sa.String(length=36), nullable=False),
+    sa.Column('occurred_at', sa.DateTime(), nullable=False),
+    sa.Column('event_type', sa.String(length=32), nullable=False),
+    sa.Column('outcome', sa.String(length=16), nullable=False),
+    sa.Column('user_id', sa.Integer(), nullable=True),
+    sa.Column('distance', sa.Float(), nullable=True),
+    sa.Column('latency_ms', sa.Float(), nullable=True),
+    sa.Column('ip_address', sa.String(length=45), nullable=True),
+    sa.PrimaryKeyConstraint('id', 'occurred_at'),
+    postgresql_partition_by='RANGE (occurred_at)'
+    )
+    op.create_index('ix_auth_event_user_id_occurred_at', 'auth_event', ['user_id', 'occurred_at'], unique=False)
+    if op.get_bind().dialect.name == 'postgresql':
+        # Daily partitions are created by the event flusher; this catches anything else
+        op.execute('CREATE TABLE auth_event_default PARTITION OF auth_event DEFAULT')
+
+
+def downgrade():
+    op.drop_index('ix_auth_event_user_id_occurred_at', table_name='auth_event')
+    op.drop_table('auth_event')
@@ -0,0 +1,29 @@
+"""Add user.biometric_drift and user.biometric_adapted_at
+
+Revision ID: a3f1c7e9d246
+Revises: e2a7c94b5d18
+Create Date: 2026-10-19 18:26:13.704512
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'a3f1c7e9d246'
+down_revision = 'e2a7c94b5d18'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    # Templates enrolled so far count as not yet adapted (NULL drift is read as 0)
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('biometric_drift', sa.Float(), nullable=True))
+        batch_op.add_column(sa.Column('biometric_adapted_at', sa.DateTime(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('biometric_adapted_at')
+        batch_op.drop_column('biometric_drift')
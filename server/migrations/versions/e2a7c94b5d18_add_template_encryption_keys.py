@@ -0,0 +1,35 @@
+"""Add template_key table and user.biometric_key_version
+
+Revision ID: e2a7c94b5d18
+Revises: 8c4f2d6a1b37
+Create Date: 2026-10-19 15:02:41.183920
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a7c94b5d18'
+down_revision = '8c4f2d6a1b37'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('template_key',
+    sa.Column('version', sa.Integer(), autoincrement=False, nullable=False),
+    sa.Column('wrapped_key', sa.LargeBinary(), nullable=False),
+    sa.Column('created_date', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('version')
+    )
+    # Existing templates stay unencrypted (NULL) until `flask biometrics rotate-key` runs
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('biometric_key_version', sa.Integer(), nullable=True))
+
+
+def downgrade():
+    with op.batch_alter_table('user', schema=None) as batch_op:
+        batch_op.drop_column('biometric_key_version')
+
+    op.drop_table('template_key')
@@ -0,0 +1,54 @@
+"""
+auth_event.py - Authentication Event Model
+
+This module defines the AuthEvent model, the audit trail of logins, biometric attempts, token
+refreshes and account deletions.
+"""
+
+import uuid
+
+from database.db import db
+
+
+class AuthEvent(db.Model):
+    """
+    AuthEvent class to represent one authentication-related request.
+
+    On PostgreSQL the table is partitioned by day on `occurred_at` (see migration 8c4f2d6a1b37),
+    so old days can be detached or dropped without touching recent ones.
+
+    Attributes:
+        id (str): The event's unique identifier (UUID).
+        occurred_at (datetime): When the request was handled (UTC).
+        event_type (str): "login", "biometric", "biometric_stream", "refresh", "delete"
+            or "enroll".
+        outcome (str): "success", "failure", "error" or "duplicate" (enrollment refused).
+        user_id (int): The id of the user concerned, if known.
+        distance (float): The best face descriptor distance, for biometric attempts.
+        latency_ms (float): The time taken to handle the request.
+        ip_address (str): The client's address.
+    """
+
+    __tablename__ = "auth_event"
+    __table_args__ = (
+        db.Index("ix_auth_event_user_id_occurred_at", "user_id", "occurred_at"),
+        {"postgresql_partition_by": "RANGE (occurred_at)"},
+    )
+
+    # The partition key must be part of the primary key
+    id = db.Column(db.String(36), primary_key=True, default=lambda: str(uuid.uuid4()))
+    occurred_at = db.Column(db.DateTime, primary_key=True)
+    event_type = db.Column(db.String(32), nullable=False)
+    outcome = db.Column(db.String(16), nullable=False)
+    user_id = db.Column(db.Integer)
+    distance = db.Column(db.Float)
+    latency_ms = db.Column(db.Float)
+    ip_address = db.Column(db.String(45))
+
+    def __repr__(self):
+        """
+        Return a string representation of the AuthEvent instance.
+
+        :return: A string in the format "AuthEvent(event_type='<type>', outcome='<outcome>')".
+        """
+        return f"AuthEvent(event_type='{self.event_type}', outcome='{self.outcome}')"
@@ -0,0 +1,40 @@
+"""
+template_key.py - Template Key Model
+
+This module defines the TemplateKey model, the versioned data keys that encrypt the biometric
+templates in `User.biometric_data`.
+"""
+
+from datetime import datetime
+
+from database.db import db
+
+
+class TemplateKey(db.Model):
+    """
+    TemplateKey class to represent one version of the template data key.
+
+    The data key itself is never stored: `wrapped_key` is the key encrypted with the master key
+    (TEMPLATE_MASTER_KEY), so a database dump alone cannot decrypt any template. The highest
+    version encrypts new templates; older versions stay readable until key rotation has
+    re-encrypted every template that uses them.
+
+    Attributes:
+        version (int): The key version, tagged on every template it encrypts.
+        wrapped_key (bytes): The 12-byte nonce and AES-GCM ciphertext of the data key.
+        created_date (datetime): The date and time the version was created.
+    """
+
+    __tablename__ = "template_key"
+
+    version = db.Column(db.Integer, primary_key=True, autoincrement=False)
+    wrapped_key = db.Column(db.LargeBinary, nullable=False)
+    created_date = db.Column(db.DateTime, default=datetime.utcnow)
+
+    def __repr__(self):
+        """
+        Return a string representation of the TemplateKey instance.
+
+        :return: A string in the format "TemplateKey(version=<version>)".
+        """
+        return f"TemplateKey(version={self.version})"
@@ -22,11 +22,21 @@ class User(db.Model):
         user_id (str): The unique user ID.
         created_date (datetime): The date and time of user account creation.
         biometric_data (bytes): Binary data for storing biometric information.
+        biometric_key_version (int): The template key version encrypting `biometric_data`, or
+            None if it is stored unencrypted (see biometrics/encryption.py).
+        biometric_drift (float): Total distance adaptive refreshes have moved the template since
+            enrollment (see biometrics/adaptation.py).
+        biometric_adapted_at (datetime): The time of the last adaptive refresh, or None.
 
     Methods:
         __repr__(): Return a string representation of the User instance.
     """
 
+    # Expression indexes on the normalized username/email live in migration 5b7d0c1e2a94
+    __table_args__ = (
+        db.Index("ix_user_created_date_id", "created_date", "id"),
+    )
+
     id = db.Column(db.Integer, primary_key=True)
     username = db.Column(db.String(120), unique=True, nullable=False)
     email = db.Column(db.String(120), unique=True, nullable=False)
@@ -35,6 +45,9 @@ class User(db.Model):
     user_id = db.Column(db.String(36), unique=True, nullable=False)
     created_date = db.Column(db.DateTime, default=datetime.utcnow)
     biometric_data = db.Column(db.PickleType)
+    biometric_key_version = db.Column(db.Integer)
+    biometric_drift = db.Column(db.Float)
+    biometric_adapted_at = db.Column(db.DateTime)
 
     def __repr__(self):
         """
@@ -0,0 +1,205 @@
+# routes/admin.py - Admin Routes
+"""
+Routes for operations staff to browse and search user accounts.
+
+Implemented Routes:
+- /admin/users: List users, or search them by username/email prefix.
+- /admin/admission: Queue depth, admissions and shed counts of the admission control budgets.
+- /admin/gallery: Size of the biometric gallery and health of its shard workers.
+
+Listings use keyset (seek) pagination: each page ends with an opaque cursor holding the sort key
+of its last row, and the next page starts with `WHERE key > cursor`. The database seeks straight
+to the cursor in the matching index instead of counting past OFFSET rows, so every page costs the
+same from the first row to the millionth.
+
+Sort keys and their indexes (see migration 5b7d0c1e2a94):
+- Listing: (created_date, id) on ix_user_created_date_id.
+- Username search: (lower(username), id) on ix_user_username_normalized.
+- Email search: (lower(email), id) on ix_user_email_normalized.
+
+Pages are streamed as JSON lines (application/x-ndjson): one user object per line followed by a
+final {"next_cursor": ...} line, null on the last page.
+
+Dependencies:
+- Flask: Web framework for routing and request handling.
+- Flask-JWT-Extended: JWT authentication extension for Flask.
+- SQLAlchemy: Database ORM for data manipulation.
+"""
+
+import base64
+import datetime
+import functools
+
+from flask import Blueprint, Response, current_app, json, jsonify, request, stream_with_context
+from flask_jwt_extended import get_jwt_identity, jwt_required
+from sqlalchemy import func, literal, tuple_
+
+from admission.control import get_admission_controller
+from biometrics.gallery import get_gallery
+from database.db import db
+from models.user import User
+
+admin_bp = Blueprint("admin", __name__)
+
+SEARCH_FIELDS = {"username": User.username, "email": User.email}
+
+
+def admin_required(view):
+    """
+    Decorator restricting a route to users whose email is listed in ADMIN_EMAILS.
+    """
+    @functools.wraps(view)
+    @jwt_required()
+    def wrapper(*args, **kwargs):
+        user = User.query.filter_by(id=get_jwt_identity()).first()
+        if user is None or user.email.lower() not in current_app.config["ADMIN_EMAILS"]:
+            return jsonify({"message": "Admin access required"}), 403
+        return view(*args, **kwargs)
+    return wrapper
+
+
+def encode_cursor(mode, key, row_id):
+    """
+    Encode the sort key of the last row of a page as an opaque cursor.
+
+    :param mode: "created", "username" or "email".
+    :param key: The row's created_date or normalized search field.
+    :param row_id: The row's id.
+    :return: A URL-safe cursor string.
+    """
+    if isinstance(key, datetime.datetime):
+        key = key.isoformat()
+    raw = json.dumps([mode, key, row_id], separators=(",", ":")).encode("utf-8")
+    return base64.urlsafe_b64encode(raw).decode("ascii").rstrip("=")
+
+
+def decode_cursor(cursor, mode):
+    """
+    Decode a cursor produced by `encode_cursor` for the same listing mode.
+
+    :param cursor: The cursor string.
+    :param mode: The listing mode of the current request.
+    :return: A tuple of (key, row_id).
+    :raises ValueError: If the cursor is malformed or belongs to another mode.
+    """
+    try:
+        raw = base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4))
+        cursor_mode, key, row_id = json.loads(raw)
+    except Exception:
+        raise ValueError("Malformed cursor")
+    if cursor_mode != mode or not isinstance(row_id, int):
+        raise ValueError("Cursor does not belong to this listing")
+    if mode == "created":
+        key = datetime.datetime.fromisoformat(key)
+    return key, row_id
+
+
+def escape_like(value):
+    """
+    Escape LIKE wildcards so that a search term only matches as a literal prefix.
+    """
+    return value.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+
+
+def normalized(column):
+    """
+    Return the normalized (lower-cased) form of a search column.
+
+    On PostgreSQL the expression uses the "C" collation, like its index, so that prefix LIKE and
+    ORDER BY can both be answered from the index regardless of the database locale.
+    """
+    expression = func.lower(column)
+    if db.engine.dialect.name == "postgresql":
+        expression = expression.collate("C")
+    return expression
+
+
+@admin_bp.route("/users", methods=["GET"])
+@admin_required
+def list_users():
+    """
+    List users in keyset-paginated pages, optionally filtered by a username/email prefix.
+
+    Query parameters:
+    - q: Search prefix; matched against the email if it contains "@", else the username.
+    - field: "username" or "email", overriding the choice made from q.
+    - limit: Page size, capped at ADMIN_PAGE_SIZE_MAX.
+    - cursor: The next_cursor of the previous page.
+
+    :return: A JSON lines stream of users followed by the next cursor.
+    """
+    prefix = request.args.get("q", "").strip().lower()
+    field = request.args.get("field") or ("email" if "@" in prefix else "username")
+    if field not in SEARCH_FIELDS:
+        return jsonify({"message": f"Unknown search field: {field}"}), 400
+    try:
+        limit = min(int(request.args.get("limit", 100)), current_app.config["ADMIN_PAGE_SIZE_MAX"])
+    except ValueError:
+        return jsonify({"message": "Invalid limit"}), 400
+    if limit < 1:
+        return jsonify({"message": "Invalid limit"}), 400
+
+    mode = field if prefix else "created"
+    sort_key = normalized(SEARCH_FIELDS[field]) if prefix else User.created_date
+
+    # Never load the biometric template blobs for a listing
+    query = db.session.query(
+        User.id, User.user_id, User.username, User.email, User.created_date,
+        User.biometric_data.isnot(None).label("has_biometrics"), sort_key.label("sort_key"))
+    if prefix:
+        query = query.filter(sort_key.like(escape_like(prefix) + "%", escape="\\"))
+
+    cursor = request.args.get("cursor")
+    if cursor:
+        try:
+            key, row_id = decode_cursor(cursor, mode)
+        except ValueError as e:
+            return jsonify({"message": str(e)}), 400
+        query = query.filter(
+            tuple_(sort_key, User.id) > tuple_(literal(key, sort_key.type), row_id))
+
+    # Fetch one extra row to know whether another page follows
+    rows = query.order_by(sort_key, User.id).limit(limit + 1)
+
+    def generate():
+        last, count = None, 0
+        for row in rows.yield_per(min(limit + 1, 500)):
+            if count == limit:
+                yield json.dumps({"next_cursor": encode_cursor(mode, last.sort_key, last.id)}) + "\n"
+                return
+            count += 1
+            last = row
+            yield json.dumps({
+                "id": row.id,
+                "userId": row.user_id,
+                "username": row.username,
+                "email": row.email,
+                "accountCreationDate": row.created_date.isoformat() if row.created_date else None,
+                "hasBiometrics": bool(row.has_biometrics),
+            }) + "\n"
+        yield json.dumps({"next_cursor": None}) + "\n"
+
+    return Response(stream_with_context(generate()), mimetype="application/x-ndjson")
+
+
+@admin_bp.route("/admission", methods=["GET"])
+@admin_required
+def admission_stats():
+    """
+    Report the load of each admission control budget (see admission/control.py).
+
+    :return: Per-budget concurrency, active and queued requests, admissions and shed counts.
+    """
+    return jsonify({"enabled": bool(current_app.config.get("ADMISSION_CONTROL_ENABLED")),
+                    "budgets": get_admission_controller().stats()}), 200
+
+
+@admin_bp.route("/gallery", methods=["GET"])
+@admin_required
+def gallery_stats():
+    """
+    Report the biometric gallery of this worker process, with the latest shard health check.
+
+    :return: Gallery size, and per-shard sizes, health and restarts when sharded.
+    """
+    return jsonify(get_gallery().stats()), 200
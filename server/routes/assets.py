@@ -0,0 +1,101 @@
+# routes/assets.py - Static Asset Routes
+"""
+Routes serving the client's face-api.js models and MDB UI kit from the asset build (see
+assets/pipeline.py and `flask assets build`).
+
+Implemented Routes:
+- /client/face-api/<name>: face-api.js script, weight manifests and model shards.
+- /client/mdb/<name>: MDB UI kit styles and scripts.
+
+Caching:
+- Content-hashed names are served with "Cache-Control: public, max-age=31536000, immutable", so
+  browsers never request them again.
+- Stable names, kept for clients that do not use the built pages, are served with "no-cache" and
+  a strong ETag, so repeat requests are answered with an empty 304.
+
+Encoding: the precompressed brotli or gzip variant is chosen from Accept-Encoding, with its own
+ETag. Range requests (HTTP 206) are answered from the uncompressed file.
+
+Before the assets are built, files are served straight from the client directory, uncompressed
+and with "no-cache".
+
+Dependencies:
+- Flask: Web framework for routing and request handling.
+"""
+
+import mimetypes
+import os
+
+from flask import Blueprint, current_app, jsonify, request, send_file
+from werkzeug.utils import safe_join
+
+from assets.pipeline import ASSET_DIRECTORIES, load_manifest
+
+assets_bp = Blueprint("assets", __name__)
+
+IMMUTABLE_CACHE_CONTROL = "public, max-age=31536000, immutable"
+REVALIDATE_CACHE_CONTROL = "no-cache"
+
+# Preferred first
+ENCODINGS = (("br", ".br"), ("gzip", ".gz"))
+
+
+def get_asset_manifest():
+    """
+    Return the asset manifest of the current application's build.
+
+    :return: The manifest, or None if the assets have not been built.
+    """
+    manifest = current_app.extensions.get("asset_manifest")
+    if manifest is None:
+        manifest = load_manifest(current_app.config["ASSETS_BUILD_DIR"])
+        if manifest is not None:
+            current_app.extensions["asset_manifest"] = manifest
+    return manifest
+
+
+@assets_bp.route("/<directory>/<path:name>", methods=["GET"])
+def serve_asset(directory, name):
+    """
+    Serve a built asset, precompressed when the client accepts it.
+
+    :param directory: "face-api" or "mdb".
+    :param name: The file name, content-hashed or stable.
+    :return: The file, a 206 partial response, a 304 or a 404.
+    """
+    if directory not in ASSET_DIRECTORIES:
+        return jsonify({"message": "Asset not found"}), 404
+
+    manifest = get_asset_manifest()
+    if manifest is None:
+        path = safe_join(current_app.config["ASSETS_SOURCE_DIR"], directory, name)
+        if path is None or not os.path.isfile(path):
+            return jsonify({"message": "Asset not found"}), 404
+        response = send_file(path, conditional=True)
+        response.headers["Cache-Control"] = REVALIDATE_CACHE_CONTROL
+        return response
+
+    entry = manifest.get(f"{directory}/{name}")
+    if entry is None:
+        return jsonify({"message": "Asset not found"}), 404
+
+    path = os.path.join(current_app.config["ASSETS_BUILD_DIR"], directory, name)
+    etag = entry["digest"]
+    encoding = None
+    if "Range" not in request.headers:
+        for candidate, suffix in ENCODINGS:
+            if candidate in entry["encodings"] and request.accept_encodings[candidate]:
+                encoding = candidate
+                path += suffix
+                etag += f"-{candidate}"
+                break
+
+    mimetype = mimetypes.guess_type(entry["source"])[0] or "application/octet-stream"
+    response = send_file(path, mimetype=mimetype, conditional=True, etag=etag)
+    if encoding is not None:
+        response.headers["Content-Encoding"] = encoding
+    if entry["encodings"]:
+        response.vary.add("Accept-Encoding")
+    response.headers["Cache-Control"] = (
+        IMMUTABLE_CACHE_CONTROL if entry["immutable"] else REVALIDATE_CACHE_CONTROL)
+    return response
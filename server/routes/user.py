@@ -10,11 +10,14 @@ Implemented Routes:
 - /user/details: Retrieve user details.
 - /user/refresh_token: Refresh an access token.
 - /user/register: User registration.
+- /user/availability: Check whether a username or email is available.
 - /user/login: User login.
 - /user/logout: User logout.
 - /user/delete_account: Delete user account.
 - /user/store_biometric_data: Store biometric data.
 - /user/authenticate_with_biometrics: Authenticate with biometric data.
+- /user/authenticate_with_biometrics/stream: Authenticate with a stream of biometric frames.
+- /user/extract_face_descriptors: Compute face descriptors from uploaded frames.
 
 Dependencies:
 - Flask: Web framework for routing and request handling.
@@ -33,10 +36,22 @@ from validate_email_address import validate_email
 import bcrypt
 import jwt  # Import JWT library
 import datetime
+import time
 import uuid  # Import uuid library
+import numpy as np
 from sqlalchemy import or_  # Import the 'or_' function
 from flask_jwt_extended import jwt_required, get_jwt_identity, create_access_token, create_refresh_token
-import base64  # For encoding/decoding binary data
+from biometrics.engine import get_engine, decode_image
+from biometrics.wire import WireFormatError, descriptors_from_request, read_frames
+from biometrics.adaptation import get_template_updater
+from biometrics.dedup import enrollment_lock, find_duplicate
+from biometrics.encryption import seal_template
+from biometrics.gallery import get_gallery
+from biometrics.probe_cache import get_probe_cache
+from biometrics.session import AuthenticationSession
+from accounts.availability import get_availability_filter, normalize
+from audit.event_log import record_auth_event
+from routes.admin import normalized
 
 user_bp = Blueprint("user", __name__)
 
@@ -79,6 +94,8 @@ def refresh_token():
 
     :return: New access token in JSON format.
     """
+    started = time.perf_counter()
+
     # Get the current user's identity from the valid refresh token
     current_user_id = get_jwt_identity()
 
@@ -86,9 +103,25 @@ def refresh_token():
     access_token = create_access_token(
         identity=current_user_id, expires_delta=datetime.timedelta(minutes=60))
 
+    record_auth_event("refresh", "success", started, user_id=current_user_id)
     return jsonify({"message": "Token refreshed successfully", "access_token": access_token}), 200
 
 
+def is_taken(field, value):
+    """
+    Check whether a username or email is already registered.
+
+    Values are compared in the normalized form of the availability filter, so "Alice" and
+    " alice" are the same username.
+
+    :param field: "username" or "email".
+    :param value: The value to look up.
+    :return: True if a user already has the value.
+    """
+    return db.session.query(User.id).filter(
+        normalized(getattr(User, field)) == normalize(value)).first() is not None
+
+
 @user_bp.route("/register", methods=["POST"])
 def register():
     """
@@ -101,14 +134,12 @@ def register():
     password = request.json.get("password")
     username = request.json.get("username")
 
-    # Check if the email is already registered
-    existing_user = User.query.filter_by(email=email).first()
-    if existing_user:
+    # Check if the email is already registered (case-insensitively, like /user/availability)
+    if email and is_taken("email", email):
         return jsonify({"message": "Email is already registered"}), 400
 
     # Check if the username is already taken
-    existing_username = User.query.filter_by(username=username).first()
-    if existing_username:
+    if username and is_taken("username", username):
         return jsonify({"message": "Username is not available"}), 400
 
     # Check if the username is provided and not empty
@@ -138,6 +169,7 @@ def register():
         # Add the user to the database
         db.session.add(new_user)
         db.session.commit()
+        get_availability_filter().add(username, email)
 
         # Generate a JWT token with a 2 hour expiration
         access_token = create_access_token(
@@ -153,6 +185,31 @@ def register():
         return jsonify({"message": f"Registration failed: {str(e)}"}), 500
 
 
+@user_bp.route("/availability", methods=["GET"])
+def check_availability():
+    """
+    Route to check whether a username and/or email is still available.
+
+    Values missing from the in-memory filter are reported as available without querying the
+    database; only possible matches are confirmed with a lookup on the unique column.
+
+    :return: {"username": bool, "email": bool} for the fields given in the query string.
+    """
+    availability = get_availability_filter()
+    result = {}
+    for field in ("username", "email"):
+        value = request.args.get(field)
+        if not value:
+            continue
+        # Confirm on the same normalized form the filter and register use (lower() is indexed)
+        taken = availability.might_exist(field, value) and is_taken(field, value)
+        result[field] = not taken
+
+    if not result:
+        return jsonify({"message": "Provide a username or email to check"}), 400
+    return jsonify(result), 200
+
+
 @user_bp.route("/login", methods=["POST"])
 def login():
     """
@@ -160,6 +217,8 @@ def login():
 
     :return: Login status and tokens in JSON format.
     """
+    started = time.perf_counter()
+
     # Extract user data from request
     username_email = request.json.get("usernameEmail")  # Get email or username
     password = request.json.get("password")
@@ -180,8 +239,10 @@ def login():
             refresh_token = create_refresh_token(
                 identity=user.id, expires_delta=datetime.timedelta(days=7))
 
+            record_auth_event("login", "success", started, user_id=user.id)
             return jsonify({"message": "Login successful", "access_token": access_token, "refresh_token": refresh_token}), 200
 
+    record_auth_event("login", "failure", started, user_id=user.id if user else None)
     return jsonify({"message": "Invalid email or username or password"}), 401
 
 
@@ -203,6 +264,8 @@ def delete_account():
 
     :return: Account deletion status in JSON format.
     """
+    started = time.perf_counter()
+
     # Extract user data from request
     email = request.json.get("email")
 
@@ -212,13 +275,24 @@ def delete_account():
     if user:
         try:
             # Delete the user's account from the database
+            user_id, username, user_email = user.id, user.username, user.email
             db.session.delete(user)
             db.session.commit()
+            get_availability_filter().remove(username, user_email)
+            # Drop the user's template from the in-memory gallery and cached probes
+            get_gallery().remove(user_id)
+            get_probe_cache().invalidate(user_id)
+            updater = get_template_updater()
+            if updater is not None:
+                updater.discard(user_id)
+            record_auth_event("delete", "success", started, user_id=user_id)
             return jsonify({"message": "Account deleted successfully"}), 200
         except Exception as e:
             db.session.rollback()
+            record_auth_event("delete", "error", started, user_id=user_id)
             return jsonify({"message": f"Account deletion failed: {str(e)}"}), 500
 
+    record_auth_event("delete", "failure", started)
     return jsonify({"message": "Invalid email or password"}), 401
 
 
@@ -229,38 +303,66 @@ def store_biometric_data():
     """
     Route to store biometric data for a user.
 
+    The template is refused with 409 when it is a near-duplicate of another account's template
+    (see BIOMETRIC_DUPLICATE_THRESHOLD); the other account is not disclosed. The check is
+    best-effort across server processes (see biometrics/dedup.py).
+
     :return: Biometric data storage status in JSON format.
     """
+    started = time.perf_counter()
     try:
         # Authentication & Authorization: Identify the current user
         current_user_id = get_jwt_identity()
         user = User.query.filter_by(id=current_user_id).first()
 
         if user:
-            face_data = request.json.get("faceData")
-
-            if not face_data:
-                # Request Validation: Ensure the received data is not empty or invalid
-                return jsonify({"message": "Invalid or missing face data"}), 400
-
             try:
-                # Data Sanitization: Verify and process the biometric data
-                decoded_face_data = base64.b64decode(face_data)
-                user.biometric_data = decoded_face_data
-            except Exception as e:
-                return jsonify({"message": "Invalid face data format"}), 400
-
-            # Database Update: Store the sanitized biometric data in the user's record
-            db.session.commit()
-
+                # Request Validation: Decode the binary, MessagePack or JSON descriptor payload
+                descriptors = descriptors_from_request(request)
+            except WireFormatError as e:
+                return jsonify({"message": "Invalid face data format", "error": str(e)}), 400
+
+            # Enrollments of this process are checked and stored one at a time, so that two of
+            # them cannot both pass the duplicate check
+            with enrollment_lock:
+                # Duplicate Check: The same face must not be enrolled on several accounts
+                duplicate = find_duplicate(
+                    get_gallery(), descriptors[0],
+                    current_app.config["BIOMETRIC_DUPLICATE_THRESHOLD"], user.id)
+                if duplicate is not None:
+                    record_auth_event("enroll", "duplicate", started,
+                                      user_id=user.id, distance=duplicate[1])
+                    return jsonify(
+                        {"message": "This face is already enrolled on another account"}), 409
+
+                # Drop a queued adaptation of the old template
+                updater = get_template_updater()
+                if updater is not None:
+                    updater.discard(user.id)
+
+                # Data Sanitization: Store the first descriptor, encrypted when a master key is set
+                user.biometric_data, user.biometric_key_version = seal_template(
+                    descriptors[0], user.id)
+                # A new enrollment starts over the drift allowed to adaptive refreshes
+                user.biometric_drift, user.biometric_adapted_at = 0.0, None
+
+                # Database Update: Store the sanitized biometric data in the user's record
+                db.session.commit()
+                get_gallery().upsert(user.id, descriptors[0])
+            get_probe_cache().invalidate(user.id, descriptors[0])
+            if updater is not None:
+                # Probes of the old template queued while the new one was being stored
+                updater.discard(user.id)
+
+            record_auth_event("enroll", "success", started, user_id=user.id)
             return jsonify({"message": "Biometric data stored successfully"}), 200
         else:
             # User Not Found
-            return jsonify({"message": "User not found"}, 404)
+            return jsonify({"message": "User not found"}), 404
     except Exception as e:
         print("Error:", str(e))
         # Internal Server Error
-        return jsonify({"error": "An error occurred while storing biometric data"}, 500)
+        return jsonify({"error": "An error occurred while storing biometric data"}), 500
 
 
 @user_bp.route("/authenticate_with_biometrics", methods=["POST"])
@@ -270,21 +372,58 @@ def authenticate_with_biometrics():
 
     :return: Authentication status and tokens in JSON format.
     """
+    started = time.perf_counter()
+    distance = None
     try:
-        # Retrieve and process the provided face data
-        face_data = request.json.get("faceData")
-        decoded_face_data = base64.b64decode(face_data)
-
-        # Search for a user with matching biometric data
-        user = User.query.filter_by(biometric_data=decoded_face_data).first()
+        # Retrieve and decode the provided face data
+        try:
+            descriptors = descriptors_from_request(request)
+        except WireFormatError as e:
+            record_auth_event("biometric", "failure", started)
+            return jsonify({"message": "Invalid face data format", "error": str(e)}), 400
+
+        probe = descriptors[0]
+        threshold = current_app.config["BIOMETRIC_MATCH_THRESHOLD"]
+        gallery = get_gallery()
+        cache = get_probe_cache()
+        match = None
+        searched = False
+
+        # Repeat probes: verify the cached candidate with a single exact distance check
+        cached = cache.get(probe)
+        if cached is not None:
+            template = gallery.template(cached[0])
+            if template is not None:
+                distance = float(np.linalg.norm(probe - template))
+                if distance <= threshold:
+                    match = cached[0]
+
+        if match is None:
+            # Search the gallery for the nearest enrolled template
+            user_ids, distances = gallery.search(probe, k=1)
+            searched = True
+            if user_ids.size:
+                distance = float(distances[0, 0])
+            if user_ids.size and distances[0, 0] <= threshold:
+                match = int(user_ids[0, 0])
+                cache.put(probe, match, distances[0, 0])
+
+        user = User.query.filter_by(id=match).first() if match is not None else None
 
         if user:
+            # Adaptive Templates: Track gradual changes of the face on confident matches, never
+            # on probe cache hits (a replayed probe)
+            updater = get_template_updater()
+            if updater is not None and searched:
+                updater.observe(gallery, user.id, probe, distance)
+
             # Generate access and refresh tokens
             access_token = create_access_token(
                 identity=user.id, expires_delta=datetime.timedelta(hours=2))
             refresh_token = create_refresh_token(
                 identity=user.id, expires_delta=datetime.timedelta(days=7))
             # Successful Authentication
+            record_auth_event("biometric", "success", started, user_id=user.id, distance=distance)
             return jsonify({
                 "message": "Biometric authentication successful",
                 "access_token": access_token,
@@ -292,11 +431,101 @@ def authenticate_with_biometrics():
             }), 200
 
         # Authentication Failed
-        return jsonify({"message": "Biometric authentication failed"}, 401)
+        record_auth_event("biometric", "failure", started, distance=distance)
+        return jsonify({"message": "Biometric authentication failed"}), 401
     except Exception as e:
         print("Error:", str(e))
+        record_auth_event("biometric", "error", started, distance=distance)
         # Internal Server Error
-        return jsonify({"error": "An error occurred during biometric authentication"}, 500)
+        return jsonify({"error": "An error occurred during biometric authentication"}), 500
+
+
+@user_bp.route("/authenticate_with_biometrics/stream", methods=["POST"])
+def authenticate_with_biometrics_stream():
+    """
+    Route to authenticate a user with a stream of biometric frames.
+
+    The client streams successive binary descriptor payloads in one chunked POST. Each frame is
+    matched as soon as it arrives and the response is sent as soon as the evidence decides,
+    without waiting for the rest of the stream.
+
+    :return: Authentication status and tokens in JSON format.
+    """
+    started = time.perf_counter()
+    config = current_app.config
+    session = AuthenticationSession(
+        get_gallery(),
+        config["BIOMETRIC_MATCH_THRESHOLD"],
+        accept_evidence=config["BIOMETRIC_STREAM_ACCEPT_EVIDENCE"],
+        reject_evidence=config["BIOMETRIC_STREAM_REJECT_EVIDENCE"],
+        max_frames=config["BIOMETRIC_STREAM_MAX_FRAMES"])
+
+    try:
+        for descriptors in read_frames(request.stream):
+            if session.add(descriptors):
+                break
+    except WireFormatError as e:
+        if session.frames == 0:
+            record_auth_event("biometric_stream", "failure", started)
+            return jsonify({"message": "Invalid face data format", "error": str(e)}), 400
+
+    decision = session.finish()
+    user = User.query.filter_by(
+        id=decision.user_id).first() if decision.accepted else None
+
+    if user:
+        # Generate access and refresh tokens
+        access_token = create_access_token(
+            identity=user.id, expires_delta=datetime.timedelta(hours=2))
+        refresh_token = create_refresh_token(
+            identity=user.id, expires_delta=datetime.timedelta(days=7))
+        record_auth_event("biometric_stream", "success", started,
+                          user_id=user.id, distance=decision.distance)
+        return jsonify({
+            "message": "Biometric authentication successful",
+            "frames": decision.frames,
+            "access_token": access_token,
+            "refresh_token": refresh_token
+        }), 200
+
+    record_auth_event("biometric_stream", "failure", started, distance=decision.distance)
+    return jsonify({"message": "Biometric authentication failed", "frames": decision.frames}), 401
+
+
+@user_bp.route("/extract_face_descriptors", methods=["POST"])
+@jwt_required()
+def extract_face_descriptors():
+    """
+    Route to compute face descriptors on the server from uploaded frames.
+
+    The frames are sent as multipart files under the "frames" field and processed in a single
+    batch by the NumPy face engine.
+
+    :return: One descriptor (or null when no face is found) per frame in JSON format.
+    """
+    uploads = request.files.getlist("frames")
+    if not uploads:
+        return jsonify({"message": "No frames uploaded"}), 400
+
+    try:
+        frames = [decode_image(upload.read()) for upload in uploads]
+    except Exception as e:
+        return jsonify({"message": "Invalid image data"}), 400
+
+    try:
+        engine = get_engine(current_app.config["FACE_API_MODEL_DIR"])
+    except FileNotFoundError as e:
+        print("Error:", str(e))
+        return jsonify({"message": "Face engine is unavailable"}), 503
+
+    descriptors = engine.compute_descriptors(
+        frames, batch_size=current_app.config["FACE_ENGINE_BATCH_SIZE"])
+
+    return jsonify({
+        "message": "success",
+        # NumPy arrays are serialized natively by the JSON encoder
+        "descriptors": descriptors
+    }), 200
 
 
 @user_bp.route('/start-backend', methods=['GET'])
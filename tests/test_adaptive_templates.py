@@ -0,0 +1,214 @@
+"""
+Test cases for adaptive template refresh.
+
+These test cases cover the bounded blend of confident probes, the per-user interval, the cap on
+the total drift from enrollment, re-enrollments winning over queued adaptations, undecodable
+templates skipped one user at a time, and the adaptation after a biometric login (but not after a
+probe cache hit).
+
+Tested Modules:
+- biometrics.adaptation: Write-behind template refresh.
+- biometrics.gallery: In-place template refresh.
+- routes.user: /user/authenticate_with_biometrics.
+
+Dependencies:
+- Flask: Web framework for testing.
+- NumPy: Numerical computing library.
+"""
+import base64
+import os
+import numpy as np
+import pytest
+from app import create_app
+from biometrics.adaptation import TemplateUpdater, get_template_updater
+from biometrics.encryption import get_keyring, seal_template
+from biometrics.gallery import get_gallery, load_gallery_arrays
+from biometrics.wire import encode_frame
+from database.db import db
+from models.user import User
+
+
+@pytest.fixture
+def app():
+    """
+    Fixture to set up the Flask application with adaptive templates and three enrolled users.
+
+    :return: Flask app instance for testing.
+    """
+    app = create_app("testing")
+    app.config.update(
+        TEMPLATE_MASTER_KEY=base64.b64encode(os.urandom(32)).decode("ascii"),
+        AUTH_EVENT_LOG_ENABLED=False,
+        BIOMETRIC_ADAPTIVE_ENABLED=True,
+        BIOMETRIC_ADAPTIVE_RATE=0.1,
+        BIOMETRIC_ADAPTIVE_INTERVAL=3600,
+        BIOMETRIC_ADAPTIVE_FLUSH_INTERVAL=3600)
+    app_context = app.app_context()
+    app_context.push()
+    db.create_all()
+    templates = np.random.default_rng(0).normal(0, 0.1, (3, 128)).astype(np.float32)
+    for idx in range(3):
+        db.session.add(User(username=f"user{idx}", email=f"user{idx}@example.com",
+                            password="password", salt="salt", user_id=f"uuid-{idx}"))
+    db.session.commit()
+    for user, template in zip(User.query.order_by(User.id), templates):
+        user.biometric_data, user.biometric_key_version = seal_template(template, user.id)
+    db.session.commit()
+
+    yield app
+
+    updater = app.extensions.get("template_updater")
+    if updater is not None:
+        updater.close()
+    db.session.remove()
+    db.drop_all()
+    app_context.pop()
+
+
+def stored_template(user_id):
+    """
+    Read a user's template back from the database.
+    """
+    user_ids, templates = load_gallery_arrays()
+    return templates[list(user_ids).index(user_id)]
+
+
+def test_bounded_blend_and_interval(app):
+    """
+    Test that a confident match moves the stored template by the learning rate, once per interval.
+
+    :param app: Flask app instance for testing.
+    """
+    gallery = get_gallery()
+    user_id = int(gallery.user_ids[0])
+    enrolled = gallery.template(user_id).copy()
+    probe = enrolled + 0.02
+    updater = TemplateUpdater(app, keyring=get_keyring(), rate=0.1, max_distance=0.35,
+                              interval=3600, flush_interval=3600)
+
+    assert not updater.observe(gallery, user_id, probe, distance=0.5)
+    assert updater.observe(gallery, user_id, probe, distance=0.2)
+    assert not updater.observe(gallery, user_id, probe, distance=0.2)
+    assert updater.pending() == 1
+    np.testing.assert_array_equal(gallery.template(user_id), enrolled)
+
+    updater.flush()
+    assert updater.written == 1 and updater.pending() == 0
+    np.testing.assert_allclose(stored_template(user_id), enrolled + 0.1 * 0.02, atol=1e-6)
+    np.testing.assert_array_equal(gallery.template(user_id), stored_template(user_id))
+    user = User.query.get(user_id)
+    assert user.biometric_key_version == 1
+    assert user.biometric_drift == pytest.approx(0.1 * 0.02 * np.sqrt(128), rel=1e-4)
+
+    # Another process queuing within the interval is refused by the stored adaptation time
+    other = TemplateUpdater(app, keyring=get_keyring(), rate=0.1, interval=3600)
+    assert other.observe(gallery, user_id, probe, distance=0.2)
+    other.flush()
+    assert other.written == 0 and other.skipped == 1
+    updater.close()
+    other.close()
+
+    assert TemplateUpdater(app, rate=0.9).rate == 0.5
+
+
+def test_drift_is_capped(app):
+    """
+    Test that replaying one probe cannot move the template further than the drift cap.
+
+    :param app: Flask app instance for testing.
+    """
+    gallery = get_gallery()
+    user_id = int(gallery.user_ids[1])
+    enrolled = gallery.template(user_id).copy()
+    probe = enrolled + 0.02
+    updater = TemplateUpdater(app, keyring=get_keyring(), rate=0.5, max_drift=0.1, interval=0)
+
+    for _ in range(20):
+        assert updater.observe(gallery, user_id, probe, distance=0.2)
+        updater.flush()
+
+    template = stored_template(user_id)
+    assert np.linalg.norm(template - enrolled) <= 0.1 + 1e-5
+    assert np.linalg.norm(probe - template) > 0.1
+    assert User.query.get(user_id).biometric_drift == pytest.approx(0.1)
+    assert updater.written == 1 and updater.skipped == 19
+    updater.close()
+
+
+def test_reenrollment_wins(app):
+    """
+    Test that a probe queued before a re-enrollment does not adapt or revert the new template.
+
+    :param app: Flask app instance for testing.
+    """
+    gallery = get_gallery()
+    user_id = int(gallery.user_ids[2])
+    old = gallery.template(user_id).copy()
+    new = np.random.default_rng(1).normal(0, 0.1, 128).astype(np.float32)
+    updater = TemplateUpdater(app, keyring=get_keyring(), rate=0.1, interval=3600)
+
+    assert updater.observe(gallery, user_id, old + 0.01, distance=0.1)
+    user = User.query.get(user_id)
+    user.biometric_data, user.biometric_key_version = seal_template(new, user_id)
+    db.session.commit()
+    gallery.upsert(user_id, new)
+    updater.flush()
+
+    assert updater.written == 0
+    np.testing.assert_array_equal(stored_template(user_id), new)
+    np.testing.assert_array_equal(gallery.template(user_id), new)
+    assert not gallery.refresh(user_id, old, expected=old)
+    updater.close()
+
+
+def test_undecodable_template_is_skipped(app):
+    """
+    Test that a template that cannot be decoded skips its user without failing the batch.
+
+    :param app: Flask app instance for testing.
+    """
+    gallery = get_gallery()
+    broken, healthy = int(gallery.user_ids[0]), int(gallery.user_ids[1])
+    enrolled = gallery.template(healthy).copy()
+    updater = TemplateUpdater(app, keyring=get_keyring(), rate=0.1, interval=3600)
+    assert updater.observe(gallery, broken, gallery.template(broken), distance=0.1)
+    assert updater.observe(gallery, healthy, enrolled + 0.01, distance=0.1)
+    # Shorter than the sealed header
+    User.query.get(broken).biometric_data = b"FD"
+    db.session.commit()
+
+    updater.flush()
+
+    assert updater.written == 1 and updater.skipped == 1 and updater.failed == 0
+    assert not np.array_equal(stored_template(healthy), enrolled)
+    updater.close()
+
+
+def test_login_adapts_template(app):
+    """
+    Test that a biometric login queues an adaptation and a replayed probe does not.
+
+    :param app: Flask app instance for testing.
+    """
+    gallery = get_gallery()
+    user_id = int(gallery.user_ids[1])
+    enrolled = gallery.template(user_id).copy()
+    client = app.test_client()
+
+    def login():
+        response = client.post("/user/authenticate_with_biometrics",
+                               data=encode_frame(enrolled + 0.01),
+                               headers={"Content-Type": "application/octet-stream"})
+        assert response.status_code == 200
+
+    login()
+    updater = get_template_updater()
+    assert updater.pending() == 1
+    # The repeat is answered from the probe cache, which never adapts, whatever the interval
+    updater.interval = 0
+    login()
+    assert updater.queued == 1
+    updater.flush()
+    refreshed = stored_template(user_id)
+    assert not np.array_equal(refreshed, enrolled)
+    np.testing.assert_array_equal(gallery.template(user_id), refreshed)
@@ -0,0 +1,144 @@
+"""
+Test cases for admin routes in the Flask application.
+
+These test cases cover keyset-paginated listing, prefix search on the normalized username and
+email, and restricting the routes to admin accounts.
+
+Tested Routes:
+- /admin/users
+- /admin/gallery
+
+Dependencies:
+- Flask: Web framework for testing.
+- Flask-JWT-Extended: JWT authentication extension for Flask.
+- SQLAlchemy: Database ORM for data manipulation.
+"""
+
+import datetime
+import json
+
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app
+from database.db import db
+from models.user import User
+
+
+@pytest.fixture
+def app():
+    """
+    Fixture to set up the Flask application with 25 users, the first of them an admin.
+
+    :return: Flask app instance for testing.
+    """
+    app = create_app("testing")
+    app.config["ADMIN_EMAILS"] = {"admin@example.com"}
+    app_context = app.app_context()
+    app_context.push()
+    db.create_all()
+
+    start = datetime.datetime(2024, 1, 1)
+    for idx in range(25):
+        name = "admin" if idx == 0 else f"User{idx:02d}"
+        db.session.add(User(
+            username=name, email=f"{name.lower()}@example.com", password="password",
+            salt="salt", user_id=f"uuid-{idx}",
+            # Pairs of users share a creation time, so pages must break ties on id
+            created_date=start + datetime.timedelta(minutes=idx // 2)))
+    db.session.commit()
+
+    yield app
+
+    db.session.remove()
+    db.drop_all()
+    app_context.pop()
+
+
+def get_page(client, token, **params):
+    """
+    Fetch one page and split it into users and the next cursor.
+    """
+    response = client.get("/admin/users", query_string=params,
+                          headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 200
+    assert response.mimetype == "application/x-ndjson"
+    lines = [json.loads(line) for line in response.get_data(as_text=True).splitlines()]
+    return lines[:-1], lines[-1]["next_cursor"]
+
+
+def admin_token():
+    """
+    Create an access token for the admin user.
+    """
+    return create_access_token(identity=User.query.filter_by(username="admin").first().id)
+
+
+def test_list_users_pages(app):
+    """
+    Test that following cursors returns every user exactly once in creation order.
+
+    :param app: Flask app instance for testing.
+    """
+    client, token = app.test_client(), admin_token()
+
+    seen, cursor = [], None
+    while True:
+        params = {"limit": 10, **({"cursor": cursor} if cursor else {})}
+        users, cursor = get_page(client, token, **params)
+        seen.extend(users)
+        if cursor is None:
+            break
+
+    assert [user["userId"] for user in seen] == [f"uuid-{idx}" for idx in range(25)]
+    assert "biometric_data" not in seen[0]
+
+
+def test_search_users_by_prefix(app):
+    """
+    Test case-insensitive prefix search on username and email.
+
+    :param app: Flask app instance for testing.
+    """
+    client, token = app.test_client(), admin_token()
+
+    users, cursor = get_page(client, token, q="user1", limit=5)
+    assert [user["username"] for user in users] == [f"User1{idx}" for idx in range(5)]
+    users, cursor = get_page(client, token, q="user1", limit=5, cursor=cursor)
+    assert [user["username"] for user in users] == [f"User1{idx}" for idx in range(5, 10)]
+    assert cursor is None
+
+    users, _ = get_page(client, token, q="USER2%@")
+    assert users == []
+    users, _ = get_page(client, token, q="user24@")
+    assert [user["email"] for user in users] == ["user24@example.com"]
+
+
+def test_admin_required(app):
+    """
+    Test that non-admin users and foreign cursors are rejected.
+
+    :param app: Flask app instance for testing.
+    """
+    client = app.test_client()
+    token = create_access_token(identity=User.query.filter_by(username="User01").first().id)
+
+    response = client.get("/admin/users", headers={"Authorization": f"Bearer {token}"})
+    assert response.status_code == 403
+
+    _, cursor = get_page(client, admin_token(), limit=5)
+    response = client.get("/admin/users", query_string={"q": "user", "cursor": cursor},
+                          headers={"Authorization": f"Bearer {admin_token()}"})
+    assert response.status_code == 400
+
+
+def test_gallery_stats(app):
+    """
+    Test that the gallery statistics are reported to admins.
+
+    :param app: Flask app instance for testing.
+    """
+    response = app.test_client().get("/admin/gallery",
+                                     headers={"Authorization": f"Bearer {admin_token()}"})
+
+    assert response.status_code == 200
+    assert response.get_json() == {"sharded": False, "size": 0}
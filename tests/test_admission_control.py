@@ -0,0 +1,191 @@
+"""
+Test cases for admission control of the CPU-heavy routes.
+
+These test cases cover priority ordering of the wait queue, displacement of bulk requests by
+interactive ones, the wait deadline, budgets sized from the worker threads, the separate budget of
+streamed logins, 503 responses with Retry-After, unbudgeted routes staying available while a
+budget is saturated, and the admin statistics route.
+
+Tested Modules:
+- admission.control: Concurrency budgets and wait queues.
+- routes.admin: /admin/admission.
+
+Dependencies:
+- Flask: Web framework for testing.
+- Flask-JWT-Extended: JWT authentication extension for Flask.
+"""
+import threading
+import time
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app
+from config import Config
+from admission.control import Budget, Overloaded, get_admission_controller, size_budgets
+from database.db import db
+from models.user import User
+
+
+@pytest.fixture
+def app():
+    """
+    Fixture to set up the Flask application with one-slot budgets and an admin user.
+
+    :return: Flask app instance for testing.
+    """
+    app = create_app("testing")
+    app.config["ADMIN_EMAILS"] = {"admin@example.com"}
+    app.config["AUTH_EVENT_LOG_ENABLED"] = False
+    app.config["ADMISSION_CONTROL_ENABLED"] = True
+    app.config["ADMISSION_BUDGETS"] = {
+        "password": {"concurrency": 1, "queue": 0, "max_wait": 0.0},
+        "biometric": {"concurrency": 1, "queue": 0, "max_wait": 0.0},
+        "biometric_stream": {"concurrency": 1, "queue": 0, "max_wait": 0.0},
+    }
+    app_context = app.app_context()
+    app_context.push()
+    db.create_all()
+    db.session.add(User(username="admin", email="admin@example.com", password="password",
+                        salt="salt", user_id="uuid-admin"))
+    db.session.commit()
+
+    yield app
+
+    db.session.remove()
+    db.drop_all()
+    app_context.pop()
+
+
+def wait_for_queue(budget, length):
+    """
+    Wait until the budget has the given number of queued requests.
+    """
+    deadline = time.monotonic() + 5
+    while budget.stats()["queued"] != length:
+        assert time.monotonic() < deadline
+        time.sleep(0.001)
+
+
+def test_priority_order():
+    """
+    Test that a freed slot goes to the oldest interactive request before any bulk request.
+    """
+    budget = Budget("test", concurrency=1, queue_size=4, max_wait=5.0)
+    budget.acquire(0)
+    order = []
+
+    def request(name, rank):
+        budget.acquire(rank)
+        order.append(name)
+        budget.release(0.01)
+
+    threads = []
+    for name, rank in (("bulk", 1), ("first", 0), ("second", 0)):
+        threads.append(threading.Thread(target=request, args=(name, rank)))
+        threads[-1].start()
+        wait_for_queue(budget, len(threads))
+    budget.release(0.01)
+    for thread in threads:
+        thread.join()
+
+    assert order == ["first", "second", "bulk"]
+    assert budget.stats()["active"] == 0
+    assert budget.admitted == 4
+
+
+def test_shedding():
+    """
+    Test the full queue, displacement of bulk requests and the wait deadline.
+    """
+    budget = Budget("test", concurrency=1, queue_size=1, max_wait=0.5)
+    budget.acquire(0)
+    shed = []
+
+    def request(rank):
+        try:
+            budget.acquire(rank)
+        except Overloaded as e:
+            shed.append(e.reason)
+
+    bulk = threading.Thread(target=request, args=(1,))
+    bulk.start()
+    wait_for_queue(budget, 1)
+    with pytest.raises(Overloaded) as excinfo:
+        budget.acquire(1)
+    assert excinfo.value.reason == "queue_full"
+    assert excinfo.value.retry_after >= 1
+
+    interactive = threading.Thread(target=request, args=(0,))
+    interactive.start()
+    bulk.join()
+    interactive.join()
+
+    assert shed == ["displaced", "deadline"]
+    assert budget.stats()["shed"] == {"queue_full": 1, "displaced": 1, "deadline": 1}
+    assert budget.stats()["queued"] == 0
+
+
+def test_budgets_sized_from_threads():
+    """
+    Test that shared budgets hold at most the threads left for them, and never all of them.
+    """
+    budgets = size_budgets({
+        "password": {"share": 0.5, "concurrency": 0, "max_wait": 2.0},
+        "biometric": {"share": 0.5, "concurrency": 2, "max_wait": 3.0},
+        "fixed": {"concurrency": 1, "queue": 0, "max_wait": 0.0},
+    }, threads=16, reserved=2, cpus=4)
+
+    assert budgets["password"] == {"concurrency": 4, "queue": 3, "max_wait": 2.0}
+    assert budgets["biometric"] == {"concurrency": 2, "queue": 5, "max_wait": 3.0}
+    assert budgets["fixed"] == {"concurrency": 1, "queue": 0, "max_wait": 0.0}
+
+    budgets = size_budgets({"password": {"share": 1.0, "max_wait": 2.0}}, threads=4, cpus=8)
+    assert budgets["password"]["concurrency"] + budgets["password"]["queue"] == 2
+
+
+def test_stream_budget(app):
+    """
+    Test that streamed logins, which hold a slot for a whole capture, have a budget of their own
+    whose threads all run at once.
+
+    :param app: Flask app instance for testing.
+    """
+    controller = get_admission_controller()
+    stream, _ = controller.routes["user.authenticate_with_biometrics_stream"]
+    single, _ = controller.routes["user.authenticate_with_biometrics"]
+    assert stream is not single
+
+    stream.acquire(0)
+    single.acquire(0)
+    single.release(0.01)
+    stream.release(0.01)
+
+    budgets = size_budgets(Config.ADMISSION_BUDGETS, Config.SERVER_THREADS, cpus=1)
+    assert budgets["biometric_stream"]["queue"] == 0
+    assert budgets["biometric_stream"]["concurrency"] >= 1
+
+
+def test_saturated_route(app):
+    """
+    Test that a saturated budget sheds its routes while other routes keep working.
+
+    :param app: Flask app instance for testing.
+    """
+    client = app.test_client()
+    token = create_access_token(identity=User.query.first().id)
+    headers = {"Authorization": f"Bearer {token}"}
+    password = get_admission_controller().budgets["password"]
+    password.acquire(0)
+
+    response = client.post("/user/login", json={"usernameEmail": "admin", "password": "x"})
+    assert response.status_code == 503
+    assert int(response.headers["Retry-After"]) >= 1
+    assert client.get("/user/details", headers=headers).status_code == 200
+
+    password.release(0.01)
+    response = client.post("/user/login", json={"usernameEmail": "nobody", "password": "x"})
+    assert response.status_code == 401
+
+    stats = client.get("/admin/admission", headers=headers).get_json()
+    assert stats["budgets"]["password"]["shed"] == {"queue_full": 1}
+    assert stats["budgets"]["password"]["admitted"] == 2
+    assert stats["budgets"]["password"]["active"] == 0
@@ -0,0 +1,133 @@
+"""
+Test cases for the static asset build and routes.
+
+These test cases cover content-hashed names, weight manifests rewritten to the hashed shards,
+client pages rewritten to the hashed names with their Netlify headers, precompressed variants chosen
+from Accept-Encoding, cache headers, ETag revalidation and Range requests.
+
+Tested Modules:
+- assets.pipeline: Build of hashed and precompressed assets.
+- routes.assets: /client/face-api and /client/mdb.
+
+Dependencies:
+- Flask: Web framework for testing.
+"""
+import gzip
+import json
+import pytest
+from app import create_app
+from assets.pipeline import build_assets
+
+
+@pytest.fixture
+def app(tmp_path):
+    """
+    Fixture to set up the Flask application with a small client directory.
+
+    :param tmp_path: Pytest temporary directory.
+    :return: Flask app instance for testing.
+    """
+    source = tmp_path / "client"
+    (source / "face-api").mkdir(parents=True)
+    (source / "mdb").mkdir()
+    (source / "face-api" / "tiny_model-shard1").write_bytes(bytes(range(256)) * 64)
+    (source / "face-api" / "tiny_model-weights_manifest.json").write_text(
+        json.dumps([{"weights": [], "paths": ["tiny_model-shard1"]}]))
+    (source / "mdb" / "mdb.min.js").write_text("console.log('mdb');\n" * 500)
+    (source / "index.html").write_text('<script src="./mdb/mdb.min.js"></script>')
+    (source / "face-scan.js").write_text(
+        'loadFromUri("face-api/tiny_model-weights_manifest.json");')
+
+    app = create_app("testing")
+    app.config.update(ASSETS_SOURCE_DIR=str(source), ASSETS_BUILD_DIR=str(tmp_path / "dist"))
+    yield app
+
+
+def test_serves_source_before_build(app):
+    """
+    Test that unbuilt assets are served uncompressed with revalidation.
+
+    :param app: Flask app instance for testing.
+    """
+    response = app.test_client().get("/client/mdb/mdb.min.js", headers={"Accept-Encoding": "gzip"})
+
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "no-cache"
+    assert "Content-Encoding" not in response.headers
+    assert app.test_client().get("/client/other/file.js").status_code == 404
+
+
+def test_hashed_assets(app):
+    """
+    Test hashed names, rewritten weight manifests and the immutable cache headers.
+
+    :param app: Flask app instance for testing.
+    """
+    with app.app_context():
+        manifest = build_assets(app.config["ASSETS_SOURCE_DIR"], app.config["ASSETS_BUILD_DIR"])
+    client = app.test_client()
+
+    response = client.get("/client/face-api/tiny_model-weights_manifest.json")
+    assert response.headers["Cache-Control"] == "no-cache"
+    shard = response.get_json()[0]["paths"][0]
+    assert shard.startswith("tiny_model-shard1.") and manifest[f"face-api/{shard}"]["immutable"]
+
+    response = client.get(f"/client/face-api/{shard}")
+    assert response.status_code == 200
+    assert response.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert response.data == bytes(range(256)) * 64
+
+    assert client.get("/client/face-api/missing-shard").status_code == 404
+
+
+def test_pages_use_hashed_assets(app):
+    """
+    Test that the built pages load the hashed assets, which Netlify caches forever.
+
+    :param app: Flask app instance for testing.
+    """
+    build_dir = app.config["ASSETS_BUILD_DIR"]
+    manifest = build_assets(app.config["ASSETS_SOURCE_DIR"], build_dir)
+    hashed = sorted(name for name, entry in manifest.items() if entry["immutable"])
+    shard, weights_manifest, script = hashed
+
+    with open(f"{build_dir}/index.html") as f:
+        assert f.read() == f'<script src="./{script}"></script>'
+    with open(f"{build_dir}/face-scan.js") as f:
+        assert f.read() == f'loadFromUri("{weights_manifest}");'
+    with open(f"{build_dir}/_headers") as f:
+        headers = f.read()
+    for name in hashed:
+        assert f"/{name}\n  Cache-Control: public, max-age=31536000, immutable\n" in headers
+
+    response = app.test_client().get(f"/client/{weights_manifest}")
+    assert response.headers["Cache-Control"] == "public, max-age=31536000, immutable"
+    assert response.get_json()[0]["paths"] == [shard.split("/")[1]]
+
+
+def test_encoding_etag_and_range(app):
+    """
+    Test precompressed variants, 304 revalidation and partial content.
+
+    :param app: Flask app instance for testing.
+    """
+    with app.app_context():
+        build_assets(app.config["ASSETS_SOURCE_DIR"], app.config["ASSETS_BUILD_DIR"])
+    client = app.test_client()
+
+    response = client.get("/client/mdb/mdb.min.js", headers={"Accept-Encoding": "gzip"})
+    assert response.headers["Content-Encoding"] == "gzip"
+    assert "Accept-Encoding" in response.headers["Vary"]
+    assert gzip.decompress(response.data) == b"console.log('mdb');\n" * 500
+
+    etag = response.headers["ETag"]
+    response = client.get("/client/mdb/mdb.min.js",
+                          headers={"Accept-Encoding": "gzip", "If-None-Match": etag})
+    assert response.status_code == 304
+    assert response.data == b""
+
+    response = client.get("/client/mdb/mdb.min.js", headers={"Range": "bytes=0-10"})
+    assert response.status_code == 206
+    assert "Content-Encoding" not in response.headers
+    assert response.data == b"console.log"
+    assert response.headers["ETag"] != etag
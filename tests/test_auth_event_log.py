@@ -0,0 +1,139 @@
+"""
+Test cases for the write-behind authentication event log.
+
+These test cases cover batched writes by the background flusher, the drop and block overflow
+policies, the flush on close, and the events recorded by the login route.
+
+Tested Modules:
+- audit.event_log: Bounded event queue with a background batch writer.
+- routes.user: /user/login.
+
+Dependencies:
+- Flask: Web framework for testing.
+- SQLAlchemy: Database ORM for data manipulation.
+"""
+import datetime
+import threading
+import time
+import bcrypt
+import pytest
+from app import create_app
+from audit.event_log import AuthEventLog, get_auth_event_log
+from database.db import db
+from models.auth_event import AuthEvent
+from models.user import User
+
+
+@pytest.fixture
+def app():
+    """
+    Fixture to set up the Flask application with one registered user.
+
+    :return: Flask app instance for testing.
+    """
+    app = create_app("testing")
+    app_context = app.app_context()
+    app_context.push()
+    db.create_all()
+    password = bcrypt.hashpw(b"password", bcrypt.gensalt())
+    db.session.add(User(username="alice", email="alice@example.com",
+                        password=password.decode("utf-8"), salt="salt", user_id="uuid-alice"))
+    db.session.commit()
+
+    yield app
+
+    db.session.remove()
+    db.drop_all()
+    app_context.pop()
+
+
+def make_event(user_id):
+    """
+    Build the column values of a login event.
+
+    :param user_id: The event's user id.
+    :return: A dict of AuthEvent column values.
+    """
+    return {"occurred_at": datetime.datetime.utcnow(), "event_type": "login",
+            "outcome": "success", "user_id": user_id, "distance": None,
+            "latency_ms": 1.0, "ip_address": "127.0.0.1"}
+
+
+def test_flusher_writes_batches(app):
+    """
+    Test that the background flusher writes queued events in batches.
+
+    :param app: Flask app instance for testing.
+    """
+    log = AuthEventLog(app, batch_size=4, flush_interval=0.05)
+    for user_id in range(10):
+        assert log.record(make_event(user_id))
+
+    deadline = time.monotonic() + 5
+    while log.written < 10 and time.monotonic() < deadline:
+        time.sleep(0.01)
+    log.close()
+
+    assert log.written == 10
+    assert sorted(user_id for user_id, in db.session.query(AuthEvent.user_id)) == list(range(10))
+
+
+def test_overflow_policies(app):
+    """
+    Test that a full queue drops events, after waiting under the "block" policy.
+
+    :param app: Flask app instance for testing.
+    """
+    for overflow in ("drop", "block"):
+        log = AuthEventLog(app, queue_size=2, overflow=overflow, block_seconds=0.05)
+        # Keep the flusher from draining the queue
+        log._thread = object()
+        results = [log.record(make_event(user_id)) for user_id in range(3)]
+
+        assert results == [True, True, False]
+        assert log.dropped == 1
+        log._thread = None
+        log.close()
+        assert log.written == 2
+        assert not log.record(make_event(3))
+
+    assert AuthEvent.query.count() == 4
+
+
+def test_close_with_full_queue(app):
+    """
+    Test that closing with a full queue and a stalled flusher does not block, and writes the queue.
+
+    :param app: Flask app instance for testing.
+    """
+    log = AuthEventLog(app, queue_size=2)
+    # A flusher that never drains the queue
+    log._thread = threading.Thread(target=time.sleep, args=(0.5,))
+    log._thread.start()
+    for user_id in range(2):
+        assert log.record(make_event(user_id))
+
+    started = time.monotonic()
+    log.close(timeout=0.05)
+    assert time.monotonic() - started < 0.4
+    assert log.written == 2
+    log._thread.join()
+
+
+def test_login_records_events(app):
+    """
+    Test that successful and failed logins are recorded with their user.
+
+    :param app: Flask app instance for testing.
+    """
+    client = app.test_client()
+    user = User.query.filter_by(username="alice").first()
+    client.post("/user/login", json={"usernameEmail": "alice", "password": "password"})
+    client.post("/user/login", json={"usernameEmail": "alice", "password": "wrong"})
+    client.post("/user/login", json={"usernameEmail": "nobody", "password": "password"})
+    get_auth_event_log().close()
+
+    events = AuthEvent.query.order_by(AuthEvent.occurred_at).all()
+    assert [(e.event_type, e.outcome, e.user_id) for e in events] == [
+        ("login", "success", user.id), ("login", "failure", user.id), ("login", "failure", None)]
+    assert all(e.latency_ms > 0 and e.ip_address == "127.0.0.1" for e in events)
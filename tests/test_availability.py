@@ -0,0 +1,153 @@
+"""
+Test cases for the username/email availability filter.
+
+These test cases cover the cuckoo filter's inserts, deletes and false-positive rate, and the
+availability route answering from the filter without querying the database, registration
+applying the same case-insensitive rule, and stale filters being rebuilt off the request path.
+
+Tested Modules:
+- accounts.availability: Cuckoo filters of registered usernames and emails.
+- routes.user: /user/availability and /user/register.
+
+Dependencies:
+- Flask: Web framework for testing.
+- SQLAlchemy: Database ORM for data manipulation.
+"""
+import pytest
+from sqlalchemy import event
+from accounts.availability import CuckooFilter, get_availability_filter
+from app import create_app
+from database.db import db
+from models.user import User
+
+
+@pytest.fixture
+def app():
+    """
+    Fixture to set up the Flask application with one registered user.
+
+    :return: Flask app instance for testing.
+    """
+    app = create_app("testing")
+    app.config["AUTH_EVENT_LOG_ENABLED"] = False
+    app_context = app.app_context()
+    app_context.push()
+    db.create_all()
+    db.session.add(User(username="Alice", email="alice@example.com", password="password",
+                        salt="salt", user_id="uuid-alice"))
+    db.session.commit()
+
+    yield app
+
+    db.session.remove()
+    db.drop_all()
+    app_context.pop()
+
+
+def test_cuckoo_filter():
+    """
+    Test inserts, deletes of duplicates, and the false-positive rate.
+    """
+    cuckoo = CuckooFilter(20000)
+    values = [f"user{idx}@example.com" for idx in range(20000)]
+    assert all(cuckoo.add(value) for value in values)
+    assert cuckoo.add("user0@example.com")
+
+    assert all(value in cuckoo for value in values)
+    false_positives = sum(f"other{idx}" in cuckoo for idx in range(20000))
+    assert false_positives < 20
+
+    assert cuckoo.remove("user0@example.com")
+    assert "user0@example.com" in cuckoo
+    assert cuckoo.remove("user0@example.com")
+    assert "user0@example.com" not in cuckoo
+    assert len(cuckoo) == 19999
+
+
+def test_availability_route(app):
+    """
+    Test that filter misses are answered without a database query.
+
+    :param app: Flask app instance for testing.
+    """
+    client = app.test_client()
+    statements = []
+    client.get("/user/availability?username=warmup")
+    event.listen(db.engine, "before_cursor_execute", lambda *args: statements.append(args[2]))
+
+    response = client.get("/user/availability?username=bob&email=bob@example.com")
+    assert response.get_json() == {"username": True, "email": True}
+    assert statements == []
+
+    response = client.get("/user/availability?username=Alice&email=alice@example.com")
+    assert response.get_json() == {"username": False, "email": False}
+    assert len(statements) == 2
+
+    assert client.get("/user/availability").status_code == 400
+
+
+def test_register_and_delete_update_filter(app):
+    """
+    Test that registering and deleting an account update the filter.
+
+    :param app: Flask app instance for testing.
+    """
+    client = app.test_client()
+    assert client.get("/user/availability?username=carol").get_json() == {"username": True}
+
+    client.post("/user/register", json={
+        "email": "carol@example.com", "password": "Passw0rd!", "username": "carol"})
+    assert client.get("/user/availability?username=carol").get_json() == {"username": False}
+
+    client.delete("/user/delete_account", json={"email": "carol@example.com"})
+    assert client.get("/user/availability?email=carol@example.com").get_json() == {"email": True}
+    assert not get_availability_filter().might_exist("username", "carol")
+
+
+def test_normalized_confirmation(app):
+    """
+    Test that the confirming query matches the normalized value the filter was checked with.
+
+    :param app: Flask app instance for testing.
+    """
+    client = app.test_client()
+    response = client.get("/user/availability?username=%20alice%20&email=ALICE@example.com")
+    assert response.get_json() == {"username": False, "email": False}
+
+
+def test_register_matches_availability(app):
+    """
+    Test that registration rejects the values availability reports as taken.
+
+    :param app: Flask app instance for testing.
+    """
+    client = app.test_client()
+    response = client.post("/user/register", json={
+        "username": "ALICE", "email": "bob@example.com", "password": "password123"})
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "Username is not available"
+
+    response = client.post("/user/register", json={
+        "username": "bob", "email": "Alice@Example.com", "password": "password123"})
+    assert response.status_code == 400
+    assert response.get_json()["message"] == "Email is already registered"
+
+
+def test_stale_filter_rebuilt_in_background(app):
+    """
+    Test that a stale filter keeps answering while a single rebuild runs in the background.
+
+    :param app: Flask app instance for testing.
+    """
+    availability = get_availability_filter()
+    assert availability.might_exist("username", "alice")
+    db.session.add(User(username="dave", email="dave@example.com", password="password",
+                        salt="salt", user_id="uuid-dave"))
+    db.session.commit()
+    stale = availability._filters
+    availability._built_at = 0.0
+
+    assert not availability.might_exist("username", "dave")
+    with availability._rebuild_lock:
+        assert availability._filters is not stale
+    assert availability.might_exist("username", "dave")
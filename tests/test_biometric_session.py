@@ -0,0 +1,140 @@
+"""
+Test cases for streaming biometric authentication sessions.
+
+These test cases cover early acceptance on a clear frame, accumulating evidence over
+borderline frames, rejection, and reading streamed binary payloads.
+
+Tested Modules:
+- biometrics.session: Evidence accumulation and early exit.
+- biometrics.wire: Streamed payload decoding.
+
+Dependencies:
+- NumPy: Numerical computing library.
+"""
+import io
+
+import numpy as np
+import pytest
+from biometrics.gallery import Gallery
+from biometrics.session import AuthenticationSession
+from biometrics.wire import encode_frame, read_frames
+
+
+@pytest.fixture
+def templates():
+    """
+    Fixture providing deterministic unit-length templates for five users.
+
+    :return: Float32 array of shape (5, 128).
+    """
+    templates = np.random.default_rng(1).normal(size=(5, 128)).astype(np.float32)
+    return templates / np.linalg.norm(templates, axis=1, keepdims=True)
+
+
+@pytest.fixture
+def gallery(templates):
+    """
+    Fixture providing a gallery loaded with user ids 1 to 5.
+
+    :param templates: Test templates.
+    :return: Gallery instance.
+    """
+    gallery = Gallery()
+    gallery.load((idx + 1, template) for idx, template in enumerate(templates))
+    return gallery
+
+
+def probe_at(template, distance, seed=0):
+    """
+    Build a probe at an exact distance from a template.
+    """
+    direction = np.random.default_rng(seed).normal(size=128).astype(np.float32)
+    direction -= (direction @ template) * template
+    return template + distance * direction / np.linalg.norm(direction)
+
+
+def test_clear_frame_decides_immediately(gallery, templates):
+    """
+    Test that a single close match is accepted after one frame.
+
+    :param gallery: Loaded gallery.
+    :param templates: Test templates.
+    """
+    session = AuthenticationSession(gallery, threshold=0.6)
+
+    decision = session.add(probe_at(templates[2], 0.3)[None])
+
+    assert decision.accepted
+    assert decision.user_id == 3
+    assert decision.frames == 1
+
+
+def test_borderline_frames_accumulate(gallery, templates):
+    """
+    Test that borderline frames are accepted only after enough evidence accumulates.
+
+    :param gallery: Loaded gallery.
+    :param templates: Test templates.
+    """
+    session = AuthenticationSession(gallery, threshold=0.6)
+
+    assert session.add(probe_at(templates[0], 0.54, seed=1)[None]) is None
+    assert session.add(probe_at(templates[0], 0.54, seed=2)[None]) is None
+    decision = session.add(probe_at(templates[0], 0.54, seed=3)[None])
+
+    assert decision.accepted
+    assert decision.user_id == 1
+    assert decision.frames == 3
+
+
+def test_unknown_face_is_rejected(gallery):
+    """
+    Test that frames far from every template are rejected before the frame budget.
+
+    :param gallery: Loaded gallery.
+    """
+    session = AuthenticationSession(gallery, threshold=0.6, max_frames=10)
+    probes = np.random.default_rng(7).normal(size=(10, 128)).astype(np.float32)
+
+    decision = None
+    for probe in probes:
+        decision = session.add(probe[None])
+        if decision:
+            break
+
+    assert not decision.accepted
+    assert decision.frames < 10
+
+
+def test_frame_budget_decides_like_finish(gallery, templates):
+    """
+    Test that running out of frames accepts a leading candidate, as finishing early would.
+
+    :param gallery: Loaded gallery.
+    :param templates: Test templates.
+    """
+    probes = [probe_at(templates[0], 0.58, seed=seed)[None] for seed in range(2)]
+    budgeted = AuthenticationSession(gallery, threshold=0.6, max_frames=2)
+    finished = AuthenticationSession(gallery, threshold=0.6, max_frames=10)
+
+    assert budgeted.add(probes[0]) is None
+    decision = budgeted.add(probes[1])
+    for probe in probes:
+        assert finished.add(probe) is None
+
+    assert decision.accepted and decision.user_id == 1 and decision.frames == 2
+    assert decision == finished.finish()
+
+
+def test_read_frames_from_stream(templates):
+    """
+    Test decoding successive payloads from a streamed body.
+
+    :param templates: Test templates.
+    """
+    stream = io.BytesIO(encode_frame(templates[0]) + encode_frame(templates[1:3]))
+
+    frames = list(read_frames(stream))
+
+    assert [frame.shape for frame in frames] == [(1, 128), (2, 128)]
+    np.testing.assert_array_equal(frames[1], templates[1:3])
@@ -0,0 +1,91 @@
+"""
+Test cases for match threshold calibration.
+
+These test cases cover the blocked distance histograms against a brute-force computation,
+genuine/impostor separation with labelled samples, and threshold recommendation.
+
+Tested Module:
+- biometrics.calibration: Blocked FAR/FRR estimation.
+
+Dependencies:
+- NumPy: Numerical computing library.
+"""
+import numpy as np
+import pytest
+from biometrics.calibration import calibrate, pairwise_histogram
+
+
+@pytest.fixture
+def templates():
+    """
+    Fixture providing deterministic templates for fifty users.
+
+    :return: Float32 array of shape (50, 128).
+    """
+    return np.random.default_rng(0).normal(0, 0.1, (50, 128)).astype(np.float32)
+
+
+@pytest.fixture
+def samples():
+    """
+    Fixture providing three noisy samples for each of twenty identities.
+
+    :return: A tuple of (descriptors, labels).
+    """
+    rng = np.random.default_rng(1)
+    centers = rng.normal(0, 0.1, (20, 128))
+    labels = np.repeat(np.arange(20), 3)
+    descriptors = centers[labels] + rng.normal(0, 0.01, (60, 128))
+    return descriptors.astype(np.float32), labels
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_blocked_histogram_matches_brute_force(templates, processes):
+    """
+    Test that tiled histograms count every unordered pair exactly once.
+
+    :param templates: Test templates.
+    :param processes: Number of worker processes.
+    """
+    counts = pairwise_histogram(templates, bins=200, max_distance=2.0, block_size=16,
+                                processes=processes)
+
+    distances = np.linalg.norm(templates[:, None] - templates[None], axis=2)
+    expected = distances[np.triu_indices(len(templates), k=1)]
+    expected_counts = np.bincount(np.minimum((expected * 100).astype(int), 199), minlength=200)
+    assert counts.sum() == len(expected)
+    assert np.abs(counts - expected_counts).sum() <= 2  # float32 rounding at bin edges
+
+
+def test_genuine_and_impostor_pairs(samples):
+    """
+    Test splitting labelled sample pairs into genuine and impostor distributions.
+
+    :param samples: Labelled samples.
+    """
+    descriptors, labels = samples
+
+    result = calibrate(np.empty((0, 128), np.float32), descriptors, labels,
+                       block_size=8, processes=1)
+
+    assert result.genuine_counts.sum() == 20 * 3
+    assert result.impostor_counts.sum() == 60 * 59 // 2 - 60
+    threshold, far, frr = result.threshold_for_far(1e-3)
+    assert far <= 1e-3
+    assert frr == 0.0
+    assert 0.2 < threshold < 1.6
+
+
+def test_threshold_without_genuine_pairs(templates):
+    """
+    Test that FAR thresholds are recommended from the gallery alone, with FRR unknown.
+
+    :param templates: Test templates.
+    """
+    result = calibrate(templates, processes=1)
+
+    thresholds, far, frr = result.curve()
+    assert not result.has_genuine
+    assert np.all(np.diff(far) >= 0) and far[-1] == 1.0
+    assert np.isnan(frr).all()
+    assert result.threshold_for_far(0.0)[1] == 0.0
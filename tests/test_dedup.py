@@ -0,0 +1,124 @@
+"""
+Test cases for duplicate face detection.
+
+These test cases cover the blocked all-pairs scan against a brute-force computation, the bound on
+suspect pairs per account, and refusing an enrollment that duplicates another account's template.
+
+Tested Modules:
+- biometrics.dedup: Enrollment check and offline duplicate clusters.
+- routes.user: /user/store_biometric_data.
+
+Dependencies:
+- Flask: Web framework for testing.
+- NumPy: Numerical computing library.
+"""
+import numpy as np
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app
+from biometrics.dedup import find_duplicate, find_duplicate_clusters
+from biometrics.gallery import Gallery, get_gallery
+from biometrics.wire import encode_frame
+from database.db import db
+from models.user import User
+
+
+@pytest.fixture
+def templates():
+    """
+    Fixture providing 300 templates with two groups of near-duplicates: rows 10, 50 and 250 share
+    one face, rows 3 and 299 another.
+
+    :return: Float32 array of shape (300, 128).
+    """
+    rng = np.random.default_rng(0)
+    templates = rng.normal(0, 0.1, (300, 128))
+    for idx in (50, 250):
+        templates[idx] = templates[10] + rng.normal(0, 0.01, 128)
+    templates[299] = templates[3] + rng.normal(0, 0.01, 128)
+    return templates.astype(np.float32)
+
+
+@pytest.mark.parametrize("processes", [1, 2])
+def test_clusters_match_brute_force(templates, processes):
+    """
+    Test that the tiled scan finds exactly the pairs within the threshold.
+
+    :param templates: Test templates.
+    :param processes: Number of worker processes.
+    """
+    user_ids = np.arange(len(templates)) * 7 + 100
+    clusters = find_duplicate_clusters(user_ids, templates, 0.5, block_size=32,
+                                       processes=processes)
+
+    assert [cluster.user_ids for cluster in clusters] == [
+        [user_ids[10], user_ids[50], user_ids[250]], [user_ids[3], user_ids[299]]]
+    distances = np.linalg.norm(templates[:, None] - templates[None], axis=2)
+    for user_a, user_b, distance in clusters[0].pairs + clusters[1].pairs:
+        expected = distances[(user_a - 100) // 7, (user_b - 100) // 7]
+        assert distance == pytest.approx(expected, abs=1e-3)
+    assert len(clusters[0].pairs) == 3
+
+
+def test_suspects_bounded_per_account(templates):
+    """
+    Test that a face shared by many accounts keeps at most k suspect pairs per account.
+
+    :param templates: Test templates.
+    """
+    templates[100:140] = templates[100]
+    clusters = find_duplicate_clusters(np.arange(len(templates)), templates, 0.5, k=2,
+                                       block_size=16, processes=1)
+
+    members = {user_id for cluster in clusters for user_id in cluster.user_ids}
+    assert set(range(100, 140)) <= members
+    assert sum(len(cluster.pairs) for cluster in clusters) <= 2 * 40 + 4
+
+
+def test_find_duplicate(templates):
+    """
+    Test the enrollment check ignores the enrolling user's own template.
+
+    :param templates: Test templates.
+    """
+    gallery = Gallery()
+    gallery.load_arrays(np.arange(1, 101, dtype=np.int64), templates[:100])
+
+    assert find_duplicate(gallery, templates[3], 0.4, user_id=4) is None
+    user_id, distance = find_duplicate(gallery, templates[299], 0.4, user_id=500)
+    assert user_id == 4 and distance < 0.4
+    assert find_duplicate(gallery, templates[299], 0.0, user_id=500) is None
+
+
+def test_enrollment_refuses_duplicate(templates):
+    """
+    Test that /user/store_biometric_data refuses a face enrolled on another account.
+
+    :param templates: Test templates.
+    """
+    app = create_app("testing")
+    app.config["AUTH_EVENT_LOG_ENABLED"] = False
+    with app.app_context():
+        db.create_all()
+        for idx in range(2):
+            db.session.add(User(username=f"user{idx}", email=f"user{idx}@example.com",
+                                password="password", salt="salt", user_id=f"uuid-{idx}"))
+        db.session.commit()
+        first, second = User.query.order_by(User.id).all()
+        client = app.test_client()
+
+        def store(user, template):
+            token = create_access_token(identity=user.id)
+            return client.post(
+                "/user/store_biometric_data", data=encode_frame(template),
+                headers={"Authorization": f"Bearer {token}",
+                         "Content-Type": "application/octet-stream"})
+
+        assert store(first, templates[10]).status_code == 200
+        assert store(first, templates[50]).status_code == 200
+        assert store(second, templates[250]).status_code == 409
+        assert store(second, templates[3]).status_code == 200
+        assert sorted(get_gallery().user_ids.tolist()) == [first.id, second.id]
+
+        db.session.remove()
+        db.drop_all()
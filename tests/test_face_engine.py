@@ -0,0 +1,143 @@
+"""
+Test cases for the NumPy face descriptor extraction engine.
+
+These test cases cover the vectorized convolution primitives against a naive reference,
+loading the face-api.js weight manifests, and the shapes produced by each network.
+
+Tested Module:
+- biometrics.engine: Server-side face-api.js inference.
+
+Dependencies:
+- NumPy: Numerical computing library.
+"""
+import json
+import os
+
+import numpy as np
+import pytest
+from biometrics.engine import (
+    DEFAULT_MODEL_DIR, FaceLandmark68Net, FaceRecognitionNet, TinyFaceDetector, align_dlib,
+    conv2d, depthwise_conv2d, load_weight_map, non_max_suppression)
+
+
+@pytest.fixture
+def rng():
+    """
+    Fixture providing a seeded random number generator.
+
+    :return: NumPy Generator instance.
+    """
+    return np.random.default_rng(0)
+
+
+def naive_conv2d(x, filters, stride, pad):
+    """
+    Reference convolution computed one output pixel at a time.
+    """
+    kh, kw = filters.shape[:2]
+    x = np.pad(x, ((0, 0), pad[0], pad[1], (0, 0)))
+    out_h = (x.shape[1] - kh) // stride + 1
+    out_w = (x.shape[2] - kw) // stride + 1
+    out = np.zeros((x.shape[0], out_h, out_w, filters.shape[3]), dtype=np.float32)
+    for i in range(out_h):
+        for j in range(out_w):
+            patch = x[:, i * stride:i * stride + kh, j * stride:j * stride + kw]
+            out[:, i, j] = np.einsum("nijc,ijco->no", patch, filters)
+    return out
+
+
+def test_conv2d_matches_reference(rng):
+    """
+    Test the im2col convolution against the naive reference with 'same' padding and stride 2.
+
+    :param rng: Random number generator.
+    """
+    x = rng.normal(size=(2, 7, 9, 3)).astype(np.float32)
+    filters = rng.normal(size=(3, 3, 3, 4)).astype(np.float32)
+
+    out = conv2d(x, filters, stride=2, padding="same")
+
+    assert out.shape == (2, 4, 5, 4)
+    np.testing.assert_allclose(out, naive_conv2d(
+        x, filters, 2, ((1, 1), (1, 1))), atol=1e-4)
+
+
+def test_depthwise_conv2d_matches_reference(rng):
+    """
+    Test the depthwise convolution against per-channel reference convolutions.
+
+    :param rng: Random number generator.
+    """
+    x = rng.normal(size=(1, 6, 6, 3)).astype(np.float32)
+    filters = rng.normal(size=(3, 3, 3, 1)).astype(np.float32)
+
+    out = depthwise_conv2d(x, filters, stride=1, padding="same")
+
+    for channel in range(3):
+        expected = naive_conv2d(x[..., channel:channel + 1],
+                                filters[:, :, channel:channel + 1], 1, ((1, 1), (1, 1)))
+        np.testing.assert_allclose(out[..., channel], expected[..., 0], atol=1e-4)
+
+
+def test_non_max_suppression():
+    """
+    Test that overlapping boxes are suppressed in favour of the highest score.
+    """
+    boxes = np.array([[0, 0, 10, 10], [1, 1, 11, 11], [20, 20, 30, 30]], dtype=np.float32)
+    scores = np.array([0.6, 0.9, 0.7], dtype=np.float32)
+
+    assert non_max_suppression(boxes, scores, 0.4) == [1, 2]
+
+
+def test_load_weight_map_dequantizes():
+    """
+    Test loading the tiny face detector weights from the shipped manifest.
+    """
+    weights = load_weight_map(DEFAULT_MODEL_DIR, "tiny_face_detector_model")
+
+    assert weights["conv0/filters"].shape == (3, 3, 3, 16)
+    assert weights["conv8/bias"].shape == (25,)
+    assert weights["conv0/filters"].dtype == np.float32
+
+
+def test_detector_and_landmarks_shapes(rng):
+    """
+    Test a batched forward pass of the detector and the landmark network.
+
+    :param rng: Random number generator.
+    """
+    detector = TinyFaceDetector(load_weight_map(
+        DEFAULT_MODEL_DIR, "tiny_face_detector_model"))
+    landmark_net = FaceLandmark68Net(load_weight_map(
+        DEFAULT_MODEL_DIR, "face_landmark_68_model"))
+    frames = [rng.integers(0, 255, (120, 160, 3), dtype=np.uint8) for _ in range(2)]
+
+    assert detector.forward(np.zeros((2, 416, 416, 3), np.float32)).shape == (2, 13, 13, 25)
+    assert isinstance(detector.detect(frames), list)
+
+    landmarks = landmark_net.detect_landmarks([frames[0][:80, :60], frames[1]])
+    assert landmarks.shape == (2, 68, 2)
+    assert np.isfinite(landmarks).all()
+
+    x, y, width, height = align_dlib(landmarks[1], 160, 120)
+    assert x >= 0 and y >= 0 and width >= 0 and height >= 0
+
+
+def test_recognition_net_descriptor_shape(rng):
+    """
+    Test the recognition network on weights shaped like the shipped manifest.
+
+    :param rng: Random number generator.
+    """
+    manifest_path = os.path.join(
+        DEFAULT_MODEL_DIR, "face_recognition_model-weights_manifest.json")
+    with open(manifest_path) as manifest_file:
+        specs = json.load(manifest_file)[0]["weights"]
+    weights = {spec["name"]: rng.normal(0, 0.05, spec["shape"]).astype(np.float32)
+               for spec in specs}
+
+    descriptors = FaceRecognitionNet(weights).compute_descriptors(
+        [rng.integers(0, 255, (90, 70, 3), dtype=np.uint8) for _ in range(3)])
+
+    assert descriptors.shape == (3, 128)
+    assert descriptors.dtype == np.float32
@@ -0,0 +1,103 @@
+"""
+Test cases for the in-memory biometric gallery.
+
+These test cases cover nearest-neighbour search and keeping the gallery in sync when
+templates are added, replaced or removed.
+
+Tested Module:
+- biometrics.gallery: In-memory template matrix and matcher.
+
+Dependencies:
+- NumPy: Numerical computing library.
+"""
+import numpy as np
+import pytest
+from biometrics.gallery import Gallery
+
+
+@pytest.fixture
+def templates():
+    """
+    Fixture providing deterministic templates for ten users.
+
+    :return: Float32 array of shape (10, 128).
+    """
+    return np.random.default_rng(0).normal(0, 0.1, (10, 128)).astype(np.float32)
+
+
+@pytest.fixture
+def gallery(templates):
+    """
+    Fixture providing a gallery loaded with user ids 100 to 109.
+
+    :param templates: Test templates.
+    :return: Gallery instance.
+    """
+    gallery = Gallery()
+    gallery.load((100 + idx, template) for idx, template in enumerate(templates))
+    return gallery
+
+
+def test_search_matches_brute_force(gallery, templates):
+    """
+    Test that search returns the same neighbours and distances as a brute-force scan.
+
+    :param gallery: Loaded gallery.
+    :param templates: Test templates.
+    """
+    probes = templates[[3, 7]] + 0.01
+
+    user_ids, distances = gallery.search(probes, k=3)
+
+    expected = np.linalg.norm(probes[:, None, :] - templates[None, :, :], axis=2)
+    order = np.argsort(expected, axis=1)[:, :3]
+    np.testing.assert_array_equal(user_ids, 100 + order)
+    np.testing.assert_allclose(distances, np.take_along_axis(expected, order, axis=1),
+                               atol=1e-5)
+
+
+def test_upsert_and_remove(gallery, templates):
+    """
+    Test replacing, adding and removing templates.
+
+    :param gallery: Loaded gallery.
+    :param templates: Test templates.
+    """
+    gallery.upsert(100, templates[5])
+    gallery.upsert(200, templates[5] + 1.0)
+    gallery.remove(105)
+
+    user_ids, distances = gallery.search(templates[5], k=1)
+    assert len(gallery) == 10
+    assert user_ids[0, 0] == 100
+    assert distances[0, 0] == pytest.approx(0.0, abs=1e-3)
+    assert gallery.template(105) is None
+    np.testing.assert_array_equal(gallery.template(200), templates[5] + 1.0)
+
+
+def test_reload_keeps_concurrent_changes(gallery, templates):
+    """
+    Test that changes made while a reload reads the database survive the reload.
+
+    :param gallery: Loaded gallery.
+    :param templates: Test templates.
+    """
+    def loader():
+        gallery.upsert(300, templates[1])
+        gallery.remove(101)
+        return np.array([101, 102], dtype=np.int64), templates[1:3]
+
+    gallery.reload(loader)
+
+    assert sorted(gallery.user_ids.tolist()) == [102, 300]
+    np.testing.assert_array_equal(gallery.template(300), templates[1])
+
+
+def test_search_empty_gallery():
+    """
+    Test that searching an empty gallery returns no candidates.
+    """
+    user_ids, distances = Gallery().search(np.zeros(128, np.float32), k=5)
+
+    assert user_ids.shape == (1, 0)
+    assert distances.shape == (1, 0)
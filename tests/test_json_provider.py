@@ -0,0 +1,90 @@
+"""
+Test cases for the application's JSON encoder and decoder.
+
+These test cases check that the fast and stdlib codecs produce the same JSON for NumPy values
+and dates, and that request bodies are parsed by the configured decoder.
+
+Tested Module:
+- json_provider: orjson-backed JSON encoding and decoding with a stdlib fallback.
+
+Dependencies:
+- Flask: Web framework for testing.
+- NumPy: Numerical computing library.
+"""
+import datetime
+import uuid
+
+import numpy as np
+import pytest
+import flask
+from flask import Flask, json, jsonify
+from json_provider import FastJSONEncoder, StdlibJSONEncoder, init_json
+
+
+@pytest.fixture(params=["auto", "stdlib"])
+def app(request):
+    """
+    Fixture providing a bare Flask app using each JSON codec.
+
+    :param request: Pytest request carrying the codec name.
+    :return: Flask app instance for testing.
+    """
+    app = Flask(__name__)
+    app.config["JSON_CODEC"] = request.param
+    init_json(app)
+
+    @app.route("/echo", methods=["POST"])
+    def echo():
+        return jsonify({"received": flask.request.json, "scale": np.float32(0.5)})
+
+    return app
+
+
+def test_codec_selection(app):
+    """
+    Test that "auto" selects the fast encoder and "stdlib" the fallback.
+
+    :param app: Flask app instance for testing.
+    """
+    expected = FastJSONEncoder if app.config["JSON_CODEC"] == "auto" else StdlibJSONEncoder
+    assert app.json_encoder is expected
+
+
+def test_numpy_and_dates(app):
+    """
+    Test that NumPy values and dates serialize the same way with either codec.
+
+    :param app: Flask app instance for testing.
+    """
+    payload = {
+        "descriptor": np.arange(4, dtype=np.float32) / 4,
+        "strided": np.arange(6).reshape(2, 3)[:, ::2],
+        "count": np.int64(3),
+        "created": datetime.datetime(2024, 1, 2, 3, 4, 5),
+        "id": uuid.UUID(int=1),
+    }
+
+    with app.app_context():
+        decoded = json.loads(json.dumps(payload))
+
+    assert decoded == {
+        "descriptor": [0.0, 0.25, 0.5, 0.75],
+        "strided": [[0, 2], [3, 5]],
+        "count": 3,
+        "created": "2024-01-02T03:04:05",
+        "id": "00000000-0000-0000-0000-000000000001",
+    }
+
+
+def test_request_round_trip(app):
+    """
+    Test parsing a request body and encoding the response through the app's codec.
+
+    :param app: Flask app instance for testing.
+    """
+    response = app.test_client().post("/echo", json={"faceData": [0.1, -0.2], "name": "é"})
+
+    assert response.get_json() == {"received": {"faceData": [0.1, -0.2], "name": "é"},
+                                   "scale": 0.5}
+    assert app.test_client().post(
+        "/echo", data="{bad", content_type="application/json").status_code == 400
@@ -0,0 +1,83 @@
+"""
+Test cases for the repeat probe cache.
+
+These test cases cover hits on nearly identical probes, TTL and LRU eviction, and evicting a
+user's entries when their template changes.
+
+Tested Module:
+- biometrics.probe_cache: LSH-keyed TTL/LRU cache of matched probes.
+
+Dependencies:
+- NumPy: Numerical computing library.
+"""
+import numpy as np
+import pytest
+from biometrics.probe_cache import ProbeCache
+
+
+@pytest.fixture
+def probes():
+    """
+    Fixture providing deterministic unit-length probes for four users.
+
+    :return: Float32 array of shape (4, 128).
+    """
+    probes = np.random.default_rng(0).normal(size=(4, 128)).astype(np.float32)
+    return probes / np.linalg.norm(probes, axis=1, keepdims=True)
+
+
+def test_retry_hits_cache(probes):
+    """
+    Test that a slightly perturbed retry finds the cached match.
+
+    :param probes: Test probes.
+    """
+    cache = ProbeCache()
+    cache.put(probes[0], 7, 0.3)
+    retry = probes[0] + np.random.default_rng(1).normal(0, 0.002, 128).astype(np.float32)
+
+    assert cache.get(retry) == (7, pytest.approx(0.3))
+    assert cache.get(probes[1]) is None
+
+
+def test_ttl_and_lru_eviction(probes, monkeypatch):
+    """
+    Test that entries expire after the TTL and the least recently used entry is evicted.
+
+    :param probes: Test probes.
+    :param monkeypatch: Pytest monkeypatch fixture.
+    """
+    now = [100.0]
+    monkeypatch.setattr("biometrics.probe_cache.time.monotonic", lambda: now[0])
+    cache = ProbeCache(max_entries=2, ttl=30)
+    cache.put(probes[0], 1, 0.1)
+    cache.put(probes[1], 2, 0.1)
+    cache.get(probes[0])
+    cache.put(probes[2], 3, 0.1)
+
+    assert len(cache) == 2
+    assert cache.get(probes[1]) is None
+    assert cache.get(probes[0])[0] == 1
+    now[0] += 31
+    assert cache.get(probes[0]) is None
+    assert cache.get(probes[2]) is None
+
+
+def test_invalidate_user(probes):
+    """
+    Test that changing a user's template evicts their probes and probes near the new template.
+
+    :param probes: Test probes.
+    """
+    cache = ProbeCache()
+    cache.put(probes[0], 1, 0.1)
+    cache.put(probes[1], 2, 0.1)
+    cache.put(probes[2], 3, 0.1)
+
+    cache.invalidate(1)
+    cache.invalidate(4, descriptor=probes[2])
+
+    assert cache.get(probes[0]) is None
+    assert cache.get(probes[1])[0] == 2
+    assert cache.get(probes[2]) is None
+    assert len(cache) == 1
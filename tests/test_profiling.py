@@ -0,0 +1,133 @@
+"""
+Test cases for on-demand request profiling.
+
+These test cases cover signed X-Profile tokens, the profile files written for cProfile and
+sampling captures with their SQL timings, rotation of the profile directory, and requests passing
+through untouched when profiling is disabled.
+
+Tested Module:
+- diagnostics.profiling: WSGI middleware profiling selected requests.
+
+Dependencies:
+- Flask: Web framework for testing.
+- SQLAlchemy: Database ORM for data manipulation.
+"""
+import json
+import os
+import time
+import pytest
+from app import create_app
+from database.db import db
+from diagnostics.profiling import sign_profile_token, verify_profile_token
+
+
+@pytest.fixture
+def app(tmp_path):
+    """
+    Fixture to set up the Flask application with profiling enabled into a temporary directory.
+
+    :param tmp_path: Pytest temporary directory.
+    :return: Flask app instance for testing.
+    """
+    app = create_app("testing")
+    app.config.update(PROFILING_ENABLED=True, PROFILING_SECRET="secret",
+                      PROFILING_DIR=str(tmp_path / "profiles"), PROFILING_MAX_PROFILES=3)
+    app_context = app.app_context()
+    app_context.push()
+    db.create_all()
+
+    yield app
+
+    db.session.remove()
+    db.drop_all()
+    app_context.pop()
+
+
+def get(app, path, **kwargs):
+    """
+    Send a GET request and consume the whole response, which ends profiling.
+
+    :param app: Flask app instance for testing.
+    :param path: The request path.
+    :return: The response.
+    """
+    response = app.test_client().get(path, **kwargs)
+    response.get_data()
+    response.close()
+    return response
+
+
+def test_profile_tokens():
+    """
+    Test that tokens are rejected when expired or signed with another secret.
+    """
+    token = sign_profile_token("secret", time.time() + 60)
+
+    assert verify_profile_token("secret", token)
+    assert not verify_profile_token("other", token)
+    assert not verify_profile_token(None, token)
+    assert not verify_profile_token("secret", token, now=time.time() + 120)
+    assert not verify_profile_token("secret", "123.abc")
+
+
+@pytest.mark.parametrize("mode", ["cprofile", "sampling"])
+def test_signed_request_is_profiled(app, mode):
+    """
+    Test that a signed request writes a flame graph, metadata and its SQL timings.
+
+    :param app: Flask app instance for testing.
+    :param mode: The PROFILING_MODE.
+    """
+    app.config.update(PROFILING_MODE=mode, PROFILING_SAMPLE_INTERVAL=0.001)
+    token = sign_profile_token("secret", time.time() + 60)
+    response = get(app, "/user/availability?username=alice&email=alice@example.com",
+                   headers={"X-Profile": token})
+
+    profile_id = response.headers["X-Profile-Id"]
+    base = os.path.join(app.config["PROFILING_DIR"], profile_id)
+    with open(base + ".json") as f:
+        contents = f.read()
+    metadata = json.loads(contents)
+    assert metadata["path"] == "/user/availability"
+    assert "alice" not in contents
+    assert metadata["status"] == 200
+    assert metadata["sql_count"] >= 1
+    assert all("SELECT" in query["statement"] for query in metadata["sql"])
+    assert os.path.exists(base + ".prof") == (mode == "cprofile")
+
+    with open(base + ".collapsed") as f:
+        lines = f.read().splitlines()
+    if mode == "cprofile":
+        assert lines
+    for line in lines:
+        stack, weight = line.rsplit(" ", 1)
+        assert stack and int(weight) > 0
+
+
+def test_sampling_and_rotation(app):
+    """
+    Test that sampled requests are limited to PROFILING_PATHS and old profiles are removed.
+
+    :param app: Flask app instance for testing.
+    """
+    app.config.update(PROFILING_SAMPLE_RATE=1.0, PROFILING_PATHS=["/user/"])
+    assert "X-Profile-Id" not in get(app, "/").headers
+
+    ids = [get(app, "/user/start-backend").headers["X-Profile-Id"] for _ in range(5)]
+    names = os.listdir(app.config["PROFILING_DIR"])
+    assert sorted({name.split(".", 1)[0] for name in names}) == sorted(ids[-3:])
+
+
+def test_disabled_or_unsigned(app):
+    """
+    Test that nothing is profiled when disabled or when the token is invalid.
+
+    :param app: Flask app instance for testing.
+    """
+    token = sign_profile_token("other", time.time() + 60)
+    assert "X-Profile-Id" not in get(app, "/", headers={"X-Profile": token}).headers
+
+    app.config.update(PROFILING_ENABLED=False, PROFILING_SAMPLE_RATE=1.0)
+    token = sign_profile_token("secret", time.time() + 60)
+    assert "X-Profile-Id" not in get(app, "/", headers={"X-Profile": token}).headers
+    assert not os.path.exists(app.config["PROFILING_DIR"])
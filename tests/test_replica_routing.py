@@ -0,0 +1,140 @@
+"""
+Test cases for read replica routing.
+
+These test cases use two SQLite files as a primary and a replica that is never replicated to, so
+a read shows which database served it.
+
+Tested Module:
+- database.routing: Session routing read-only queries to read replicas.
+
+Dependencies:
+- Flask: Web framework for testing.
+- SQLAlchemy: Database ORM for data manipulation.
+"""
+import pytest
+from sqlalchemy import text
+from app import create_app
+from config import TestingConfig
+from database.db import db
+from database.routing import STICKY_COOKIE
+from models.user import User
+
+
+@pytest.fixture
+def make_app(tmp_path, monkeypatch):
+    """
+    Fixture building an application whose primary and replica are SQLite files.
+
+    :param tmp_path: Pytest temporary directory.
+    :param monkeypatch: Pytest monkeypatch fixture.
+    :return: A function taking the replica URI and returning a Flask app instance.
+    """
+    contexts = []
+
+    def make_app(replica_uri=None, sticky_seconds=0.0):
+        monkeypatch.setattr(TestingConfig, "SQLALCHEMY_DATABASE_URI",
+                            f"sqlite:///{tmp_path / 'primary.db'}")
+        monkeypatch.setattr(TestingConfig, "SQLALCHEMY_REPLICA_URIS",
+                            [replica_uri or f"sqlite:///{tmp_path / 'replica.db'}"])
+        monkeypatch.setattr(TestingConfig, "REPLICA_STICKY_SECONDS", sticky_seconds)
+        app = create_app("testing")
+        app_context = app.app_context()
+        app_context.push()
+        contexts.append(app_context)
+        db.create_all()
+        if replica_uri is None:
+            db.Model.metadata.create_all(db.get_engine(app, bind="replica_0"))
+        return app
+
+    yield make_app
+
+    db.session.remove()
+    db.drop_all()
+    for app_context in reversed(contexts):
+        app_context.pop()
+
+
+def add_user(username):
+    """
+    Register a user through the session.
+
+    :param username: The username.
+    """
+    db.session.add(User(username=username, email=f"{username}@example.com", password="password",
+                        salt="salt", user_id=f"uuid-{username}"))
+    db.session.commit()
+
+
+def test_reads_use_replica(make_app):
+    """
+    Test that writes go to the primary and reads of a new session to the replica.
+
+    :param make_app: Application factory fixture.
+    """
+    app = make_app()
+    add_user("alice")
+    # Read-your-writes within the session that wrote
+    assert User.query.filter_by(username="alice").count() == 1
+    db.session.remove()
+
+    # The replica has not received the row yet
+    assert User.query.filter_by(username="alice").count() == 0
+    with db.get_engine(app).connect() as connection:
+        assert connection.execute(User.__table__.select()).fetchall()
+
+    # Locking reads go to the primary
+    assert User.query.filter_by(username="alice").with_for_update().count() == 1
+
+
+def test_sticky_window(make_app):
+    """
+    Test that the client that wrote reads from the primary for REPLICA_STICKY_SECONDS, while other
+    clients keep reading from the replica.
+
+    :param make_app: Application factory fixture.
+    """
+    app = make_app(sticky_seconds=60.0)
+    app.config["AUTH_EVENT_LOG_ENABLED"] = False
+    writer, other = app.test_client(), app.test_client()
+
+    response = writer.post("/user/register", json={
+        "email": "alice@example.com", "password": "Passw0rd!", "username": "alice"})
+    assert response.status_code == 201
+    assert STICKY_COOKIE in response.headers["Set-Cookie"]
+    # The requests share the fixture's app context, so end the writing session by hand
+    db.session.remove()
+
+    assert writer.get("/user/availability?username=alice").get_json() == {"username": False}
+    assert other.get("/user/availability?username=alice").get_json() == {"username": True}
+    assert other.get("/user/availability?username=alice").headers.get("Set-Cookie") is None
+
+
+def test_textual_select_is_not_a_write(make_app):
+    """
+    Test that a textual SELECT runs on the primary without pinning the session to it.
+
+    :param make_app: Application factory fixture.
+    """
+    app = make_app()
+    with db.get_engine(app).begin() as connection:
+        connection.execute(User.__table__.insert(), {
+            "username": "alice", "email": "alice@example.com", "password": "password",
+            "salt": "salt", "user_id": "uuid-alice"})
+
+    assert db.session.execute(text("SELECT count(*) FROM user")).scalar() == 1
+    assert User.query.filter_by(username="alice").count() == 0
+
+
+def test_fallback_to_primary(make_app, tmp_path):
+    """
+    Test that reads fall back to the primary when the replica is unreachable.
+
+    :param make_app: Application factory fixture.
+    :param tmp_path: Pytest temporary directory.
+    """
+    app = make_app(f"sqlite:///{tmp_path / 'missing' / 'replica.db'}")
+    add_user("alice")
+    db.session.remove()
+
+    assert User.query.filter_by(username="alice").count() == 1
+    assert app.extensions["database_replicas"].choose() is None
@@ -0,0 +1,192 @@
+"""
+Test cases for the sharded biometric gallery.
+
+These test cases cover scatter-gather search against the in-process gallery, concurrent searches,
+bulk loads split across the shards, keeping shards in sync on updates, leaving slow shards alone
+and recovering from a dead shard worker.
+
+Tested Module:
+- biometrics.sharding: Shared memory shards matched by worker processes.
+
+Dependencies:
+- NumPy: Numerical computing library.
+"""
+import threading
+import time
+
+import numpy as np
+import pytest
+from biometrics.gallery import Gallery
+from biometrics.sharding import ShardedGallery
+
+
+@pytest.fixture
+def templates():
+    """
+    Fixture providing deterministic templates for forty users.
+
+    :return: Float32 array of shape (40, 128).
+    """
+    return np.random.default_rng(0).normal(0, 0.1, (40, 128)).astype(np.float32)
+
+
+@pytest.fixture
+def sharded(templates, monkeypatch):
+    """
+    Fixture providing a three-shard gallery loaded with user ids 1 to 40.
+
+    Shards start small so that loading also exercises moving a shard into a larger segment.
+
+    :param templates: Test templates.
+    :param monkeypatch: Pytest monkeypatch fixture.
+    :return: ShardedGallery instance, closed after the test.
+    """
+    monkeypatch.setattr("biometrics.sharding.INITIAL_CAPACITY", 4)
+    gallery = ShardedGallery(3)
+    gallery.load((idx + 1, template) for idx, template in enumerate(templates))
+    yield gallery
+    gallery.close()
+
+
+def test_search_matches_single_gallery(sharded, templates):
+    """
+    Test that merged shard results equal a search over one in-process gallery.
+
+    :param sharded: Loaded sharded gallery.
+    :param templates: Test templates.
+    """
+    single = Gallery()
+    single.load((idx + 1, template) for idx, template in enumerate(templates))
+    probes = templates[[0, 17, 33]] + 0.01
+
+    user_ids, distances = sharded.search(probes, k=5)
+
+    expected_ids, expected_distances = single.search(probes, k=5)
+    np.testing.assert_array_equal(user_ids, expected_ids)
+    np.testing.assert_allclose(distances, expected_distances, atol=1e-5)
+
+
+def test_load_arrays(sharded, templates):
+    """
+    Test that loading arrays splits them across the shards by user id.
+
+    :param sharded: Loaded sharded gallery.
+    :param templates: Test templates.
+    """
+    user_ids = np.arange(1000, 1040, dtype=np.int64)
+    sharded.load_arrays(user_ids, templates[::-1])
+
+    assert len(sharded) == 40
+    assert [shard.count for shard in sharded._shards] == [13, 14, 13]
+    for shard_index, shard in enumerate(sharded._shards):
+        assert (shard.views[0][:shard.count] % 3 == shard_index).all()
+    np.testing.assert_array_equal(sharded.template(1000), templates[39])
+    assert sharded.search(templates[5], k=1)[0][0, 0] == 1034
+    assert sharded.template(1) is None
+
+
+def test_upsert_and_remove(sharded, templates):
+    """
+    Test that updates are visible to the shard workers.
+
+    :param sharded: Loaded sharded gallery.
+    :param templates: Test templates.
+    """
+    sharded.upsert(1, templates[9])
+    sharded.upsert(100, templates[9] + 1.0)
+    sharded.remove(10)
+    sharded.remove(4)
+
+    user_ids, distances = sharded.search(templates[9], k=1)
+    assert len(sharded) == 39
+    assert user_ids[0, 0] == 1
+    assert distances[0, 0] == pytest.approx(0.0, abs=1e-3)
+    assert sharded.template(10) is None
+    np.testing.assert_array_equal(sharded.template(100), templates[9] + 1.0)
+    assert 7 in sharded.search(templates[6], k=1)[0]
+
+
+def test_dead_shard_is_recovered(sharded, templates):
+    """
+    Test that a killed worker is searched locally and respawned by the health check.
+
+    :param sharded: Loaded sharded gallery.
+    :param templates: Test templates.
+    """
+    sharded._shards[1].process.kill()
+    sharded._shards[1].process.join()
+
+    user_ids, _ = sharded.search(templates, k=1)
+
+    np.testing.assert_array_equal(user_ids[:, 0], np.arange(1, 41))
+    sharded._shards[2].process.kill()
+    sharded._shards[2].process.join()
+    assert sharded.health_check() == [True, True, False]
+    assert sharded.health_check() == [True, True, True]
+
+
+def test_slow_shard_is_not_restarted(sharded, templates):
+    """
+    Test that a live worker missing the search timeout is searched locally but not restarted.
+
+    :param sharded: Loaded sharded gallery.
+    :param templates: Test templates.
+    """
+    sharded.timeout = 0
+
+    user_ids, _ = sharded.search(templates, k=1)
+
+    np.testing.assert_array_equal(user_ids[:, 0], np.arange(1, 41))
+    assert sharded.restarts == 0
+    assert all(not shard._pending for shard in sharded._shards)
+
+
+def test_concurrent_searches(sharded, templates):
+    """
+    Test that searches running at the same time each get their own answers.
+
+    :param sharded: Loaded sharded gallery.
+    :param templates: Test templates.
+    """
+    results = {}
+
+    def search(idx):
+        for _ in range(20):
+            user_ids, _ = sharded.search(templates[idx], k=1)
+            results.setdefault(idx, set()).add(int(user_ids[0, 0]))
+
+    threads = [threading.Thread(target=search, args=(idx,)) for idx in range(8)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert results == {idx: {idx + 1} for idx in range(8)}
+
+
+def test_background_health_check(templates, monkeypatch):
+    """
+    Test that the periodic health check respawns a dead worker and reports it.
+
+    :param templates: Test templates.
+    :param monkeypatch: Pytest monkeypatch fixture.
+    """
+    monkeypatch.setattr("biometrics.sharding.INITIAL_CAPACITY", 64)
+    gallery = ShardedGallery(2, health_interval=0.05)
+    try:
+        gallery.load((idx + 1, template) for idx, template in enumerate(templates))
+        gallery._shards[0].process.kill()
+
+        deadline = time.monotonic() + 10
+        while gallery.restarts == 0:
+            assert time.monotonic() < deadline
+            time.sleep(0.01)
+
+        stats = gallery.stats()
+        assert stats["restarts"] == 1
+        assert stats["size"] == 40
+        assert stats["health"]["healthy"] in ([False, True], [True, True])
+        user_ids, _ = gallery.search(templates, k=1)
+        np.testing.assert_array_equal(user_ids[:, 0], np.arange(1, 41))
+    finally:
+        gallery.close()
@@ -0,0 +1,155 @@
+"""
+Test cases for encrypted biometric templates.
+
+These test cases cover sealing and opening templates, the binding of a ciphertext to its user,
+bulk gallery loading of encrypted and unencrypted rows, key rotation and encrypted enrollment.
+
+Tested Modules:
+- biometrics.encryption: Envelope encryption of stored templates.
+- biometrics.gallery: Bulk template loading.
+- routes.user: /user/store_biometric_data.
+
+Dependencies:
+- Flask: Web framework for testing.
+- NumPy: Numerical computing library.
+- cryptography: AES-GCM implementation.
+"""
+import base64
+import os
+import numpy as np
+import pytest
+from flask_jwt_extended import create_access_token
+from app import create_app
+from biometrics.encryption import (
+    TemplateKeyError, count_stale_templates, get_keyring, open_template, rotate_template_key,
+    seal_template)
+from biometrics.gallery import load_gallery_arrays
+from biometrics.wire import encode_frame, encode_template
+from database.db import db
+from models.user import User
+
+pytest.importorskip("cryptography")
+
+
+@pytest.fixture
+def app():
+    """
+    Fixture to set up the Flask application with a template master key and six users.
+
+    :return: Flask app instance for testing.
+    """
+    app = create_app("testing")
+    app.config["TEMPLATE_MASTER_KEY"] = base64.b64encode(os.urandom(32)).decode("ascii")
+    app.config["AUTH_EVENT_LOG_ENABLED"] = False
+    app_context = app.app_context()
+    app_context.push()
+    db.create_all()
+    for idx in range(6):
+        db.session.add(User(username=f"user{idx}", email=f"user{idx}@example.com",
+                            password="password", salt="salt", user_id=f"uuid-{idx}"))
+    db.session.commit()
+
+    yield app
+
+    db.session.remove()
+    db.drop_all()
+    app_context.pop()
+
+
+@pytest.fixture
+def templates():
+    """
+    Fixture providing deterministic templates for six users.
+
+    :return: Float32 array of shape (6, 128).
+    """
+    return np.random.default_rng(0).normal(0, 0.1, (6, 128)).astype(np.float32)
+
+
+def enroll(templates, encrypted):
+    """
+    Store a template for each user, encrypted for the users listed.
+
+    :param templates: Test templates.
+    :param encrypted: Indices of the users whose template is encrypted.
+    """
+    for idx, user in enumerate(User.query.order_by(User.id)):
+        if idx in encrypted:
+            user.biometric_data, user.biometric_key_version = seal_template(templates[idx], user.id)
+        else:
+            user.biometric_data = encode_template(templates[idx])
+    db.session.commit()
+
+
+def test_seal_and_open(app, templates):
+    """
+    Test the round trip and that a ciphertext only opens for its own user.
+
+    :param app: Flask app instance for testing.
+    :param templates: Test templates.
+    """
+    keyring = get_keyring()
+    data, version = seal_template(templates[0], 1)
+
+    assert version == 1
+    assert encode_template(templates[0]) not in data
+    np.testing.assert_array_equal(open_template(data, version, 1, keyring), templates[0])
+    with pytest.raises(TemplateKeyError):
+        open_template(data, version, 2, keyring)
+    with pytest.raises(TemplateKeyError):
+        open_template(data[:-1] + bytes([data[-1] ^ 1]), version, 1, keyring)
+
+
+def test_bulk_load(app, templates):
+    """
+    Test that the gallery loader decodes encrypted and unencrypted rows across batches.
+
+    :param app: Flask app instance for testing.
+    :param templates: Test templates.
+    """
+    enroll(templates, encrypted={0, 2, 3, 5})
+    user_ids, loaded = load_gallery_arrays(batch_size=4, workers=2)
+
+    expected_ids = [user.id for user in User.query.order_by(User.id)]
+    np.testing.assert_array_equal(user_ids, expected_ids)
+    np.testing.assert_array_equal(loaded, templates)
+
+
+def test_rotation(app, templates):
+    """
+    Test that rotation re-encrypts every template with a new key version in batches.
+
+    :param app: Flask app instance for testing.
+    :param templates: Test templates.
+    """
+    enroll(templates, encrypted={1, 4})
+    keyring = get_keyring()
+
+    progress = list(rotate_template_key(keyring, batch_size=4, workers=2))
+
+    assert progress == [4, 6]
+    assert keyring.active_version == 2
+    assert count_stale_templates(2) == 0
+    assert {user.biometric_key_version for user in User.query} == {2}
+    np.testing.assert_array_equal(load_gallery_arrays()[1], templates)
+
+
+def test_store_encrypted(app, templates):
+    """
+    Test that enrollment stores an encrypted template.
+
+    :param app: Flask app instance for testing.
+    :param templates: Test templates.
+    """
+    user = User.query.first()
+    token = create_access_token(identity=user.id)
+    response = app.test_client().post(
+        "/user/store_biometric_data", data=encode_frame(templates[0]),
+        headers={"Authorization": f"Bearer {token}", "Content-Type": "application/octet-stream"})
+    assert response.status_code == 200
+
+    db.session.expire_all()
+    user = User.query.first()
+    assert user.biometric_key_version == 1
+    assert user.biometric_data != encode_template(templates[0])
+    np.testing.assert_array_equal(load_gallery_arrays()[1], templates[:1])
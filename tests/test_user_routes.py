@@ -26,10 +26,12 @@ Dependencies:
 """
 
 import pytest
+import numpy as np
 from app import create_app
 from database.db import db
 from models.user import User
 from routes.user import user_bp
+from biometrics.wire import encode_frame, encode_template
 
 
 @pytest.fixture
@@ -40,6 +42,7 @@ def app():
     :return: Flask app instance for testing.
     """
     app = create_app("testing")
+    app.config["AUTH_EVENT_LOG_ENABLED"] = False
     app.register_blueprint(user_bp)
     app_context = app.app_context()
     app_context.push()
@@ -228,17 +231,18 @@ def test_store_biometric_data(app, jwt_token):
         db.session.commit()
 
         # Send a POST request to store biometric data with a valid JWT token
+        descriptor = np.linspace(-0.2, 0.2, 128, dtype=np.float32)
         response = app.test_client().post(
             "/user/store_biometric_data",
             headers={"Authorization": f"Bearer {jwt_token}"},
-            json={"faceData": "base64_encoded_data"},
+            json={"faceData": descriptor.tolist()},
         )
 
         assert response.status_code == 200
 
         # Check if biometric data is stored in the user's record
         user = User.query.filter_by(email="test@example.com").first()
-        assert user.biometric_data == "base64_encoded_data"
+        assert user.biometric_data == encode_template(descriptor)
 
 
 def test_authenticate_with_biometrics(app):
@@ -251,14 +255,16 @@ def test_authenticate_with_biometrics(app):
         # Create a test user with stored biometric data
         user = User(username="testuser",
                     email="test@example.com", password="password")
-        user.biometric_data = "base64_encoded_data"
+        descriptor = np.linspace(-0.2, 0.2, 128, dtype=np.float32)
+        user.biometric_data = encode_template(descriptor)
         db.session.add(user)
         db.session.commit()
 
-        # Send a POST request to authenticate with biometrics
+        # Send a POST request to authenticate with a binary descriptor payload
         response = app.test_client().post(
             "/user/authenticate_with_biometrics",
-            json={"faceData": "base64_encoded_data"},
+            data=encode_frame(descriptor),
+            content_type="application/octet-stream",
         )
 
         assert response.status_code == 200
@@ -0,0 +1,138 @@
+"""
+Test cases for the face descriptor wire format.
+
+These test cases cover the binary and MessagePack payloads, the legacy JSON fallback (including
+request bodies that are not JSON objects), and the template encoding used for `User.biometric_data`.
+
+Tested Module:
+- biometrics.wire: Descriptor encoding and decoding.
+
+Dependencies:
+- Flask: Web framework for testing.
+- NumPy: Numerical computing library.
+- msgpack: MessagePack serialization (optional).
+"""
+import base64
+
+import numpy as np
+import pytest
+from flask import Flask, request
+from biometrics.wire import (
+    HEADER, WireFormatError, decode_frame, decode_json, decode_msgpack, decode_template,
+    descriptors_from_request, encode_frame, encode_template)
+
+
+@pytest.fixture
+def descriptors():
+    """
+    Fixture providing two deterministic descriptors.
+
+    :return: Float32 array of shape (2, 128).
+    """
+    return np.random.default_rng(0).normal(0, 0.1, (2, 128)).astype(np.float32)
+
+
+def test_binary_round_trip_is_zero_copy(descriptors):
+    """
+    Test that a float32 binary payload decodes to a view over the request body.
+
+    :param descriptors: Test descriptors.
+    """
+    payload = encode_frame(descriptors)
+
+    decoded = decode_frame(payload)
+
+    assert len(payload) == HEADER.size + descriptors.nbytes
+    np.testing.assert_array_equal(decoded, descriptors)
+    assert not decoded.flags.owndata
+
+
+def test_binary_float16_payload(descriptors):
+    """
+    Test that float16 payloads halve the size and decode to float32.
+
+    :param descriptors: Test descriptors.
+    """
+    payload = encode_frame(descriptors, dtype="<f2")
+
+    decoded = decode_frame(payload)
+
+    assert len(payload) == HEADER.size + descriptors.size * 2
+    assert decoded.dtype == np.float32
+    np.testing.assert_allclose(decoded, descriptors, atol=1e-3)
+
+
+def test_binary_rejects_bad_payloads(descriptors):
+    """
+    Test that truncated payloads and wrong headers are rejected.
+
+    :param descriptors: Test descriptors.
+    """
+    payload = encode_frame(descriptors)
+
+    with pytest.raises(WireFormatError):
+        decode_frame(payload[:-4])
+    with pytest.raises(WireFormatError):
+        decode_frame(b"XX" + payload[2:])
+    with pytest.raises(WireFormatError):
+        decode_frame(encode_frame(np.zeros(64, np.float32)))
+
+
+def test_msgpack_payload(descriptors):
+    """
+    Test decoding a MessagePack payload.
+
+    :param descriptors: Test descriptors.
+    """
+    msgpack = pytest.importorskip("msgpack")
+    payload = msgpack.packb({"dtype": "f4", "dim": 128, "data": descriptors.tobytes()})
+
+    np.testing.assert_array_equal(decode_msgpack(payload), descriptors)
+
+
+def test_json_fallback_forms(descriptors):
+    """
+    Test the list, index-keyed object and base64 forms of the JSON fallback.
+
+    :param descriptors: Test descriptors.
+    """
+    descriptor = descriptors[0]
+    as_object = {str(idx): float(value) for idx, value in enumerate(descriptor)}
+    as_base64 = base64.b64encode(descriptor.tobytes()).decode("ascii")
+
+    for face_data in (descriptor.tolist(), as_object, as_base64):
+        np.testing.assert_allclose(decode_json(face_data)[0], descriptor)
+
+    with pytest.raises(WireFormatError):
+        decode_json("base64_encoded_data")
+    with pytest.raises(WireFormatError):
+        decode_json(None)
+
+
+def test_json_body_must_be_an_object(descriptors):
+    """
+    Test that JSON bodies other than an object are rejected as a format error.
+
+    :param descriptors: Test descriptors.
+    """
+    app = Flask(__name__)
+    with app.test_request_context(json={"faceData": descriptors[0].tolist()}):
+        np.testing.assert_allclose(descriptors_from_request(request)[0], descriptors[0])
+
+    for body in ([descriptors[0].tolist()], "faceData", 1):
+        with app.test_request_context(json=body):
+            with pytest.raises(WireFormatError):
+                descriptors_from_request(request)
+
+
+def test_template_round_trip(descriptors):
+    """
+    Test encoding and decoding a stored template.
+
+    :param descriptors: Test descriptors.
+    """
+    stored = encode_template(descriptors[0])
+
+    assert len(stored) == 512
+    np.testing.assert_array_equal(decode_template(stored), descriptors[0])
+    assert decode_template(b"legacy") is None